@@ -0,0 +1,146 @@
+"""
+Benchmark thread usage and cancellation latency of async streaming
+
+Runs concurrent replies from a fake chat model that emits tokens with
+delays, first through stream_response on one thread per reply, then
+through astream_response on a single event loop. Then cancels an async
+reply from another thread, as a library caller running its own event
+loop would, and closes a sync reply from the local stub server midway,
+as happens when a Streamlit rerun stops the script. Exits non-zero if
+the async replies start a thread, a thread outlives the cancelled reply,
+the cancellation or the end of the interrupted upstream stream takes
+longer than CANCEL_LIMIT, or an interrupted exchange is saved. Run from
+the repository root:
+
+    python benchmarks/bench_async_streaming.py
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+from src.stub_server import start_stub_server
+
+CONCURRENT_REPLIES = 50
+REPLY = "streamed reply " * 50
+TOKEN_DELAY = 0.005
+# Milliseconds a cancelled generation may take to stop
+CANCEL_LIMIT = 50
+
+
+def make_manager():
+    manager = ChatManager("bench-key", PERSONALITIES["professional_assistant"])
+    manager.llm = FakeListChatModel(responses=[REPLY], sleep=TOKEN_DELAY)
+    return manager
+
+
+def sync_peak_threads():
+    peak = threading.active_count()
+    threads = [
+        threading.Thread(target=lambda: "".join(make_manager().stream_response("hi")))
+        for _ in range(CONCURRENT_REPLIES)
+    ]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        peak = max(peak, threading.active_count())
+        time.sleep(0.01)
+    return peak
+
+
+async def async_peak_threads():
+    peak = threading.active_count()
+
+    async def consume():
+        async for _ in make_manager().astream_response("hi"):
+            pass
+
+    tasks = [asyncio.create_task(consume()) for _ in range(CONCURRENT_REPLIES)]
+    while not all(task.done() for task in tasks):
+        peak = max(peak, threading.active_count())
+        await asyncio.sleep(0.01)
+    return peak
+
+
+def cancellation_latency():
+    """Cancel from another thread and time the abort; return (ms, tokens, history, threads left)"""
+    manager = make_manager()
+    loop = asyncio.new_event_loop()
+    first_token = threading.Event()
+    tokens = []
+
+    async def consume():
+        async for chunk in manager.astream_response("hi"):
+            tokens.append(chunk)
+            first_token.set()
+
+    async def run():
+        await asyncio.gather(consume(), return_exceptions=True)
+
+    threads = threading.active_count()
+    runner = threading.Thread(target=loop.run_until_complete, args=(run(),))
+    runner.start()
+    first_token.wait()
+    start = time.perf_counter()
+    manager.active_generation.cancel()
+    runner.join()
+    latency = (time.perf_counter() - start) * 1000
+    loop.close()
+    # Anything still streaming would keep appending or hold a thread
+    time.sleep(TOKEN_DELAY * 10)
+    return latency, len(tokens), len(manager.chat_history), threading.active_count() - threads
+
+
+def interrupted_sync_stream():
+    """Close a sync reply after its first token; return (ms until the upstream stream ended, history)"""
+    server = start_stub_server(reply_tokens=400, token_rate=100)
+    os.environ["STUB_SERVER_URL"] = server.base_url
+    manager = ChatManager("bench-key", PERSONALITIES["professional_assistant"], backend="stub", summarize=False)
+    with contextlib.closing(manager.stream_response("hi")) as stream:
+        next(stream)
+    start = time.perf_counter()
+    # The full reply would take 4s
+    while server.streams and time.perf_counter() - start < 5:
+        time.sleep(0.001)
+    latency = (time.perf_counter() - start) * 1000
+    server.shutdown()
+    return latency, len(manager.chat_history)
+
+
+def main():
+    failures = []
+    print(f"{CONCURRENT_REPLIES} concurrent replies")
+    print(f"  sync peak threads:  {sync_peak_threads()}")
+    threads = threading.active_count()
+    peak = asyncio.run(async_peak_threads())
+    print(f"  async peak threads: {peak}")
+    if peak > threads:
+        failures.append(f"async replies started {peak - threads} threads")
+    latency, tokens, history, leaked = cancellation_latency()
+    print(f"  cancellation latency: {latency:.2f} ms after {tokens} tokens (history entries saved: {history})")
+    if latency > CANCEL_LIMIT:
+        failures.append(f"cancellation took {latency:.0f} ms")
+    if history:
+        failures.append("cancelled async exchange saved")
+    if leaked:
+        failures.append(f"{leaked} threads left after cancellation")
+    latency, history = interrupted_sync_stream()
+    print(f"  interrupted sync reply: upstream closed after {latency:.2f} ms (history entries saved: {history})")
+    if latency > CANCEL_LIMIT:
+        failures.append(f"interrupted upstream stream ran on for {latency:.0f} ms")
+    if history:
+        failures.append("interrupted sync exchange saved")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
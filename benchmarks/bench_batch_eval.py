@@ -0,0 +1,91 @@
+"""
+Batch evaluation throughput and resume
+
+Writes a prompt set of single prompts and three-turn scripts across all
+personalities, runs it through src.batch_eval against the local stub
+server at increasing concurrency, and reports records per second. Then
+cuts the output short mid-line, inside a multi-byte character, as an
+interrupted run would leave it, and checks that resuming completes
+every record exactly once (exiting non-zero if not). Run from
+the repository root:
+
+    python benchmarks/bench_batch_eval.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch_eval import completed_ids, run_batch
+from src.personalities import PERSONALITIES
+from src.scheduler import RequestScheduler
+from src.stub_server import start_stub_server_process
+
+RECORDS = 400
+SEQUENTIAL_RECORDS = 40
+MODEL = "llama-3.1-8b-instant"
+
+
+def write_prompts(path: str, count: int):
+    personalities = list(PERSONALITIES)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            record = {"id": f"case-{i}", "personality": personalities[i % len(personalities)]}
+            if i % 4 == 0:
+                record["turns"] = [f"Case {i}: first question", "Tell me more", "Summarize that"]
+            else:
+                record["prompt"] = f"Case {i}: what do you think of café crème ☕?"
+            f.write(json.dumps(record) + "\n")
+
+
+def timed_run(input_path: str, output_path: str, concurrency: int) -> float:
+    started = time.perf_counter()
+    counts = run_batch(input_path, output_path, "bench-key", "stub", concurrency,
+                       RequestScheduler(max_concurrent=64), model_name=MODEL)
+    assert counts["failed"] == 0, counts
+    return time.perf_counter() - started
+
+
+def main():
+    server, base_url = start_stub_server_process(reply_tokens=40, token_rate=400, first_token_latency=0.05)
+    os.environ["STUB_SERVER_URL"] = base_url
+    directory = tempfile.mkdtemp()
+    prompts = os.path.join(directory, "prompts.jsonl")
+
+    write_prompts(prompts, SEQUENTIAL_RECORDS)
+    elapsed = timed_run(prompts, os.path.join(directory, "sequential.jsonl"), 1)
+    print(f"concurrency  1: {SEQUENTIAL_RECORDS / elapsed:6.1f} records/s ({SEQUENTIAL_RECORDS} records)")
+
+    write_prompts(prompts, RECORDS)
+    for concurrency in (8, 32, 64):
+        elapsed = timed_run(prompts, os.path.join(directory, f"results-{concurrency}.jsonl"), concurrency)
+        print(f"concurrency {concurrency:2d}: {RECORDS / elapsed:6.1f} records/s ({RECORDS} records)")
+
+    # Simulate an interruption: keep a third of the results and the next line
+    # up to the first byte of a multi-byte character
+    results = os.path.join(directory, "results-64.jsonl")
+    with open(results, "rb") as f:
+        lines = f.readlines()
+    kept = RECORDS // 3
+    cut = next(line for line in lines[kept:] if "☕".encode("utf-8") in line)
+    with open(results, "wb") as f:
+        f.writelines(lines[:kept])
+        f.write(cut[:cut.index("☕".encode("utf-8")) + 1])
+    counts = run_batch(prompts, results, "bench-key", "stub", 32, RequestScheduler(max_concurrent=64),
+                       model_name=MODEL)
+    with open(results, "rb") as f:
+        ids = [json.loads(line)["id"] for line in f if line.endswith(b"}\n")]
+    completed = len(completed_ids(results))
+    duplicated = len(ids) - len(set(ids))
+    print(f"resume: {counts}, {completed}/{RECORDS} ids completed, {duplicated} duplicated")
+    server.terminate()
+    if completed != RECORDS or duplicated:
+        print("FAIL: resume did not complete every record exactly once")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
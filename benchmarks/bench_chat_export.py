@@ -0,0 +1,91 @@
+"""
+Peak memory exporting a 50k-message conversation
+
+Compares the former export (every message loaded and joined into one
+string) with the streaming export in each format, written to a file and
+through export_session() as the download button uses it. Peak Python
+allocations are measured with tracemalloc. Run from the repository root:
+
+    python benchmarks/bench_chat_export.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_export import EXPORT_FORMATS, export_metadata, export_session, write_export
+from src.conversation_store import open_store
+from src.personalities import PERSONALITIES
+from src.stub_server import reply_tokens
+
+MESSAGES = 50_000
+SESSION = "bench"
+
+
+def message(i):
+    return {
+        "content": f"Message {i} " + "".join(reply_tokens([{"content": str(i)}], 100)),
+        "is_user": i % 2 == 0,
+        "timestamp": "12:00:00",
+        "personality": "witty_intellectual"
+    }
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def joined_export(store):
+    messages = store.tail(SESSION, MESSAGES)
+    chat_text = "\n\n".join([
+        f"{'User' if msg['is_user'] else 'Assistant'} ({msg['timestamp']}): {msg['content']}"
+        for msg in messages
+    ])
+    # st.download_button encodes the string
+    return len(chat_text.encode())
+
+
+def report(label, result):
+    size, elapsed, peak = result
+    print(f"  {label:<28} {size / 1e6:7.1f} MB out  {elapsed:5.2f}s  peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in [f"sqlite:{os.path.join(tmp, 'conv.db')}", f"jsonl:{os.path.join(tmp, 'conv')}"]:
+            store = open_store(spec)
+            for i in range(MESSAGES):
+                store.append(SESSION, message(i))
+            metadata = export_metadata(SESSION, MESSAGES, PERSONALITIES["witty_intellectual"], "auto")
+            print(f"{spec.split(':')[0]} store, {MESSAGES} messages")
+            report("joined string (before)", measure(lambda: joined_export(store)))
+
+            for fmt in EXPORT_FORMATS:
+                for compress in (False, True):
+                    path = os.path.join(tmp, "export.out")
+
+                    def to_file():
+                        with open(path, "wb") as f:
+                            return write_export(f, store.iter_messages(SESSION), fmt, metadata, compress)
+
+                    report(f"{fmt}{'.gz' if compress else ''} to file", measure(to_file))
+
+            def download(compress):
+                # export_session() builds on disk; Streamlit then reads it into memory once
+                return len(export_session(store, SESSION, "txt", metadata, compress).read())
+
+            report("download button, txt", measure(lambda: download(False)))
+            report("download button, txt.gz", measure(lambda: download(True)))
+
+
+if __name__ == "__main__":
+    main()
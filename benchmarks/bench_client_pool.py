@@ -0,0 +1,91 @@
+"""
+Count upstream connections opened across simulated chat sessions
+
+Compares a fresh ChatGroq per session with clients borrowed from the
+process-wide pool, against a local stub server, with the sessions one
+after another and then all at once. Exits non-zero unless the pooled
+sessions share a single connection when run one after another, and
+stay within the pool's connection limit when run at once. Run from the
+repository root:
+
+    python benchmarks/bench_client_pool.py
+"""
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_groq import ChatGroq
+from src.chat_manager import ChatManager
+from src.llm_pool import HTTP_LIMITS, get_pool
+from src.personalities import PERSONALITIES
+from src.stub_server import start_stub_server
+
+SESSIONS = 100
+MESSAGES_PER_SESSION = 3
+
+
+def run_sessions(make_manager, concurrent=False):
+    server = start_stub_server()
+    os.environ["GROQ_API_BASE"] = server.base_url
+
+    def session(index):
+        manager = make_manager(index)
+        for _ in range(MESSAGES_PER_SESSION):
+            "".join(manager.stream_response("Hello there"))
+
+    start = time.perf_counter()
+    if concurrent:
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(SESSIONS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        for index in range(SESSIONS):
+            session(index)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    return server.connections, server.requests, elapsed
+
+
+def per_session_client(session):
+    """Old behaviour: every session builds its own ChatGroq and HTTP client"""
+    personality = PERSONALITIES["friendly_companion"]
+    manager = ChatManager("bench-key", personality)
+    manager.llm = ChatGroq(
+        groq_api_key="bench-key",
+        model_name=manager.model_name,
+        temperature=personality.temperature,
+        max_tokens=2000,
+        streaming=True
+    )
+    return manager
+
+
+def pooled_client(session):
+    return ChatManager("bench-key", PERSONALITIES["friendly_companion"])
+
+
+def main():
+    failures = []
+    for concurrent, limit in [(False, 1), (True, HTTP_LIMITS.max_connections)]:
+        print(f"{SESSIONS} sessions x {MESSAGES_PER_SESSION} messages, {'at once' if concurrent else 'in turn'}")
+        for label, factory in [("per-session", per_session_client), ("pooled", pooled_client)]:
+            get_pool().clear()
+            connections, requests, elapsed = run_sessions(factory, concurrent)
+            print(f"{label:>12}: {connections:>4} connections for {requests} requests in {elapsed:.2f}s")
+            if requests != SESSIONS * MESSAGES_PER_SESSION:
+                failures.append(f"{label}: {requests} requests, expected {SESSIONS * MESSAGES_PER_SESSION}")
+            if factory is pooled_client and connections > limit:
+                failures.append(f"pooled sessions opened {connections} connections, expected at most {limit}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
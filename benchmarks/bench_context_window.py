@@ -0,0 +1,80 @@
+"""
+Benchmark prompt size and assembly time versus conversation length
+
+Compares the old fixed 10-exchange cap with the token-budgeted
+context window. Run from the repository root:
+
+    python benchmarks/bench_context_window.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from src.chat_manager import ChatManager
+from src.context_window import estimate_tokens
+from src.personalities import PERSONALITIES
+
+MODEL = "llama-3.3-70b-versatile"
+CONVERSATION_LENGTHS = [10, 50, 200, 1000]
+
+
+def make_turn(rng):
+    """Return a (user, assistant) pair with the occasional long paste"""
+    if rng.random() < 0.1:
+        user = "pasted log line " * rng.randint(200, 800)
+    else:
+        user = "short question " * rng.randint(2, 20)
+    return user, "answer text " * rng.randint(20, 200)
+
+
+def legacy_prompt(system_message, history, user_input, max_history=10):
+    """Old behaviour: keep the last max_history exchanges regardless of size"""
+    messages = [system_message]
+    messages.extend(history[-(max_history * 2):])
+    messages.append(HumanMessage(content=user_input))
+    return messages
+
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(m.content) for m in messages)
+
+
+def main():
+    print(f"{'turns':>6} | {'legacy peak':>11} {'legacy mean':>11} {'legacy us':>9} | "
+          f"{'budget peak':>11} {'budget mean':>11} {'budget us':>9}")
+    for length in CONVERSATION_LENGTHS:
+        rng = random.Random(length)
+        manager = ChatManager("bench-key", PERSONALITIES["professional_assistant"], MODEL, summarize=False)
+        system_message = SystemMessage(content=manager.system_message.content)
+        history = []
+        legacy_sizes, budget_sizes = [], []
+        legacy_time = budget_time = 0.0
+
+        for _ in range(length):
+            user, assistant = make_turn(rng)
+
+            start = time.perf_counter()
+            legacy = legacy_prompt(system_message, history, user)
+            legacy_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            budgeted = manager._build_messages(user)
+            budget_time += time.perf_counter() - start
+
+            legacy_sizes.append(prompt_tokens(legacy))
+            budget_sizes.append(prompt_tokens(budgeted))
+
+            manager._save_exchange(manager._new_message(user, True), assistant)
+            history.extend([HumanMessage(content=user), AIMessage(content=assistant)])
+
+        print(f"{length:>6} | {max(legacy_sizes):>11} {sum(legacy_sizes) // length:>11} "
+              f"{legacy_time / length * 1e6:>9.1f} | {max(budget_sizes):>11} "
+              f"{sum(budget_sizes) // length:>11} {budget_time / length * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
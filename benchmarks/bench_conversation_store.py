@@ -0,0 +1,67 @@
+"""
+Benchmark append latency and resume time for long conversations
+
+Appends 10k messages to each conversation store backend, then measures
+opening a fresh store and loading the resume tail as a new process
+would. Run from the repository root:
+
+    python benchmarks/bench_conversation_store.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conversation_store import open_store, RESUME_MESSAGES
+
+MESSAGES = 10_000
+SESSION = "bench"
+
+
+def message(i):
+    return {
+        "content": f"Message {i} " + "lorem ipsum dolor sit amet " * 10,
+        "is_user": i % 2 == 0,
+        "timestamp": "12:00:00",
+        "personality": "professional_assistant"
+    }
+
+
+def bench(spec):
+    store = open_store(spec)
+    latencies = []
+    for i in range(MESSAGES):
+        start = time.perf_counter()
+        store.append(SESSION, message(i))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    # Fresh store instance, as after a reload or pod restart
+    start = time.perf_counter()
+    resumed = open_store(spec)
+    tail = resumed.tail(SESSION, RESUME_MESSAGES)
+    resume_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    older = resumed.page(SESSION, tail[0]["seq"], 30)
+    page_ms = (time.perf_counter() - start) * 1000
+
+    assert tail[-1]["seq"] == MESSAGES - 1 and older[-1]["seq"] == tail[0]["seq"] - 1
+    return latencies, resume_ms, page_ms
+
+
+def main():
+    print(f"{MESSAGES} messages, resume loads the last {RESUME_MESSAGES}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in [f"sqlite:{os.path.join(tmp, 'conv.db')}", f"jsonl:{os.path.join(tmp, 'conv')}"]:
+            latencies, resume_ms, page_ms = bench(spec)
+            p50 = latencies[len(latencies) // 2] * 1e6
+            p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+            print(f"  {spec.split(':')[0]:>6}: append p50 {p50:.0f}us p99 {p99:.0f}us, "
+                  f"resume {resume_ms:.1f}ms, page earlier {page_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Per-turn rerun duration and delta count, fragment versus full reruns
+
+Starts the app with `streamlit run` against the local stub server and
+drives it over the websocket protocol the browser uses. Each chat turn
+is sent the way the frontend sends it: scoped to the chat fragment, and,
+for comparison, as a full app rerun, alternating within one session so
+both see the same transcript. Pass --app with an older version of the
+app to measure it (without a chat fragment, only full reruns apply).
+For each turn it reports wall time until the script goes idle, CPU time
+used by the Streamlit server process, and the number of delta messages
+and their bytes. Wall time includes the
+server's message flush cadence, so CPU time is the steadier measure of
+the script work a turn costs.
+Run from the repository root:
+
+    python benchmarks/bench_fragment_reruns.py [--app streamlit_app.py] [--turns 20]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+from src.stub_server import start_stub_server_process
+
+FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(app: str, port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Streamlit did not start")
+
+
+def cpu_seconds(pid: int) -> float:
+    """User plus system CPU time of a process (Linux)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rerun(ws, widget_states=(), fragment_id: str = "") -> tuple:
+    """Request a rerun and read until the script is idle; return (seconds, deltas, bytes, messages)"""
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.widget_states.widgets.extend(widget_states)
+    msg.rerun_script.fragment_id = fragment_id
+    started = time.perf_counter()
+    ws.send(msg.SerializeToString())
+    deltas = size = 0
+    received = []
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(ws.recv())
+        received.append(forward)
+        if forward.HasField("delta"):
+            deltas += 1
+            size += forward.ByteSize()
+        if forward.HasField("script_finished") and forward.script_finished in FINISHED:
+            return time.perf_counter() - started, deltas, size, received
+
+
+def find_chat_input(messages) -> tuple:
+    for forward in messages:
+        if forward.HasField("delta") and forward.delta.new_element.WhichOneof("type") == "chat_input":
+            return forward.delta.new_element.chat_input.id, forward.delta.fragment_id
+    raise RuntimeError("No chat input rendered")
+
+
+def chat_turn(ws, widget_id: str, text: str, fragment_id: str) -> tuple:
+    msg = BackMsg()
+    state = msg.rerun_script.widget_states.widgets.add()
+    state.id = widget_id
+    state.chat_input_value.data = text
+    return rerun(ws, [state], fragment_id)
+
+
+def run_session(port: int, pid: int, turns: int) -> dict:
+    """Alternate fragment-scoped and full-app turns in one session; return results per mode"""
+    with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                 max_size=None) as ws:
+        _, _, _, messages = rerun(ws)
+        widget_id, fragment_id = find_chat_input(messages)
+        # Apps without a chat fragment can only be measured with full reruns
+        modes = ["chat fragment only", "full app rerun"] if fragment_id else ["full app rerun"]
+        results = {mode: [] for mode in modes}
+        for turn in range(turns):
+            mode = modes[turn % len(modes)]
+            cpu = cpu_seconds(pid)
+            seconds, deltas, size, _ = chat_turn(
+                ws, widget_id, f"Turn {turn}: tell me something", fragment_id if mode != "full app rerun" else ""
+            )
+            results[mode].append((seconds, cpu_seconds(pid) - cpu, deltas, size))
+        return results
+
+
+def summarize(label: str, results: list):
+    seconds = [r[0] * 1000 for r in results]
+    cpu = [r[1] * 1000 for r in results]
+    deltas = [r[2] for r in results]
+    size = [r[3] for r in results]
+    print(f"  {label:<20} wall p50 {statistics.median(seconds):6.1f}ms | server CPU {statistics.mean(cpu):6.1f}ms | "
+          f"deltas {statistics.mean(deltas):5.1f} | {statistics.mean(size) / 1024:5.1f} KB per turn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fragment vs full rerun cost per chat turn")
+    parser.add_argument("--app", default="streamlit_app.py", help="App script, relative to the repository root")
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    stub, base_url = start_stub_server_process(reply_tokens=60)
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, LLM_BACKEND="stub", STUB_SERVER_URL=base_url,
+               CONVERSATION_STORE=f"sqlite:{os.path.join(tmp, 'conv.db')}")
+    env.pop("GROQ_API_KEY", None)
+    port = free_port()
+    app = start_app(args.app, port, env)
+    try:
+        print(f"{args.turns} chat turns in one session, reply of 60 tokens")
+        # Warm up imports and pooled clients
+        run_session(port, app.pid, 4)
+        for mode, results in run_session(port, app.pid, args.turns).items():
+            summarize(mode, results)
+    finally:
+        app.terminate()
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Tail latency with and without hedged requests
+
+Sends the same stream of requests to the local stub server, where a
+fraction of requests suffer a first-token latency spike, once plainly
+and once with hedging (a backup request after HEDGE_AFTER seconds
+without a first token). Reports p50/p95/p99 time to first token and
+total latency, plus the extra upstream requests hedging cost. Then
+checks that a primary rejected with 401 or 429 is raised without a
+backup request, and exits non-zero if either is hedged. Run from the
+repository root:
+
+    python benchmarks/bench_hedging.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+from src.chat_manager import ChatManager
+from src.hedging import HedgedStream
+from src.llm_pool import get_llm
+from src.personalities import PERSONALITIES
+from src.stub_server import start_stub_server, start_stub_server_process
+
+REQUESTS = 400
+WORKERS = 8
+HEDGE_AFTER = 0.15
+SPIKE_RATE = 0.05
+SPIKE_LATENCY = 1.5
+MODEL = "llama-3.1-8b-instant"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+
+def run(hedge_after):
+    ttfts, totals, hedged = [], [], []
+    lock = threading.Lock()
+    counter = iter(range(REQUESTS))
+
+    def worker():
+        manager = ChatManager("bench-key", PERSONALITIES["friendly_companion"], MODEL,
+                              backend="stub", summarize=False, hedge_after=hedge_after)
+        for i in counter:
+            manager.clear_memory()
+            started = time.perf_counter()
+            first = None
+            for _ in manager.stream_response(f"Quick question number {i}"):
+                if first is None:
+                    first = time.perf_counter()
+            done = time.perf_counter()
+            with lock:
+                ttfts.append(first - started)
+                totals.append(done - started)
+                hedged.append(manager.last_call.hedged)
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ttfts, totals, sum(hedged)
+
+
+def check_rejected(status):
+    """Stream against a stub that answers every request with status; return the upstream requests made"""
+    server = start_stub_server(error_rate=1, error_status=status, retry_after=0)
+    llm = get_llm("bench-key", MODEL, 0.7, base_url=server.base_url, backend="stub", max_retries=0)
+    stream = HedgedStream(llm, [HumanMessage(content="Quick question")], deadline=1.0)
+    started = time.perf_counter()
+    try:
+        list(stream)
+        error = None
+    except Exception as e:
+        error = e
+    elapsed = time.perf_counter() - started
+    # A wrongly fired backup would still be in flight; give it time to reach the server
+    time.sleep(0.2)
+    requests = server.requests
+    server.shutdown()
+    print(f"  {status}: {requests} upstream request(s), hedged {stream.hedged}, "
+          f"raised {type(error).__name__} after {elapsed * 1000:.0f}ms")
+    return requests
+
+
+def main():
+    server, base_url = start_stub_server_process(
+        reply_tokens=40, token_rate=2000, first_token_latency=0.03,
+        spike_rate=SPIKE_RATE, spike_latency=SPIKE_LATENCY, seed=7
+    )
+    os.environ["STUB_SERVER_URL"] = base_url
+
+    print(f"{REQUESTS} requests, {SPIKE_RATE:.0%} with a {SPIKE_LATENCY}s first-token spike")
+    print(f"{'mode':>18} | {'ttft p50':>8} {'p95':>7} {'p99':>7} | {'total p50':>9} {'p95':>7} {'p99':>7} | extra requests")
+    for label, hedge_after in [("no hedging", None), (f"hedge after {HEDGE_AFTER}s", HEDGE_AFTER)]:
+        ttfts, totals, hedged = run(hedge_after)
+        print(f"{label:>18} | {percentile(ttfts, 50):7.0f}ms {percentile(ttfts, 95):5.0f}ms "
+              f"{percentile(ttfts, 99):5.0f}ms | {percentile(totals, 50):8.0f}ms {percentile(totals, 95):5.0f}ms "
+              f"{percentile(totals, 99):5.0f}ms | {hedged} ({hedged / REQUESTS:.1%})")
+    server.terminate()
+
+    print("Primary rejected before any content")
+    failures = [status for status in (401, 429) if check_rejected(status) != 1]
+    for status in failures:
+        print(f"FAIL: a {status} was sent upstream more than once")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Long-term memory retrieval at 10k turns
+
+Builds a conversation of 10,000 exchanges: filler questions on assorted
+topics answered with stub replies, with facts about the user planted at
+random turns. Reports the cost of remembering a turn, the size of the
+index, the latency of recalling the top 3 older turns for a new message
+(embedding the message, scoring every turn, picking the best) and how
+often the planted fact is among them when asked about it later. Two of
+the questions share no words with their fact and are expected misses
+for a lexical embedder. Then repeats the recall with the conversation
+in a SQLite store and the index loading recalled text from it, as the
+app runs it, and exits non-zero if the index still holds the text of
+turns older than the verbatim history. Run from the repository root:
+
+    python benchmarks/bench_memory.py
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.context_window import ContextWindow
+from src.conversation_store import SQLiteConversationStore
+from src.memory import MemoryIndex
+from src.stub_server import reply_tokens
+
+TURNS = 10_000
+TOP_K = 3
+QUERIES = 1000
+RECENT_TURNS = 10
+
+TOPICS = [
+    "sourdough starters", "marathon training", "the French revolution", "Rust lifetimes",
+    "index funds", "growing tomatoes", "jazz chord voicings", "learning Japanese", "black holes",
+    "SQL window functions", "camping in the rain", "espresso extraction", "chess openings",
+    "renaissance painting", "Kubernetes networking", "negotiating a salary", "bird migration",
+    "writing a cover letter", "climate models", "knitting patterns"
+]
+TEMPLATES = [
+    "Can you explain {topic} in simple terms?", "What are common mistakes with {topic}?",
+    "Give me three tips about {topic}.", "How would you compare two approaches to {topic}?",
+    "Why do people find {topic} hard?", "What should a beginner read about {topic}?"
+]
+
+# (planted statement, question asked about it much later)
+FACTS = [
+    ("My sister Valentina moved to Lisbon last spring.", "Which city did my sister move to?"),
+    ("I'm allergic to shellfish, so keep recipes free of shrimp.", "Any shrimp dishes you'd suggest for me?"),
+    ("Our cat is called Pistachio and she is nine years old.", "How old is my cat Pistachio now?"),
+    ("I drive a 2014 Subaru Outback with a roof box.", "Will a kayak fit on my Subaru?"),
+    ("My thesis is about coral reef bleaching in the Maldives.", "Remind me what my thesis covers?"),
+    ("We're planning a wedding in Tuscany for September.", "What was the plan for the Tuscany wedding?"),
+    ("I work night shifts as an ICU nurse.", "How should I sleep around my night shifts?"),
+    ("My budget for the new laptop is 1200 euros.", "What was my laptop budget again?"),
+    ("I'm training for the Berlin marathon in 3 hours 30.", "What time am I aiming for in Berlin?"),
+    ("My favourite author is Ursula Le Guin.", "Recommend something like my favourite author."),
+    ("I keep bees on the roof of our apartment building.", "When should I check the rooftop beehives?"),
+    ("Our daughter Amara starts kindergarten in August.", "What should Amara pack for kindergarten?"),
+    ("I play the cello in a community orchestra on Thursdays.", "Which evening is my orchestra rehearsal?"),
+    ("My landlord refuses to fix the broken boiler.", "What can I do about the boiler and my landlord?"),
+    ("I'm vegetarian but I still eat eggs and cheese.", "Suggest dinner given my diet."),
+    ("My grandfather's watch is a 1962 Omega Seamaster.", "How do I service the Omega watch?"),
+    ("I use Neovim with a Lua config for everything.", "How do I add a plugin to my editor setup?"),
+    ("We adopted a greyhound named Biscuit from a rescue.", "Is Biscuit the greyhound ok off leash?"),
+    ("My mortgage rate resets in March to a variable rate.", "What happens to my mortgage in March?"),
+    ("I'm learning Portuguese before visiting my sister.", "Which language am I studying and why?")
+]
+
+
+def build_conversation(rng: random.Random) -> tuple:
+    """Message dicts for the conversation and the turn each fact is planted at"""
+    planted = dict(zip(rng.sample(range(TURNS // 2), len(FACTS)), range(len(FACTS))))
+    messages = []
+    for turn in range(TURNS):
+        if turn in planted:
+            question = FACTS[planted[turn]][0]
+        else:
+            question = rng.choice(TEMPLATES).format(topic=rng.choice(TOPICS))
+        answer = "".join(reply_tokens([{"content": f"{turn} {question}"}], rng.randint(30, 90)))
+        messages.append({"content": question, "is_user": True, "timestamp": "12:00:00"})
+        messages.append({"content": answer, "is_user": False, "timestamp": "12:00:00"})
+    return messages, {fact: turn for turn, fact in planted.items()}
+
+
+def main():
+    rng = random.Random(7)
+    messages, fact_turns = build_conversation(rng)
+    # Token counts are cached on the dicts as ChatManager's history does
+    history = ContextWindow()
+    for message in messages:
+        history.append(message)
+
+    index = MemoryIndex()
+    started = time.perf_counter()
+    for user_message, ai_message in zip(messages[::2], messages[1::2]):
+        index.add(user_message, ai_message)
+    elapsed = time.perf_counter() - started
+    print(f"{TURNS} turns remembered in {elapsed:.2f}s ({elapsed / TURNS * 1e6:.0f}us per turn), "
+          f"index {index.nbytes / 1e6:.1f} MB allocated, {len(index) * index.dim * 4 / 1e6:.1f} MB used")
+
+    # The most recent turns are in the verbatim history and are not recalled
+    recent = messages[-2 * RECENT_TURNS:]
+    queries = [rng.choice(TEMPLATES).format(topic=rng.choice(TOPICS)) for _ in range(QUERIES)]
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.recall(query, TOP_K, recent)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"recall top {TOP_K} of {TURNS}: p50 {statistics.median(timings):.2f}ms, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.2f}ms")
+
+    ranked = recalled = 0
+    for fact, (statement, question) in enumerate(FACTS):
+        planted = messages[2 * fact_turns[fact]]
+        found = [turn for _, turn, _ in index.search(question, TOP_K, index.older_than(recent), min_similarity=-1)]
+        ranked += fact_turns[fact] in found
+        hit = any(user_message is planted for user_message, _ in index.recall(question, TOP_K, recent))
+        recalled += hit
+        if not hit:
+            print(f"  not recalled: {question!r} (planted: {statement!r})")
+    print(f"planted facts ranked in the top {TOP_K}: {ranked}/{len(FACTS)}, "
+          f"recalled above the similarity threshold: {recalled}/{len(FACTS)}")
+
+    held = store_backed(messages, fact_turns, queries)
+    if held > RECENT_TURNS:
+        print(f"FAIL: the index holds the text of {held} turns, expected at most {RECENT_TURNS}")
+    sys.exit(1 if held > RECENT_TURNS else 0)
+
+
+def store_backed(messages: list, fact_turns: dict, queries: list) -> int:
+    """Recall with older turns' text loaded from a SQLite store; return the turns whose text the index holds"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteConversationStore(os.path.join(directory, "memory.db"))
+        # Copies, stored as the app stores each message (which sets its seq)
+        messages = [dict(message) for message in messages]
+        for message in messages:
+            store.append("bench", message)
+        index = MemoryIndex(load=partial(store.by_seq, "bench"))
+        for user_message, ai_message in zip(messages[::2], messages[1::2]):
+            index.add(user_message, ai_message)
+
+        recent = messages[-2 * RECENT_TURNS:]
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.recall(query, TOP_K, recent)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        recalled = 0
+        for fact, (_, question) in enumerate(FACTS):
+            planted = messages[2 * fact_turns[fact]]
+            recalled += any(user_message["seq"] == planted["seq"]
+                            for user_message, _ in index.recall(question, TOP_K, recent))
+        print(f"store-backed recall top {TOP_K} of {TURNS}: p50 {statistics.median(timings):.2f}ms, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.2f}ms, planted facts recalled {recalled}/{len(FACTS)}, "
+              f"text held for {index.held} turns")
+        return index.held
+
+
+if __name__ == "__main__":
+    main()
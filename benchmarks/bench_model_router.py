@@ -0,0 +1,48 @@
+"""
+Routing decisions and overhead of the "auto" model option
+
+Routes each personality's quick starters plus a scripted small-talk and
+technical mix, reporting how many turns go to the fast model and how
+long the heuristic takes per turn. Run from the repository root:
+
+    python benchmarks/bench_model_router.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.model_router import ModelRouter
+from src.personalities import PERSONALITIES
+
+SCRIPTED = [
+    "hi!", "how are you?", "thanks, that's great", "lol", "what should I eat tonight?",
+    "tell me a joke about cats", "good night", "ok cool",
+    "Explain the trade-offs between optimistic and pessimistic locking in Postgres",
+    "Why does my function `def f(x): return x[0]` raise IndexError on empty lists?",
+    "Compare merge sort and quicksort step by step, including worst cases",
+    "Design a rate limiter for a multi-tenant API and analyze its failure modes",
+    "What's the probability of rolling two sixes in 3 throws of 2 dice?"
+]
+REPEAT = 2000
+
+
+def main():
+    router = ModelRouter()
+    print(f"{'personality':>24} | fast / total")
+    for personality_id, personality in PERSONALITIES.items():
+        prompts = list(personality.example_prompts) + SCRIPTED
+        fast = sum(router.route(prompt, personality_id).model == router.fast_model for prompt in prompts)
+        print(f"{personality_id:>24} | {fast:>4} / {len(prompts)}")
+
+    prompts = SCRIPTED * REPEAT
+    start = time.perf_counter()
+    for prompt in prompts:
+        router.route(prompt, "professional_assistant")
+    elapsed = time.perf_counter() - start
+    print(f"routing overhead: {elapsed / len(prompts) * 1e6:.1f}us per turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measure the serialized size of everything the app sends per rerun
+
+Runs streamlit_app.py headlessly with AppTest and sums the protobuf
+size of every element and block in the resulting page, for the empty
+welcome page and after a short conversation. Run from the repository root:
+
+    python benchmarks/bench_rerun_payload.py
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+from src.stub_server import start_stub_server
+
+TURNS = 5
+
+
+def payload_bytes(node):
+    """Sum serialized proto sizes over an AppTest element tree"""
+    total = 0
+    proto = getattr(node, "proto", None)
+    if proto is not None:
+        total += proto.ByteSize()
+    for child in getattr(node, "children", {}).values():
+        total += payload_bytes(child)
+    return total
+
+
+def main():
+    server = start_stub_server(reply_tokens=60)
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_SERVER_URL"] = server.base_url
+    tmp = tempfile.mkdtemp()
+    os.environ["CONVERSATION_STORE"] = f"sqlite:{os.path.join(tmp, 'conv.db')}"
+
+    app = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=60)
+    app.run()
+    print(f"welcome page:        {payload_bytes(app._tree) / 1024:.1f} KB per rerun")
+
+    for turn in range(TURNS):
+        app.chat_input[0].set_value(f"Message {turn}").run()
+    app.run()
+    print(f"after {TURNS} exchanges:   {payload_bytes(app._tree) / 1024:.1f} KB per rerun")
+
+
+if __name__ == "__main__":
+    main()
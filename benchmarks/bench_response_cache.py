@@ -0,0 +1,55 @@
+"""
+Benchmark the response cache on repeated quick-starter prompts
+
+Each session clicks every personality's example prompts against a fake
+model with per-token delays, with the in-memory and SQLite backends.
+Run from the repository root:
+
+    python benchmarks/bench_response_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+from src.response_cache import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend
+
+SESSIONS = 5
+REPLY = "A helpful quick-starter answer. " * 8
+TOKEN_DELAY = 0.001
+
+
+def run(cache):
+    start = time.perf_counter()
+    for _ in range(SESSIONS):
+        for personality in PERSONALITIES.values():
+            for prompt in personality.example_prompts:
+                # Quick starters are the first message of a fresh chat
+                manager = ChatManager("bench-key", personality, cache=cache)
+                manager.llm = FakeListChatModel(responses=[REPLY], sleep=TOKEN_DELAY)
+                "".join(manager.stream_response(prompt))
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{SESSIONS} sessions x {sum(len(p.example_prompts) for p in PERSONALITIES.values())} quick starters")
+    print(f"  no cache: {run(None):.2f}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", MemoryCacheBackend()),
+            ("sqlite", SQLiteCacheBackend(os.path.join(tmp, "cache.db")))
+        ]
+        for label, backend in backends:
+            cache = ResponseCache(backend)
+            elapsed = run(cache)
+            print(f"  {label:>8}: {elapsed:.2f}s, hit rate {cache.hit_rate:.0%}, "
+                  f"latency saved {cache.latency_saved:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Exercise the request scheduler against injected failures
+
+Runs concurrent sessions against the local stub server in four setups:
+
+- 429s: 30% of requests are rate limited; lost turns with and without
+  the scheduler
+- dropped streams: 30% of streams break after 10 tokens; replies must
+  match the uninterrupted reply exactly (no duplicated text)
+- fairness: one heavy session floods the queue while light sessions send
+  a few messages; light-session latency with FIFO versus round-robin
+- requests per minute: admission rate from an empty bucket
+
+Exits non-zero if the scheduler loses a turn or a resumed reply differs
+from the uninterrupted one. Run from the repository root:
+
+    python benchmarks/bench_scheduler.py
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+from src.scheduler import RequestScheduler
+from src.stub_server import start_stub_server_process
+
+MODEL = "llama-3.1-8b-instant"
+REPLY_TOKENS = 40
+
+
+def make_manager(scheduler, session_id):
+    # Pooled clients keep the stub URL they were created with, so each stub gets its own key
+    return ChatManager(os.environ["STUB_SERVER_URL"], PERSONALITIES["professional_assistant"], MODEL, backend="stub",
+                       summarize=False, scheduler=scheduler, session_id=session_id)
+
+
+def run_sessions(scheduler, sessions, messages, session_of=lambda index: f"session-{index}"):
+    """Run sessions on threads; return per-message (prompt, latency, reply, call metrics, ok) records"""
+    records = []
+    lock = threading.Lock()
+
+    def session(index):
+        manager = make_manager(scheduler, session_of(index))
+        for turn in range(messages):
+            manager.clear_memory()
+            prompt = f"Session {index} message {turn}"
+            started = time.perf_counter()
+            reply = "".join(manager.stream_response(prompt))
+            ok = manager.pop_last_exchange() is not None
+            with lock:
+                records.append((prompt, time.perf_counter() - started, reply, manager.last_call, ok))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def with_stub(**options):
+    server, base_url = start_stub_server_process(reply_tokens=REPLY_TOKENS, first_token_latency=0.01, **options)
+    os.environ["STUB_SERVER_URL"] = base_url
+    return server
+
+
+def rate_limits() -> int:
+    """Return the turns lost with the scheduler"""
+    server = with_stub(error_rate=0.3, error_status=429, retry_after=0.1, seed=1)
+    print("429s on 30% of requests, 10 sessions x 10 messages")
+    for label, scheduler in [("no scheduler", None), ("scheduler", RequestScheduler())]:
+        records = run_sessions(scheduler, 10, 10)
+        lost = sum(not ok for *_, ok in records)
+        retries = sum(call.retries for _, _, _, call, _ in records)
+        latencies = sorted(latency for _, latency, *_ in records)
+        print(f"  {label:>12}: {lost} lost turns, {retries} scheduler retries, "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.0f}ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms")
+    server.terminate()
+    return lost
+
+
+def dropped_streams() -> int:
+    """Return the turns lost or replies that differ from an uninterrupted stream"""
+    # Replies are deterministic per prompt, so compare against uninterrupted streams
+    server = with_stub(seed=2)
+    expected = {prompt: reply for prompt, _, reply, _, _ in run_sessions(None, 10, 10)}
+    server.terminate()
+
+    server = with_stub(fail_after_tokens=10, drop_rate=0.3, seed=2)
+    records = run_sessions(RequestScheduler(), 10, 10)
+    exact = sum(reply == expected[prompt] for prompt, _, reply, _, _ in records)
+    retries = sum(call.retries for _, _, _, call, _ in records)
+    lost = sum(not ok for *_, ok in records)
+    print(f"30% of streams dropped after 10 tokens: {exact}/{len(records)} replies identical to an "
+          f"uninterrupted stream, {retries} resumed retries, {lost} lost turns")
+    server.terminate()
+    return len(records) - exact + lost
+
+
+def fairness():
+    server = with_stub(token_rate=2000)
+    print("fairness: 1 heavy session (40 concurrent requests) + 4 light sessions (3 each), 2 slots")
+    for label, session_of in [("FIFO", lambda index: "shared"), ("round-robin", lambda index: f"session-{index}")]:
+        scheduler = RequestScheduler(max_concurrent=2)
+        light = []
+        lock = threading.Lock()
+
+        def heavy(turn):
+            manager = make_manager(scheduler, session_of(0))
+            "".join(manager.stream_response(f"Heavy message {turn}"))
+
+        def light_session(index):
+            manager = make_manager(scheduler, session_of(index))
+            for turn in range(3):
+                started = time.perf_counter()
+                "".join(manager.stream_response(f"Light {index} message {turn}"))
+                with lock:
+                    light.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=heavy, args=(turn,)) for turn in range(40)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        light_threads = [threading.Thread(target=light_session, args=(i,)) for i in range(1, 5)]
+        for thread in light_threads:
+            thread.start()
+        for thread in threads + light_threads:
+            thread.join()
+        print(f"  {label:>12}: light-session latency mean {statistics.mean(light) * 1000:.0f}ms, "
+              f"max {max(light) * 1000:.0f}ms")
+    server.terminate()
+
+
+def requests_per_minute():
+    server = with_stub()
+    rpm = 600
+    scheduler = RequestScheduler(rpm=rpm, max_concurrent=32)
+    # The bucket starts full; empty it to time the refill-limited rate
+    scheduler.for_key(os.environ["STUB_SERVER_URL"]).requests_bucket.take(rpm, time.monotonic())
+    started = time.perf_counter()
+    records = run_sessions(scheduler, 10, 10)
+    elapsed = time.perf_counter() - started
+    print(f"rpm={rpm}: {len(records)} requests from an empty bucket took {elapsed:.1f}s "
+          f"({len(records) / elapsed * 60:.0f}/min)")
+    server.terminate()
+
+
+def main():
+    failures = rate_limits() + dropped_streams()
+    fairness()
+    requests_per_minute()
+    if failures:
+        print(f"FAIL: {failures} lost turns or replies with missing or duplicated text")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
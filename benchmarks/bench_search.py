@@ -0,0 +1,134 @@
+"""
+Full-text search over a million stored messages
+
+Generates 1,000,000 messages (10,000 conversations across all
+personalities and models, spread over a year, words drawn from a Zipf
+distribution) into a SQLite conversation store, with query words
+planted at known frequencies, then times searches with and without
+personality, model, date and session filters. Run from the repository root:
+
+    python benchmarks/bench_search.py [--messages 1000000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conversation_store import SQLiteConversationStore
+from src.context_window import MODEL_CONTEXT_WINDOWS
+from src.personalities import PERSONALITIES
+
+SESSION_MESSAGES = 100
+VOCABULARY = 30_000
+YEAR = 365 * 86400
+RUNS = 20
+
+# Planted word -> share of messages containing it
+PLANTED = {"lisbon": 0.0001, "invoice": 0.01, "deadline": 0.05, "project": 0.2}
+
+
+def vocabulary(rng: np.random.Generator) -> np.ndarray:
+    syllables = np.array(["ka", "lo", "mi", "ren", "to", "sa", "vel", "ur", "en", "tri", "po", "da", "ne", "ix"])
+    lengths = rng.integers(2, 5, VOCABULARY)
+    return np.array(["".join(rng.choice(syllables, n)) for n in lengths])
+
+
+def generate(store: SQLiteConversationStore, count: int, now: float):
+    rng = np.random.default_rng(7)
+    words = vocabulary(rng)
+    # Zipf-like word frequencies: the few most common words dominate, as in text
+    weights = 1.0 / np.arange(1, VOCABULARY + 1) ** 1.1
+    personalities = list(PERSONALITIES)
+    models = list(MODEL_CONTEXT_WINDOWS)
+    start = now - YEAR
+    batch = 50_000
+    with store._lock:
+        store._conn.execute("BEGIN")
+        for first in range(0, count, batch):
+            n = min(batch, count - first)
+            lengths = rng.integers(10, 80, n)
+            drawn = rng.choice(words, int(lengths.sum()), p=weights / weights.sum())
+            bounds = np.concatenate([[0], np.cumsum(lengths)])
+            planted = {word: rng.random(n) < share for word, share in PLANTED.items()}
+            rows = []
+            for i in range(n):
+                index = first + i
+                message = list(drawn[bounds[i]:bounds[i + 1]])
+                for word, mask in planted.items():
+                    if mask[i]:
+                        message[rng.integers(len(message))] = word
+                session = index // SESSION_MESSAGES
+                is_user = index % 2 == 0
+                rows.append((
+                    f"s{session}", index % SESSION_MESSAGES, int(is_user), " ".join(message), "12:00:00",
+                    personalities[session % len(personalities)],
+                    None if is_user else models[int(rng.integers(len(models)))],
+                    start + YEAR * index / count
+                ))
+            store._conn.executemany("""
+                INSERT INTO messages (session_id, seq, is_user, content, timestamp, personality, model, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        store._conn.execute("COMMIT")
+
+
+def timed(store, query, **filters) -> tuple:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        hits = store.search(query, **filters)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), len(hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search latency over generated conversations")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conv.db")
+        store = SQLiteConversationStore(path)
+        started = time.perf_counter()
+        generate(store, args.messages, now)
+        print(f"{args.messages} messages generated and indexed in {time.perf_counter() - started:.0f}s, "
+              f"database {os.path.getsize(path) / 1e6:.0f} MB")
+
+        personality = "professional_assistant"
+        model = "llama-3.1-8b-instant"
+        # Conversations of one visitor, spread over the year
+        sessions = args.messages // SESSION_MESSAGES
+        own = [f"s{session}" for session in range(sessions // 10, sessions, sessions // 5)]
+        cases = [
+            ("rare word (0.01%)", "lisbon", {}),
+            ("word in 1%", "invoice", {}),
+            ("word in 20%", "project", {}),
+            ("two words", "project deadline", {}),
+            ("word cut short (prefix)", "deadl", {}),
+            ("20% word, personality", "project", {"personality": personality}),
+            ("20% word, model", "project", {"model": model}),
+            ("20% word, last 7 days", "project", {"since": now - 7 * 86400}),
+            ("20% word, older than 300 days", "project", {"until": now - 300 * 86400}),
+            ("1% word, all filters, 30 days", "invoice",
+             {"personality": personality, "model": model, "since": now - 30 * 86400}),
+            ("rare word, personality", "lisbon", {"personality": personality}),
+            ("20% word, own session", "project", {"session_ids": own[-1:]}),
+            (f"20% word, {len(own)} own sessions", "project", {"session_ids": own}),
+            ("1% word, own sessions, 30 days", "invoice", {"session_ids": own, "since": now - 30 * 86400}),
+            ("no match", "zzqx", {})
+        ]
+        print(f"{'query':<34} {'p50':>8} {'max':>8}  hits")
+        for label, query, filters in cases:
+            p50, worst, hits = timed(store, query, **filters)
+            print(f"{label:<34} {p50:6.2f}ms {worst:6.2f}ms  {hits}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure per-session memory for the transcript plus prompt history
+
+Before: st.session_state.messages held dicts while ChatManager kept its
+own HumanMessage/AIMessage copies (the reply text was assembled twice,
+once by the UI and once by the manager). After: both views share the
+same message dicts. Run from the repository root:
+
+    python benchmarks/bench_session_memory.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, AIMessage
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+
+TURNS = [10, 50, 100]
+
+
+def reply_chunks(turn):
+    return [f"chunk{turn}-{i} " for i in range(150)]
+
+
+def before(turns):
+    messages, history = [], []
+    for turn in range(turns):
+        user_input = f"Question number {turn} " * 5
+        ui_text = ""
+        manager_text = ""
+        for chunk in reply_chunks(turn):
+            manager_text += chunk
+            ui_text += chunk
+        messages.append({"content": user_input, "is_user": True, "timestamp": "12:00:00",
+                         "personality": "professional_assistant"})
+        messages.append({"content": ui_text, "is_user": False, "timestamp": "12:00:00",
+                         "personality": "professional_assistant"})
+        history.append(HumanMessage(content=user_input))
+        history.append(AIMessage(content=manager_text))
+    return messages, history
+
+
+def after(turns):
+    manager = ChatManager("bench-key", PERSONALITIES["professional_assistant"], summarize=False)
+    manager.token_budget = 10 ** 9  # keep every turn, as the old 10-exchange cap did not apply here
+    messages = []
+    for turn in range(turns):
+        user_message = manager._new_message(f"Question number {turn} " * 5, True)
+        manager._save_exchange(user_message, "".join(reply_chunks(turn)))
+        messages.extend(manager.pop_last_exchange())
+    return messages, manager.chat_history
+
+
+def measure(build, turns):
+    tracemalloc.start()
+    result = build(turns)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    # Warm up imports and pooled clients outside the measurement
+    measure(after, 1)
+    print(f"{'turns':>6} | {'before KB':>9} | {'after KB':>9}")
+    for turns in TURNS:
+        print(f"{turns:>6} | {measure(before, turns) / 1024:>9.1f} | {measure(after, turns) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
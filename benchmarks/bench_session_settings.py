@@ -0,0 +1,127 @@
+"""
+Per-session settings under concurrency: no bleed between sessions
+
+Many threads, each standing in for a session, repeatedly pick a random
+personality and temperature the way the settings panel does (an
+override of the shared personality), create or reconfigure their
+ChatManager, wait for every other thread to do the same, and then check
+that their manager, its pooled LLM and the shared registry still hold
+what they expect. Also checks that writing to the registry, a
+personality or an override raises. Exits non-zero on any failure. Run
+from the repository root:
+
+    python benchmarks/bench_session_settings.py [--sessions 32] [--rounds 200]
+"""
+import argparse
+import dataclasses
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+
+TEMPERATURES = [round(0.1 * i, 1) for i in range(11)]
+MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"]
+
+
+def check_read_only() -> list:
+    """Attempt every kind of write to the shared settings; return those that did not raise"""
+    personality = PERSONALITIES["professional_assistant"]
+    override = personality.override(temperature=0.1)
+    attempts = {
+        "assign registry entry": lambda: PERSONALITIES.__setitem__("professional_assistant", override),
+        "add registry entry": lambda: PERSONALITIES.__setitem__("new", personality),
+        "delete registry entry": lambda: PERSONALITIES.__delitem__("professional_assistant"),
+        "assign personality temperature": lambda: setattr(personality, "temperature", 0.1),
+        "assign personality prompt": lambda: setattr(personality, "system_prompt", ""),
+        "add personality attribute": lambda: setattr(personality, "extra", 1),
+        "assign override temperature": lambda: setattr(override, "temperature", 0.2),
+        "assign override base field": lambda: setattr(override, "name", "Changed"),
+        "append example prompt": lambda: personality.example_prompts.append("Changed")
+    }
+    failures = []
+    for label, attempt in attempts.items():
+        try:
+            attempt()
+        except (TypeError, AttributeError, dataclasses.FrozenInstanceError):
+            continue
+        failures.append(label)
+    return failures
+
+
+def run_sessions(sessions: int, rounds: int) -> list:
+    """Run the sessions; return a description of every setting one saw that it did not choose"""
+    defaults = {key: personality.temperature for key, personality in PERSONALITIES.items()}
+    failures = []
+    lock = threading.Lock()
+    # Every session applies its settings before any checks them
+    applied = threading.Barrier(sessions)
+
+    def session(index: int):
+        rng = random.Random(index)
+        manager = None
+        for round_number in range(rounds):
+            key = rng.choice(list(PERSONALITIES))
+            temperature = rng.choice(TEMPERATURES)
+            model = rng.choice(MODELS)
+            personality = PERSONALITIES[key].override(temperature=temperature)
+            if manager is None or round_number % 4 == 0:
+                manager = ChatManager("bench-key", personality, model, backend="stub", summarize=False)
+            else:
+                manager.configure(personality=personality, model_name=model)
+            applied.wait()
+            seen = {
+                "personality": manager.personality.id,
+                "temperature": manager.temperature,
+                # ChatGroq raises a temperature of 0 to 1e-8
+                "llm temperature": round(manager.llm.temperature, 6),
+                "model": manager.model_name,
+                "system prompt": manager.system_message.content
+            }
+            expected = {
+                "personality": key,
+                "temperature": temperature,
+                "llm temperature": temperature,
+                "model": model,
+                "system prompt": PERSONALITIES[key].system_prompt
+            }
+            wrong = [name for name in expected if seen[name] != expected[name]]
+            wrong += [f"registry {other}" for other, value in defaults.items()
+                      if PERSONALITIES[other].temperature != value]
+            if wrong:
+                with lock:
+                    failures.append(f"session {index} round {round_number}: {', '.join(wrong)}")
+            applied.wait()
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-session settings do not bleed between sessions")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    failures = [f"writable: {label}" for label in check_read_only()]
+    started = time.perf_counter()
+    failures += run_sessions(args.sessions, args.rounds)
+    print(f"{args.sessions} sessions x {args.rounds} rounds of random personality, temperature and model "
+          f"in {time.perf_counter() - started:.1f}s")
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    print(f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Upstream calls for concurrent identical requests, with and without single-flight
+
+Many sessions, each with its own ChatManager, send the same quick
+starter for the same personality at once, as when a crowd clicks the
+same button. Their start times are spread over the first part of the
+reply, so most join a stream already under way. A second round sends
+a few distinct prompts the same way. The local stub server counts the
+upstream requests. The response cache is off, so only in-flight
+sharing is measured. Checks that every session received the full reply,
+identical to a solo request's, and reports time to first token and
+total time. A last round splits the sessions between two API keys and
+checks that each key makes its own upstream request. Run from the
+repository root:
+
+    python benchmarks/bench_single_flight.py [--sessions 64]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+from src.single_flight import SingleFlight
+from src.stub_server import start_stub_server
+
+PERSONALITY = "friendly_companion"
+MODEL = "llama-3.1-8b-instant"
+REPLY_TOKENS = 60
+TOKEN_RATE = 200
+FIRST_TOKEN_LATENCY = 0.2
+# Sessions start at random within this many seconds
+SPREAD = 0.4
+
+
+def ask(prompt: str, single_flight, api_key: str = "bench-key") -> tuple:
+    """Send one prompt from a fresh session; return (reply, ttft, total, coalesced)"""
+    manager = ChatManager(api_key, PERSONALITIES[PERSONALITY], MODEL, backend="stub",
+                          summarize=False, single_flight=single_flight)
+    started = time.perf_counter()
+    first = None
+    pieces = []
+    for piece in manager.stream_response(prompt):
+        if first is None:
+            first = time.perf_counter()
+        pieces.append(piece)
+    return "".join(pieces), first - started, time.perf_counter() - started, manager.last_call.coalesced
+
+
+def run(server, prompts: list, sessions: int, single_flight, keys: tuple = ("bench-key",)) -> tuple:
+    """Send prompts round-robin from concurrent sessions; return (results by prompt, upstream requests)"""
+    rng = random.Random(7)
+    delays = [rng.uniform(0, SPREAD) for _ in range(sessions)]
+    results = {prompt: [] for prompt in prompts}
+    lock = threading.Lock()
+    gate = threading.Barrier(sessions)
+
+    def session(i):
+        prompt = prompts[i % len(prompts)]
+        gate.wait()
+        time.sleep(delays[i])
+        result = ask(prompt, single_flight, keys[i % len(keys)])
+        with lock:
+            results[prompt].append(result)
+
+    before = server.requests
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, server.requests - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight coalescing of identical requests")
+    parser.add_argument("--sessions", type=int, default=64)
+    args = parser.parse_args()
+
+    server = start_stub_server(reply_tokens=REPLY_TOKENS, token_rate=TOKEN_RATE,
+                               first_token_latency=FIRST_TOKEN_LATENCY)
+    os.environ["STUB_SERVER_URL"] = server.base_url
+    starters = PERSONALITIES[PERSONALITY].example_prompts
+    expected = {prompt: ask(prompt, None)[0] for prompt in starters}
+
+    print(f"{args.sessions} sessions starting within {SPREAD}s, replies of {REPLY_TOKENS} tokens "
+          f"at {TOKEN_RATE}/s after {FIRST_TOKEN_LATENCY}s")
+    print(f"{'mode':<26} {'prompts':>7} {'upstream':>8} {'joined':>6} {'ttft p50':>9} {'max':>7} "
+          f"{'total p50':>9}  replies")
+    failures = 0
+    for prompts in (starters[:1], starters):
+        for label, single_flight in (("one request per session", None), ("single-flight", SingleFlight())):
+            results, upstream = run(server, prompts, args.sessions, single_flight)
+            flat = [result for replies in results.values() for result in replies]
+            complete = sum(reply == expected[prompt] for prompt, replies in results.items() for reply, *_ in replies)
+            ttfts = [ttft * 1000 for _, ttft, _, _ in flat]
+            totals = [total * 1000 for _, _, total, _ in flat]
+            joined = sum(coalesced for *_, coalesced in flat)
+            print(f"{label:<26} {len(prompts):>7} {upstream:>8} {joined:>6} {statistics.median(ttfts):7.0f}ms "
+                  f"{max(ttfts):5.0f}ms {statistics.median(totals):7.0f}ms  {complete}/{len(flat)} complete")
+            if complete != len(flat) or single_flight is not None and upstream != len(prompts):
+                failures += 1
+            if single_flight is not None and len(single_flight):
+                print(f"FAIL: {len(single_flight)} flights left in the registry")
+                failures += 1
+
+    keys = ("bench-key", "other-key")
+    _, upstream = run(server, starters[:1], args.sessions, SingleFlight(), keys)
+    print(f"single-flight with {len(keys)} API keys: {upstream} upstream requests")
+    if upstream != len(keys):
+        print("FAIL: sessions with different API keys shared a stream")
+        failures += 1
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
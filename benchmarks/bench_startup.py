@@ -0,0 +1,155 @@
+"""
+Cold start: import time and time to first paint
+
+Two measurements, both against a fresh process:
+
+- Imports: runs `python -X importtime` over the modules the app script
+  imports at top level (after Streamlit itself, which the server has
+  loaded before any script runs) and reports their cumulative import
+  time and the heaviest packages. Fails if LangChain or the Groq SDK is
+  among them, or if the total exceeds --budget milliseconds, so it can
+  guard against an eager import creeping back in.
+- First paint: starts `streamlit run` against the local stub server,
+  opens a session over the websocket protocol and times the first
+  script run, then the first chat reply, sent either right after first
+  paint or once the background import prewarm has had time to finish,
+  with the prewarm disabled (PREWARM_IMPORTS=0), and without the source
+  file watcher, which rescans sys.modules after any run that follows
+  new imports (server.fileWatcherType = "none", as in production).
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--app streamlit_app.py] [--budget 150]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from websockets.sync.client import connect
+from bench_fragment_reruns import chat_turn, find_chat_input, free_port, rerun, start_app
+from src.stub_server import start_stub_server_process
+
+# Packages that must not be imported before the first message
+DEFERRED_PACKAGES = ("langchain_core", "langchain_groq", "groq")
+IMPORT_RUNS = 5
+
+
+def app_imports(app: str) -> list:
+    """Modules imported at the top level of an app script"""
+    with open(os.path.join(ROOT, app), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return [module for module in dict.fromkeys(modules) if module.split(".")[0] != "streamlit"]
+
+
+def import_profile(modules: list) -> tuple:
+    """
+    Import modules after Streamlit in a fresh interpreter
+
+    Returns:
+        (total microseconds, {top-level package: self microseconds})
+    """
+    code = "import streamlit\n" + "".join(f"import {module}\n" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    total, packages, after_streamlit = 0, {}, False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        nested = len(name) - len(name.lstrip()) > 1
+        name = name.strip()
+        if not after_streamlit:
+            after_streamlit = name == "streamlit" and not nested
+            continue
+        if not nested:
+            total += int(cumulative_us)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return total, packages
+
+
+def first_paint(app: str, env: dict, wait: float) -> tuple:
+    """
+    Time the first session of a fresh server
+
+    Args:
+        app: App script, relative to the repository root
+        env: Server environment
+        wait: Seconds between first paint and the first message
+
+    Returns:
+        (seconds to first paint, seconds to the first reply)
+    """
+    port = free_port()
+    process = start_app(app, port, env)
+    try:
+        with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                     max_size=None) as ws:
+            paint, _, _, messages = rerun(ws)
+            widget_id, fragment_id = find_chat_input(messages)
+            time.sleep(wait)
+            reply, _, _, _ = chat_turn(ws, widget_id, "Hello there", fragment_id)
+        return paint, reply
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first paint")
+    parser.add_argument("--app", default="streamlit_app.py", help="App script, relative to the repository root")
+    parser.add_argument("--budget", type=float, default=150.0,
+                        help="Maximum import time of the app's own imports, in milliseconds")
+    args = parser.parse_args()
+
+    modules = app_imports(args.app)
+    profiles = [import_profile(modules) for _ in range(IMPORT_RUNS)]
+    total_ms = statistics.median(total for total, _ in profiles) / 1000
+    packages = profiles[-1][1]
+    print(f"App imports after streamlit: {total_ms:.0f}ms (median of {IMPORT_RUNS})")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {package:<24} {self_us / 1000:6.1f}ms")
+
+    stub, base_url = start_stub_server_process(reply_tokens=20)
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, LLM_BACKEND="stub", STUB_SERVER_URL=base_url,
+               CONVERSATION_STORE=f"sqlite:{os.path.join(tmp, 'conv.db')}")
+    env.pop("GROQ_API_KEY", None)
+    try:
+        print("First session of a fresh server")
+        for label, extra, wait in [
+            ("prewarm, message at once", {}, 0.0),
+            ("prewarm, message after 3s", {}, 3.0),
+            ("no prewarm, message after 3s", {"PREWARM_IMPORTS": "0"}, 3.0),
+            ("no file watcher, after 3s", {"STREAMLIT_SERVER_FILE_WATCHER_TYPE": "none"}, 3.0)
+        ]:
+            paint, reply = first_paint(args.app, dict(env, **extra), wait)
+            print(f"  {label:<30} first paint {paint * 1000:6.0f}ms | first reply {reply * 1000:6.0f}ms")
+    finally:
+        stub.terminate()
+
+    failures = [package for package in DEFERRED_PACKAGES if package in packages]
+    if failures:
+        print(f"FAIL: imported before the first message: {', '.join(failures)}")
+    if total_ms > args.budget:
+        print(f"FAIL: app imports take {total_ms:.0f}ms, budget {args.budget:.0f}ms")
+        failures.append("budget")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark render calls and payload bytes per streamed reply
+
+Compares re-rendering the whole reply on every chunk with
+StreamingRenderer. Also checks that the first chunk is shown at once and
+that the empty chunk ChatManager streams before a retry's backoff shows
+everything buffered; exits non-zero if not. Run from the repository root:
+
+    python benchmarks/bench_streaming_renderer.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ui_components import StreamingRenderer
+
+REPLY_TOKENS = [200, 1000, 2000]
+TOKEN_INTERVAL = 0.002  # ~500 tokens/sec, typical for Groq
+
+
+class CountingPlaceholder:
+    """Stands in for st.empty() and counts what would be sent"""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.shown = ""
+
+    def markdown(self, text):
+        self.calls += 1
+        self.bytes += len(text.encode("utf-8"))
+        self.shown = text
+
+
+def tokens(count):
+    for i in range(count):
+        time.sleep(TOKEN_INTERVAL)
+        yield f"word{i % 97} "
+
+
+def naive(count):
+    placeholder = CountingPlaceholder()
+    response_text = ""
+    for chunk in tokens(count):
+        response_text += chunk
+        placeholder.markdown(response_text)
+    return placeholder.calls, placeholder.bytes
+
+
+def buffered(count):
+    placeholder = CountingPlaceholder()
+    renderer = StreamingRenderer(placeholder)
+    for chunk in tokens(count):
+        renderer.write(chunk)
+    renderer.finalize()
+    return placeholder.calls, placeholder.bytes
+
+
+def check_flushes() -> list:
+    """Return what the renderer failed to show when it should have"""
+    failures = []
+    placeholder = CountingPlaceholder()
+    renderer = StreamingRenderer(placeholder)
+    renderer.write("First ")
+    if placeholder.shown != "First " + renderer.cursor:
+        failures.append("first chunk not rendered at once")
+    # Within min_interval of the first flush, so these stay buffered
+    for chunk in ["buffered ", "before ", "a retry "]:
+        renderer.write(chunk)
+    renderer.write("")
+    if placeholder.shown != renderer.text + renderer.cursor:
+        failures.append("buffered text not rendered before the retry backoff")
+    return failures
+
+
+def main():
+    print(f"{'tokens':>6} | {'naive calls':>11} {'naive KB':>10} | {'buffered calls':>14} {'buffered KB':>11}")
+    for count in REPLY_TOKENS:
+        naive_calls, naive_bytes = naive(count)
+        buffered_calls, buffered_bytes = buffered(count)
+        print(f"{count:>6} | {naive_calls:>11} {naive_bytes / 1024:>10.1f} | "
+              f"{buffered_calls:>14} {buffered_bytes / 1024:>11.1f}")
+    failures = check_flushes()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
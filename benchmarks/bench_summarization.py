@@ -0,0 +1,101 @@
+"""
+Prompt size and latency over a long scripted conversation
+
+Runs the same 200-turn conversation against the local stub server twice:
+once dropping evicted turns (the previous behaviour) and once folding
+them into a rolling summary. Reports prompt tokens per turn, as counted
+by the server, and end-to-end latency per turn. Then checks that a
+follow-up sent right after a reply longer than the verbatim history cap
+still carries that exchange, with and without summarization, and exits
+non-zero if not. Run from the repository root:
+
+    python benchmarks/bench_summarization.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from src.chat_manager import ChatManager
+from src.personalities import PERSONALITIES
+from src.stub_server import start_stub_server_process
+
+TURNS = 200
+REPORT_AT = [1, 10, 25, 50, 100, 150, 200]
+MODEL = "llama-3.3-70b-versatile"
+# Stub words are about 1.3 estimated tokens each, so a reply of about 1.7k tokens
+LONG_REPLY_TOKENS = 1300
+
+
+def user_turn(turn):
+    return f"Turn {turn}: tell me more about step {turn} of the plan, " + "with some detail " * (turn % 7)
+
+
+def run(summarize):
+    manager = ChatManager("bench-key", PERSONALITIES["professional_assistant"], MODEL,
+                          backend="stub", summarize=summarize)
+    prompt_tokens, latencies = [], []
+    for turn in range(1, TURNS + 1):
+        started = time.perf_counter()
+        "".join(manager.stream_response(user_turn(turn)))
+        latencies.append(time.perf_counter() - started)
+        prompt_tokens.append(manager.last_call.prompt_tokens)
+    if manager.summary is not None:
+        manager.summary.wait()
+    return manager, prompt_tokens, latencies
+
+
+def check_follow_up() -> list:
+    """Send a follow-up after a long reply; return the modes whose prompt lost that reply"""
+    server, base_url = start_stub_server_process(reply_tokens=LONG_REPLY_TOKENS)
+    os.environ["STUB_SERVER_URL"] = base_url
+    failures = []
+    for label, summarize in [("drop oldest", False), ("summarize", True)]:
+        # Pooled clients keep the stub URL they were created with, so this stub gets its own key
+        manager = ChatManager(base_url, PERSONALITIES["professional_assistant"], MODEL,
+                              backend="stub", summarize=summarize)
+        for turn in range(1, 4):
+            "".join(manager.stream_response(user_turn(turn)))
+        reply = manager.chat_history.messages()[-1]
+        prompt = manager._build_messages("Expand on point 3")
+        kept = any(isinstance(message, AIMessage) and message.content == reply["content"] for message in prompt)
+        print(f"  {label:>11}: follow-up after a {reply['tokens']}-token reply "
+              f"{'keeps' if kept else 'LOST'} it ({len(prompt)} prompt messages)")
+        if not kept:
+            failures.append(label)
+        if manager.summary is not None:
+            manager.summary.wait()
+    server.terminate()
+    return failures
+
+
+def main():
+    # The stub runs in its own process so background folds do not slow it down
+    server, base_url = start_stub_server_process(reply_tokens=120, token_rate=4000, first_token_latency=0.02)
+    os.environ["STUB_SERVER_URL"] = base_url
+
+    print(f"{TURNS}-turn conversation, prompt tokens at turn " + ", ".join(map(str, REPORT_AT)))
+    for label, summarize in [("drop oldest", False), ("summarize", True)]:
+        manager, prompt_tokens, latencies = run(summarize)
+        at = ", ".join(str(prompt_tokens[turn - 1]) for turn in REPORT_AT)
+        ordered = sorted(latencies)
+        print(f"  {label:>11}: {at}")
+        print(f"  {'':>11}  mean {statistics.mean(prompt_tokens):.0f} tokens/turn, "
+              f"{sum(prompt_tokens)} total; latency mean {statistics.mean(latencies) * 1000:.1f}ms, "
+              f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:.1f}ms")
+        if manager.summary is not None:
+            print(f"  {'':>11}  {manager.summary.folds} summary folds, "
+                  f"summary {manager.summary.tokens} tokens")
+    server.terminate()
+
+    failures = check_follow_up()
+    for label in failures:
+        print(f"FAIL: {label}: the follow-up's prompt lost the previous exchange")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
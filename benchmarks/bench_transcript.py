@@ -0,0 +1,79 @@
+"""
+Benchmark rerun time versus transcript length
+
+Renders a transcript with the old render-everything loop and with
+render_transcript using Streamlit's AppTest. Run from the repository root:
+
+    python benchmarks/bench_transcript.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+TRANSCRIPT_LENGTHS = [10, 100, 300, 1000]
+RERUNS = 5
+
+
+def full_script(root):
+    import sys
+    sys.path.insert(0, root)
+    import streamlit as st
+    from src.personalities import PERSONALITIES
+    from src.ui_components import render_message
+
+    for message in st.session_state.messages:
+        render_message(
+            message['content'],
+            message['is_user'],
+            PERSONALITIES[message['personality']],
+            message['timestamp']
+        )
+
+
+def windowed_script(root):
+    import sys
+    sys.path.insert(0, root)
+    import streamlit as st
+    from src.personalities import PERSONALITIES
+    from src.ui_components import render_transcript
+
+    render_transcript(st.session_state.messages, PERSONALITIES, "professional_assistant")
+
+
+def make_messages(count):
+    return [
+        {
+            "content": f"Message {i} " + "lorem ipsum " * 30,
+            "is_user": i % 2 == 0,
+            "timestamp": "12:00:00",
+            "personality": "professional_assistant"
+        }
+        for i in range(count)
+    ]
+
+
+def rerun_ms(script, messages):
+    app = AppTest.from_function(script, args=(ROOT,), default_timeout=60)
+    app.session_state["messages"] = messages
+    app.run()  # warm up imports
+    start = time.perf_counter()
+    for _ in range(RERUNS):
+        app.run()
+    return (time.perf_counter() - start) / RERUNS * 1000
+
+
+def main():
+    print(f"{'messages':>8} | {'full ms':>8} | {'windowed ms':>11}")
+    for count in TRANSCRIPT_LENGTHS:
+        messages = make_messages(count)
+        print(f"{count:>8} | {rerun_ms(full_script, messages):>8.1f} | "
+              f"{rerun_ms(windowed_script, messages):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Headless load test simulating many concurrent chat sessions
+
+Each session is a thread (as Streamlit runs one script thread per
+session) driving its own ChatManager against a local fake Groq server
+with a configurable token rate. While the sessions run, the full app is
+rerun headlessly with AppTest to measure how responsive the pod stays.
+Runs offline and writes a JSON report that can be compared across runs:
+
+    python benchmarks/load_test.py --sessions 1 10 100 500 --output load_report.json
+    python benchmarks/load_test.py --baseline load_report.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.stub_server import start_stub_server_process
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentiles(values: list, *points) -> dict:
+    """Selected percentiles in milliseconds"""
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    return {
+        f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+        for p in points
+    }
+
+
+def run_level(sessions: int, args) -> dict:
+    from src.chat_manager import ChatManager
+    from src.personalities import PERSONALITIES
+    from streamlit.testing.v1 import AppTest
+
+    personalities = list(PERSONALITIES.values())
+    lock = threading.Lock()
+    ttfts, session_rates = [], []
+    errors = 0
+    managers = []
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(index):
+        nonlocal errors
+        manager = ChatManager("load-test-key", personalities[index % len(personalities)], args.model)
+        barrier.wait()
+        tokens = 0
+        started = time.perf_counter()
+        for turn in range(args.messages):
+            sent = time.perf_counter()
+            first = None
+            for _ in manager.stream_response(f"Session {index} message {turn}"):
+                if first is None:
+                    first = time.perf_counter()
+                tokens += 1
+            failed = manager.pop_last_exchange() is None
+            with lock:
+                if failed:
+                    errors += 1
+                elif first is not None:
+                    ttfts.append(first - sent)
+        elapsed = time.perf_counter() - started
+        with lock:
+            session_rates.append(tokens / elapsed if elapsed else 0.0)
+            managers.append(manager)
+
+    probe = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=120)
+    probe.run()
+
+    rss_before = rss_bytes()
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+
+    # Rerun the app while the sessions stream, tracking thread count as we go
+    reruns = []
+    peak_threads = threading.active_count()
+    while any(thread.is_alive() for thread in threads):
+        peak_threads = max(peak_threads, threading.active_count())
+        rerun_start = time.perf_counter()
+        probe.run()
+        reruns.append(time.perf_counter() - rerun_start)
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    aggregate_rate = sum(session_rates)
+    return {
+        "sessions": sessions,
+        "requests": sessions * args.messages,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "rerun_latency_ms": percentiles(reruns, 50, 95),
+        "ttft_ms": percentiles(ttfts, 50, 95, 99),
+        "tokens_per_sec": {
+            "per_session_mean": round(statistics.mean(session_rates), 1) if session_rates else 0.0,
+            "aggregate": round(aggregate_rate, 1)
+        },
+        "memory_per_session_kb": round(max(0, rss_after - rss_before) / sessions / 1024, 1),
+        "peak_threads": peak_threads
+    }
+
+
+def print_level(level: dict, baseline: dict = None):
+    def delta(path):
+        if baseline is None:
+            return ""
+        old, new = baseline, level
+        for key in path:
+            old, new = old.get(key) if old else None, new.get(key)
+        if not old or new is None:
+            return ""
+        return f" ({(new - old) / old:+.0%})"
+
+    print(f"{level['sessions']:>4} sessions: "
+          f"rerun p95 {level['rerun_latency_ms']['p95']}ms{delta(['rerun_latency_ms', 'p95'])}, "
+          f"ttft p95 {level['ttft_ms']['p95']}ms{delta(['ttft_ms', 'p95'])}, "
+          f"{level['tokens_per_sec']['per_session_mean']} tok/s/session"
+          f"{delta(['tokens_per_sec', 'per_session_mean'])}, "
+          f"{level['memory_per_session_kb']} KB/session{delta(['memory_per_session_kb'])}, "
+          f"{level['peak_threads']} threads, {level['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test concurrent chat sessions against a local fake Groq")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--messages", type=int, default=3, help="Messages sent by each session")
+    parser.add_argument("--reply-tokens", type=int, default=50)
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Fake server tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Fake server seconds to first token")
+    parser.add_argument("--model", default="llama-3.1-8b-instant")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    # The fake server runs in its own process so it does not compete for the GIL
+    server, base_url = start_stub_server_process(
+        reply_tokens=args.reply_tokens,
+        token_rate=args.token_rate,
+        first_token_latency=args.first_token_latency
+    )
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_SERVER_URL"] = base_url
+    os.environ["CONVERSATION_STORE"] = f"sqlite:{os.path.join(tempfile.mkdtemp(), 'conversations.db')}"
+
+    baseline_levels = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_levels = {level["sessions"]: level for level in json.load(f)["levels"]}
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(sessions, args)
+        levels.append(level)
+        print_level(level, baseline_levels.get(sessions))
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "messages": args.messages,
+            "reply_tokens": args.reply_tokens,
+            "token_rate": args.token_rate,
+            "first_token_latency": args.first_token_latency,
+            "model": args.model
+        },
+        "levels": levels
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Chat model backends available to ChatManager
+
+A backend is a factory building a LangChain chat model from the session
+settings. "groq" talks to the Groq API; "stub" talks to the bundled
+stub server (src/stub_server.py) so the app runs offline. Further
+backends can be added with register_backend().
+
+The default backend is read from LLM_BACKEND and the stub server
+address from STUB_SERVER_URL. LangChain and the Groq SDK are imported
+when a model is first built, so the app can import this module (and
+render) without paying their import cost.
+"""
+import os
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+DEFAULT_BACKEND = "groq"
+DEFAULT_STUB_URL = "http://127.0.0.1:8765"
+
+# Backend name -> factory(api_key, model_name, temperature, max_tokens, http_client, base_url, max_retries, streaming)
+BACKENDS = {}
+
+
+def register_backend(name: str, factory: Callable[..., "BaseChatModel"]):
+    """
+    Make a backend available by name
+
+    Args:
+        name: Backend name, as used in LLM_BACKEND
+        factory: Callable taking (api_key, model_name, temperature, max_tokens,
+            http_client, base_url, max_retries, streaming) and returning a chat model
+    """
+    BACKENDS[name] = factory
+
+
+def _groq_backend(api_key: str, model_name: str, temperature: float, max_tokens: int,
+                  http_client=None, base_url: str = None, max_retries: int = None,
+                  streaming: bool = True) -> "BaseChatModel":
+    from langchain_groq import ChatGroq
+
+    params = {}
+    if base_url:
+        params["base_url"] = base_url
+    if max_retries is not None:
+        params["max_retries"] = max_retries
+    return ChatGroq(
+        groq_api_key=api_key,
+        model_name=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        streaming=streaming,
+        http_client=http_client,
+        **params
+    )
+
+
+def _stub_backend(api_key: str, model_name: str, temperature: float, max_tokens: int,
+                  http_client=None, base_url: str = None, max_retries: int = None,
+                  streaming: bool = True) -> "BaseChatModel":
+    # The stub speaks the Groq protocol and accepts any key
+    base_url = base_url or os.getenv("STUB_SERVER_URL", DEFAULT_STUB_URL)
+    return _groq_backend(api_key or "stub", model_name, temperature, max_tokens, http_client, base_url,
+                         max_retries, streaming)
+
+
+register_backend("groq", _groq_backend)
+register_backend("stub", _stub_backend)
+
+
+def default_backend() -> str:
+    """Get the backend configured with LLM_BACKEND"""
+    return os.getenv("LLM_BACKEND", DEFAULT_BACKEND)
+
+
+def requires_api_key(backend: str) -> bool:
+    """Whether a backend needs a real Groq API key"""
+    return backend != "stub"
+
+
+def create_llm(backend: str, api_key: str, model_name: str, temperature: float, max_tokens: int,
+               http_client=None, base_url: str = None, max_retries: int = None,
+               streaming: bool = True) -> "BaseChatModel":
+    """
+    Build a chat model with the named backend
+
+    Args:
+        backend: Registered backend name
+        api_key: API key
+        model_name: Model to use
+        temperature: Sampling temperature
+        max_tokens: Maximum completion tokens
+        http_client: Optional shared httpx.Client
+        base_url: Optional API base URL override
+        max_retries: Client-level retries (None keeps the client default)
+        streaming: Whether invoke() streams too (stream() always does)
+
+    Returns:
+        Chat model
+    """
+    factory = BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown LLM backend: {backend!r} (available: {', '.join(sorted(BACKENDS))})")
+    return factory(api_key, model_name, temperature, max_tokens, http_client, base_url, max_retries, streaming)
@@ -0,0 +1,245 @@
+"""
+Run prompt sets through ChatManager offline, concurrently
+
+Usage:
+    python -m src.batch_eval prompts.jsonl results.jsonl [--concurrency 16]
+        [--personality ID] [--model MODEL] [--backend NAME]
+
+Each input line is a JSON object with a "prompt" (one turn) or "turns"
+(a multi-turn script sent in order to one conversation), and optionally
+"id", "personality", "model" and "temperature". Records without an id
+are identified by their line number. Each record runs on its own
+ChatManager, up to --concurrency at a time, through the shared request
+scheduler, and its result is appended to the output as soon as it
+completes, so output order follows completion, not input.
+
+Rerunning with the same output file resumes: records already completed
+without an error are skipped, and failed ones are run again (the newest
+line for an id is the one that counts).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.backends import default_backend, requires_api_key
+from src.personalities import PERSONALITIES
+from src.scheduler import get_scheduler
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+
+def read_records(path: str):
+    """
+    Read evaluation records
+
+    Args:
+        path: Input JSONL file
+
+    Yields:
+        (record id, record) pairs; unparseable lines yield an error string
+        instead of a record
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield f"line-{number}", f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield f"line-{number}", "Record is not a JSON object"
+                continue
+            yield str(record.get("id", f"line-{number}")), record
+
+
+def completed_ids(path: str) -> set:
+    """
+    Get the ids already completed in an output file
+
+    A truncated last line (from an interrupted run) is ignored, even when
+    it ends inside a multi-byte character.
+
+    Args:
+        path: Output JSONL file, which may not exist yet
+
+    Returns:
+        Ids whose newest result has no error
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                result = json.loads(line.decode("utf-8", errors="replace"))
+            except json.JSONDecodeError:
+                continue
+            if result.get("error") is None:
+                done.add(result["id"])
+            else:
+                done.discard(result["id"])
+    return done
+
+
+def run_record(record_id: str, record: dict, api_key: str, backend: str = None, scheduler=None,
+               personality_id: str = None, model_name: str = DEFAULT_MODEL) -> dict:
+    """
+    Run one record's turns through a fresh ChatManager
+
+    The script stops at the first failed turn.
+
+    Args:
+        record_id: Record id
+        record: Input record
+        api_key: API key
+        backend: LLM backend name, defaults to LLM_BACKEND
+        scheduler: Optional RequestScheduler shared by every record
+        personality_id: Personality for records that do not name one
+        model_name: Model for records that do not name one
+
+    Returns:
+        Result with the reply, model and metrics of each completed turn
+    """
+    from src.chat_manager import ChatManager
+
+    personality_id = record.get("personality", personality_id)
+    result = {"id": record_id, "personality": personality_id, "turns": [], "error": None}
+    started = time.perf_counter()
+    try:
+        turns = record["turns"] if "turns" in record else [record["prompt"]]
+        if personality_id not in PERSONALITIES:
+            raise ValueError(f"Unknown personality: {personality_id!r}")
+        personality = PERSONALITIES[personality_id].override(record.get("temperature"))
+        manager = ChatManager(api_key, personality, record.get("model", model_name), backend=backend,
+                              summarize=False, scheduler=scheduler, session_id=record_id)
+        for prompt in turns:
+            reply = manager.get_response(prompt)
+            call = manager.last_call
+            if manager.pop_last_exchange() is None:
+                result["error"] = reply
+                break
+            result["turns"].append({
+                "prompt": prompt,
+                "reply": reply,
+                "model": call.model,
+                "duration": call.duration,
+                "prompt_tokens": call.prompt_tokens,
+                "completion_tokens": call.completion_tokens,
+                "retries": call.retries
+            })
+    except KeyError as e:
+        result["error"] = f"Missing field: {e}"
+    except Exception as e:
+        result["error"] = str(e)
+    result["duration"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(input_path: str, output_path: str, api_key: str, backend: str = None,
+              concurrency: int = DEFAULT_CONCURRENCY, scheduler=None,
+              personality_id: str = None, model_name: str = DEFAULT_MODEL) -> dict:
+    """
+    Run every pending record of an input file, appending results as they complete
+
+    Args:
+        input_path: Input JSONL file
+        output_path: Output JSONL file, appended to
+        api_key: API key
+        backend: LLM backend name, defaults to LLM_BACKEND
+        concurrency: Records run at once
+        scheduler: Optional RequestScheduler shared by every record
+        personality_id: Personality for records that do not name one
+        model_name: Model for records that do not name one
+
+    Returns:
+        Counts of completed, failed and skipped records
+    """
+    done = completed_ids(output_path)
+    counts = {"completed": 0, "failed": 0, "skipped": 0}
+    lock = threading.Lock()
+    # Bounds the records read ahead of the workers
+    slots = threading.BoundedSemaphore(concurrency * 2)
+
+    # A line cut off by an interrupted run is terminated before appending.
+    # Checked on the raw bytes: the cut may split a multi-byte character
+    cut_off = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            cut_off = f.read(1) != b"\n"
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if cut_off:
+            out.write("\n")
+
+        def write(result: dict):
+            with lock:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                counts["failed" if result["error"] else "completed"] += 1
+
+        def task(record_id: str, record: dict):
+            try:
+                write(run_record(record_id, record, api_key, backend, scheduler, personality_id, model_name))
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-eval") as pool:
+            try:
+                for record_id, record in read_records(input_path):
+                    if record_id in done:
+                        counts["skipped"] += 1
+                        continue
+                    if isinstance(record, str):
+                        write({"id": record_id, "turns": [], "error": record, "duration": 0.0})
+                        continue
+                    # Ids seen again later in the input are not rerun
+                    done.add(record_id)
+                    slots.acquire()
+                    pool.submit(task, record_id, record)
+            except KeyboardInterrupt:
+                # Finish the records in flight; the rest run on the next invocation
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run prompt sets through ChatManager concurrently")
+    parser.add_argument("input", help="JSONL file of records")
+    parser.add_argument("output", help="JSONL file results are appended to (resumed if it exists)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Records run at once")
+    parser.add_argument("--personality", help="Personality for records that do not name one")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model for records that do not name one")
+    parser.add_argument("--backend", default=None, help="LLM backend, defaults to LLM_BACKEND")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    backend = args.backend or default_backend()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key and requires_api_key(backend):
+        parser.error("GROQ_API_KEY is not set")
+    if args.personality is not None and args.personality not in PERSONALITIES:
+        parser.error(f"unknown personality {args.personality!r} (available: {', '.join(PERSONALITIES)})")
+
+    started = time.perf_counter()
+    try:
+        counts = run_batch(args.input, args.output, api_key, backend, args.concurrency, get_scheduler(),
+                           args.personality, args.model)
+    except KeyboardInterrupt:
+        print("interrupted; rerun the same command to resume", file=sys.stderr)
+        sys.exit(130)
+    elapsed = time.perf_counter() - started
+    print(f"{counts['completed']} completed, {counts['failed']} failed, {counts['skipped']} skipped "
+          f"in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
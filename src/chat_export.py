@@ -0,0 +1,234 @@
+"""
+Streaming conversation export
+
+Exports read a conversation from the store in chunks and encode it
+incrementally as plain text, Markdown or JSON Lines, optionally
+gzip-compressed, so memory stays flat however long the conversation is.
+Exports start with metadata (personality, model, message count) and end
+with estimated token counts, which are only known once every message
+has been read.
+
+Usage:
+    python -m src.chat_export SESSION_ID OUTPUT [--format txt|md|jsonl] [--gzip]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generator, Iterable
+from src.context_window import estimate_tokens
+from src.personalities import PERSONALITIES
+
+# Encoded bytes gathered before a chunk is handed on
+CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class ExportFormat:
+    """A transcript encoding offered for download"""
+    label: str
+    extension: str
+    mime: str
+
+
+EXPORT_FORMATS = {
+    "txt": ExportFormat("Plain text", "txt", "text/plain"),
+    "md": ExportFormat("Markdown", "md", "text/markdown"),
+    "jsonl": ExportFormat("JSON Lines", "jsonl", "application/x-ndjson")
+}
+
+
+def _speaker(message: dict) -> str:
+    if message["is_user"]:
+        return "User"
+    personality = PERSONALITIES.get(message.get("personality"))
+    return f"Assistant, {personality.name}" if personality is not None else "Assistant"
+
+
+def _txt(metadata: dict, messages: Iterable[dict], totals: dict) -> Generator[str, None, None]:
+    for key, value in metadata.items():
+        yield f"{key}: {value}\n"
+    for message in messages:
+        yield f"\n{_speaker(message)} ({message['timestamp']}): {message['content']}\n"
+    yield "\n" + "".join(f"{key}: {value}\n" for key, value in totals.items())
+
+
+def _md(metadata: dict, messages: Iterable[dict], totals: dict) -> Generator[str, None, None]:
+    yield "# Chat export\n\n"
+    yield "".join(f"- **{key}**: {value}\n" for key, value in metadata.items())
+    for message in messages:
+        yield f"\n### {_speaker(message)} · {message['timestamp']}\n\n{message['content']}\n"
+    yield "\n---\n\n" + "".join(f"- **{key}**: {value}\n" for key, value in totals.items())
+
+
+def _jsonl(metadata: dict, messages: Iterable[dict], totals: dict) -> Generator[str, None, None]:
+    yield json.dumps({"type": "metadata", **metadata}, ensure_ascii=False) + "\n"
+    for message in messages:
+        record = {
+            "type": "message",
+            "seq": message.get("seq"),
+            "role": "user" if message["is_user"] else "assistant",
+            "content": message["content"],
+            "timestamp": message["timestamp"],
+            "personality": message.get("personality"),
+            "tokens": message["tokens"]
+        }
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+    yield json.dumps({"type": "totals", **totals}, ensure_ascii=False) + "\n"
+
+
+_ENCODERS = {"txt": _txt, "md": _md, "jsonl": _jsonl}
+
+
+def iter_export(messages: Iterable[dict], fmt: str, metadata: dict) -> Generator[str, None, None]:
+    """
+    Encode a conversation piece by piece
+
+    Args:
+        messages: Message dicts, oldest first (e.g. store.iter_messages())
+        fmt: Format key from EXPORT_FORMATS
+        metadata: Fields written at the top of the export
+
+    Yields:
+        Text pieces of the export
+    """
+    if fmt not in _ENCODERS:
+        raise ValueError(f"Unknown export format: {fmt!r} (available: {', '.join(EXPORT_FORMATS)})")
+    # Filled in while the messages stream past, read by the encoder at the end
+    totals = {"messages": 0, "user_tokens": 0, "assistant_tokens": 0}
+
+    def counted():
+        for message in messages:
+            tokens = estimate_tokens(message["content"])
+            totals["messages"] += 1
+            totals["user_tokens" if message["is_user"] else "assistant_tokens"] += tokens
+            yield {**message, "tokens": tokens}
+
+    yield from _ENCODERS[fmt](metadata, counted(), totals)
+
+
+def export_chunks(messages: Iterable[dict], fmt: str, metadata: dict, compress: bool = False,
+                  chunk_bytes: int = CHUNK_BYTES) -> Generator[bytes, None, None]:
+    """
+    Encode a conversation as byte chunks of roughly even size
+
+    Args:
+        messages: Message dicts, oldest first
+        fmt: Format key from EXPORT_FORMATS
+        metadata: Fields written at the top of the export
+        compress: Gzip the output
+        chunk_bytes: Uncompressed bytes gathered per chunk
+
+    Yields:
+        UTF-8 (or gzip) encoded chunks
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending, size = [], 0
+    for piece in iter_export(messages, fmt, metadata):
+        data = piece.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            chunk = b"".join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor is not None else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(pending)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def write_export(fileobj, messages: Iterable[dict], fmt: str, metadata: dict, compress: bool = False) -> int:
+    """
+    Stream an export into a binary file object
+
+    Returns:
+        Bytes written
+    """
+    written = 0
+    for chunk in export_chunks(messages, fmt, metadata, compress):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def export_session(store, session_id: str, fmt: str, metadata: dict, compress: bool = False):
+    """
+    Export a stored conversation into a rewound temporary file
+
+    Suitable as deferred download data: the export is built on disk, so
+    only the final read (by st.download_button) holds it in memory. The
+    file is unbuffered because Streamlit accepts raw file objects.
+
+    Args:
+        store: Conversation store
+        session_id: Conversation identifier
+        fmt: Format key from EXPORT_FORMATS
+        metadata: Fields written at the top of the export
+        compress: Gzip the output
+
+    Returns:
+        Binary file object positioned at the start
+    """
+    f = tempfile.TemporaryFile(buffering=0)
+    write_export(f, store.iter_messages(session_id), fmt, metadata, compress)
+    f.seek(0)
+    return f
+
+
+def export_metadata(session_id: str, message_count: int, personality=None, model_name: str = None,
+                    temperature: float = None) -> dict:
+    """Build the metadata header for an export"""
+    metadata = {"session": session_id, "exported_at": datetime.now().isoformat(timespec="seconds"),
+                "messages": message_count}
+    if personality is not None:
+        metadata["personality"] = personality.name
+        metadata["temperature"] = personality.temperature if temperature is None else temperature
+    if model_name is not None:
+        metadata["model"] = model_name
+    return metadata
+
+
+def export_filename(fmt: str, compress: bool = False, when: datetime = None) -> str:
+    """Download file name for an export"""
+    when = when or datetime.now()
+    name = f"chat_{when.strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[fmt].extension}"
+    return name + ".gz" if compress else name
+
+
+def export_mime(fmt: str, compress: bool = False) -> str:
+    """MIME type for an export"""
+    return "application/gzip" if compress else EXPORT_FORMATS[fmt].mime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a stored conversation")
+    parser.add_argument("session_id", help="Conversation identifier")
+    parser.add_argument("output", help="File to write, or - for stdout")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="txt")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output")
+    args = parser.parse_args()
+
+    from src.conversation_store import get_conversation_store
+    store = get_conversation_store()
+    count = store.count(args.session_id)
+    if not count:
+        parser.error(f"no messages stored for session {args.session_id!r}")
+    metadata = export_metadata(args.session_id, count)
+    messages = store.iter_messages(args.session_id)
+    if args.output == "-":
+        write_export(sys.stdout.buffer, messages, args.format, metadata, args.gzip)
+        return
+    with open(args.output, "wb") as f:
+        written = write_export(f, messages, args.format, metadata, args.gzip)
+    print(f"wrote {count} messages ({written} bytes) to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
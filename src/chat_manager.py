@@ -1,41 +1,598 @@
-from langchain_groq import ChatGroq
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from typing import Generator
+from typing import AsyncGenerator, Generator
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from datetime import datetime
 import streamlit as st
+from src.backends import default_backend
+from src.context_window import ContextWindow, estimate_tokens, prompt_budget
+from src.hedging import HedgedStream
+from src.llm_pool import closing_responses, get_llm
+from src.memory import MemoryIndex
+from src.metrics import CallMetrics, SessionStats, DEFAULT_HOOKS, error_type
+from src.model_router import AUTO_MODEL, ModelRouter
+from src.response_cache import cache_key, replay_chunks
+from src.scheduler import (
+    EXPECTED_COMPLETION_TOKENS,
+    MAX_RATE_LIMIT_RETRIES,
+    MAX_RETRIES,
+    RETRYABLE_ERRORS,
+    ResumableReply,
+    backoff_delay,
+    retry_after
+)
+from src.summarizer import RollingSummary, RECENT_HISTORY_TOKENS
+
+logger = logging.getLogger(__name__)
+
+class GenerationHandle:
+    """
+    Cancellation handle for an in-flight async generation
+
+    For callers that run astream_response on their own event loop; the
+    Streamlit app streams with stream_response, which stops when
+    Streamlit ends the script run and closes the generator.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task):
+        """
+        Initialize the handle
+        
+        Args:
+            loop: Event loop running the generation
+            task: Task consuming the response stream
+        """
+        self.loop = loop
+        self.task = task
+    
+    @property
+    def done(self) -> bool:
+        """Whether the generation has finished or been cancelled"""
+        return self.task.done()
+    
+    def cancel(self):
+        """Abort the generation; safe to call from any thread"""
+        if not self.task.done():
+            self.loop.call_soon_threadsafe(self.task.cancel)
 
 class ChatManager:
     """Manages chat interactions with Groq API using LangChain"""
     
-    def __init__(self, api_key: str, personality: dict, model_name: str = "llama-3.3-70b-versatile"):
+    def __init__(self, api_key: str, personality, model_name: str = "llama-3.3-70b-versatile",
+                 cache=None, backend: str = None, summarize: bool = True,
+                 hedge_after: float = None, hedge_model: str = None,
+                 scheduler=None, session_id: str = None, memory_k: int = 0, single_flight=None,
+                 load_messages=None):
         """
         Initialize chat manager with Groq configuration
         
         Args:
             api_key: Groq API key
-            personality: Personality configuration dict
-            model_name: Groq model to use
+            personality: Personality (or per-session PersonalityOverride)
+            model_name: Groq model to use, or "auto" to route each turn
+            cache: Optional ResponseCache consulted before calling the model
+            backend: LLM backend name ("groq", "stub", ...), defaults to LLM_BACKEND
+            summarize: Fold evicted turns into a rolling summary instead of dropping them
+            hedge_after: Seconds without a first token before stream_response fires
+                a backup request (None disables hedging)
+            hedge_model: Model for the backup request, defaults to the current model
+            scheduler: Optional RequestScheduler that admits, rate limits and retries requests
+            session_id: Session identifier the scheduler shares capacity fairly between
+            memory_k: Older exchanges recalled from long-term memory into each
+                prompt by similarity to the new message (0 disables memory)
+            single_flight: Optional SingleFlight through which stream_response
+                shares one upstream stream between identical in-flight requests
+            load_messages: Optional function returning the session's stored
+                message dicts for a list of sequence numbers, so memory keeps
+                only the embeddings of stored exchanges and loads the ones it recalls
         """
         self.api_key = api_key
-        self.personality = personality
+        self.backend = backend or default_backend()
+        self.cache = cache
+        self.single_flight = single_flight
+        self.hedge_after = hedge_after
+        self.hedge_model = hedge_model
+        
+        # Requests go through the scheduler, which owns retries, when one is given
+        self.scheduler = scheduler
+        self.session_id = session_id or uuid.uuid4().hex
+        
+        # Chat history storage, bounded by the model's prompt token budget
+        self.chat_history = ContextWindow()
+        
+        # Running summary of turns evicted from the history
+        self.summary = RollingSummary(api_key, backend=self.backend) if summarize else None
+        
+        # Every completed exchange, embedded for recall once it leaves the history
+        self.memory_k = memory_k
+        self.memory = MemoryIndex(load=load_messages) if memory_k > 0 else None
+        
+        # Exchange saved by the most recent call, for the caller to persist
+        self.last_exchange = None
+        
+        # Handle for the in-flight async generation, if any
+        self.active_generation = None
+        
+        # Per-call metrics, passed to every hook when a call finishes
+        self.stats = SessionStats()
+        self.hooks = [*DEFAULT_HOOKS, self.stats.record]
+        self.last_call = None
+        
+        self.personality = None
+        self.model_name = None
+        self.requested_model = None
+        self.temperature = None
+        
+        # Per-turn model routing, when the requested model is "auto"
+        self.router = None
+        self.last_route = None
+        self.configure(personality, model_name)
+    
+    def configure(self, personality=None, model_name: str = None):
+        """
+        Switch personality, model or temperature while keeping history
+        
+        Only the settings that are passed and differ are applied; the LLM
+        is re-borrowed from the shared pool when model or temperature change.
+        
+        Args:
+            personality: Personality (or per-session PersonalityOverride)
+            model_name: Groq model to use, or "auto" to route each turn
+        """
+        temperature = self.temperature
+        if personality is not None and personality != self.personality:
+            if self.personality is None or personality.system_prompt != self.personality.system_prompt:
+                # System message with personality
+                self.system_message = SystemMessage(
+                    content=personality.system_prompt
+                )
+                self.system_tokens = estimate_tokens(self.system_message.content)
+            self.personality = personality
+            temperature = personality.temperature
+        
+        self.requested_model = model_name or self.requested_model
+        model_name = self.requested_model
+        if model_name == AUTO_MODEL:
+            if self.router is None:
+                self.router = ModelRouter()
+            # Each turn picks its model; until then keep the current one
+            model_name = self.model_name or self.router.strong_model
+        else:
+            self.router = None
+        self._use_model(model_name, temperature)
+    
+    def _use_model(self, model_name: str, temperature: float):
+        """Borrow the LLM for a model and temperature if they changed"""
+        if model_name == self.model_name and temperature == self.temperature:
+            return
+        
         self.model_name = model_name
+        self.temperature = temperature
+        self.token_budget = prompt_budget(model_name)
         
-        # Initialize Groq LLM with streaming
-        self.llm = ChatGroq(
-            groq_api_key=api_key,
+        # Borrow a streaming LLM from the process-wide pool
+        self.llm = get_llm(
+            api_key=self.api_key,
             model_name=model_name,
-            temperature=personality.get("temperature", 0.7),
-            max_tokens=2000,
-            streaming=True
+            temperature=temperature,
+            backend=self.backend,
+            max_retries=self._client_retries
         )
+        self._invoke_llm = None
+    
+    @property
+    def invoke_llm(self):
+        """Non-streaming LLM for get_response(), borrowed on first use"""
+        if self._invoke_llm is None:
+            self._invoke_llm = get_llm(
+                api_key=self.api_key,
+                model_name=self.model_name,
+                temperature=self.temperature,
+                backend=self.backend,
+                max_retries=self._client_retries,
+                streaming=False
+            )
+        return self._invoke_llm
+    
+    def _new_message(self, content: str, is_user: bool) -> dict:
+        """Create a message dict in the format shared with the UI transcript"""
+        return {
+            "content": content,
+            "is_user": is_user,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "personality": self.personality.id
+        }
+    
+    def _build_messages(self, user_input: str) -> list:
+        """
+        Assemble the prompt, evicting old turns to fit the token budget
         
-        # Chat history storage (last 10 exchanges)
-        self.chat_history = []
-        self.max_history = 10
+        Args:
+            user_input: User's message
+            
+        Returns:
+            List of messages to send to the model
+        """
+        history_budget = self.token_budget - self.system_tokens - estimate_tokens(user_input)
+        recalled = []
+        if self.memory is not None:
+            # Older exchanges relevant to this message, sent ahead of the history
+            recalled = self.memory.recall(user_input, self.memory_k, self.chat_history)
+            history_budget -= sum(message["tokens"] for exchange in recalled for message in exchange)
+        summary_message, unfolded = None, []
+        if self.summary is not None:
+            # Keep recent turns verbatim and older ones as a summary, but never
+            # cap away the last exchange, which a follow-up usually refers to
+            _, summary_tokens, _ = self.summary.snapshot()
+            available = history_budget - summary_tokens
+            evicted = self.chat_history.fit(max(min(available, RECENT_HISTORY_TOKENS),
+                                                min(available, self.chat_history.last_turn_tokens())))
+            if evicted:
+                self.summary.add(evicted)
+            # Evicted turns stay in the prompt until their fold lands, newest
+            # first as far as the budget allows
+            summary_message, summary_tokens, pending = self.summary.snapshot()
+            room = history_budget - summary_tokens - self.chat_history.total_tokens
+            for message in reversed(pending):
+                if message["tokens"] > room:
+                    break
+                unfolded.insert(0, message)
+                room -= message["tokens"]
+        else:
+            self.chat_history.fit(history_budget)
         
-        # System message with personality
-        self.system_message = SystemMessage(
-            content=personality["system_prompt"]
-        )
+        messages = [self.system_message]
+        if summary_message is not None:
+            messages.append(summary_message)
+        if unfolded:
+            # Already in the prompt verbatim
+            recalled = [exchange for exchange in recalled if not any(exchange[0] is m for m in unfolded)]
+        if recalled:
+            turns = "\n\n".join(
+                f"User: {user_message['content']}\nAssistant: {ai_message['content']}"
+                for user_message, ai_message in recalled
+            )
+            messages.append(SystemMessage(content=f"Relevant earlier turns from this conversation:\n{turns}"))
+        for message in [*unfolded, *self.chat_history]:
+            if message['is_user']:
+                messages.append(HumanMessage(content=message['content']))
+            else:
+                messages.append(AIMessage(content=message['content']))
+        messages.append(HumanMessage(content=user_input))
+        return messages
+    
+    def _save_exchange(self, user_message: dict, response: str):
+        """
+        Save a completed exchange to history
+        
+        Args:
+            user_message: User's message dict, created when the call started
+            response: AI's response
+        """
+        ai_message = self._new_message(response, False)
+        # The model that wrote the reply (the routed one in "auto" mode), for search filters
+        ai_message["model"] = self.model_name
+        self.chat_history.append(user_message)
+        self.chat_history.append(ai_message)
+        if self.memory is not None:
+            self.memory.add(user_message, ai_message)
+        self.last_exchange = (user_message, ai_message)
+    
+    def pop_last_exchange(self):
+        """
+        Take the (user, assistant) message dicts saved by the last call
+        
+        Returns:
+            The exchange, or None if the last call failed
+        """
+        exchange, self.last_exchange = self.last_exchange, None
+        return exchange
+    
+    def _route(self, user_input: str):
+        """
+        Switch to the model the router picks for this turn (when "auto")
+        
+        Args:
+            user_input: User's message
+        """
+        if self.router is None:
+            self.last_route = None
+            return
+        self.last_route = self.router.route(user_input, self.personality.id, self.chat_history.total_tokens)
+        self._use_model(self.last_route.model, self.temperature)
+    
+    def _start_call(self) -> CallMetrics:
+        """Start timing a model call"""
+        call = CallMetrics(model=self.model_name, backend=self.backend, personality=self.personality.id)
+        if self.last_route is not None:
+            call.route_reason = self.last_route.reason
+            call.route_baseline = self.router.strong_model
+        return call
+    
+    def _finish_call(self, call: CallMetrics, error: Exception = None):
+        """
+        Stop timing a call and hand it to the metrics hooks
+        
+        Args:
+            call: Metrics from _start_call()
+            error: Exception the call failed with, if any
+        """
+        call.finish(error)
+        self.last_call = call
+        for hook in self.hooks:
+            try:
+                hook(call)
+            except Exception:
+                logger.exception("Metrics hook %r failed", hook)
+    
+    def _stream(self, messages: list):
+        """
+        Start streaming a prompt, hedged when hedge_after is set
+        
+        Args:
+            messages: Messages from _build_messages()
+            
+        Returns:
+            Iterator over message chunks
+        """
+        if self.hedge_after is None:
+            return self.llm.stream(messages)
+        backup = None
+        if self.hedge_model and self.hedge_model != self.model_name:
+            backup = get_llm(
+                api_key=self.api_key,
+                model_name=self.hedge_model,
+                temperature=self.temperature,
+                backend=self.backend,
+                max_retries=self._client_retries
+            )
+        return HedgedStream(self.llm, messages, self.hedge_after, backup)
+    
+    @property
+    def _client_retries(self):
+        """Client-level retries: off when the scheduler retries instead"""
+        return 0 if self.scheduler is not None else None
+    
+    def _admit(self, messages: list, call: CallMetrics):
+        """
+        Wait for the scheduler to admit a request
+        
+        Args:
+            messages: Prompt about to be sent
+            call: Metrics of the call, credited with the queueing time
+            
+        Returns:
+            Scheduler ticket, or None without a scheduler
+        """
+        if self.scheduler is None:
+            return None
+        tokens = sum(estimate_tokens(message.content) for message in messages) + EXPECTED_COMPLETION_TOKENS
+        ticket = self.scheduler.for_key(self.api_key).acquire(self.session_id, tokens)
+        call.queue_time = (call.queue_time or 0.0) + ticket.wait_time
+        return ticket
+    
+    async def _aadmit(self, messages: list, call: CallMetrics):
+        """Async _admit(); waits in a worker thread without blocking the loop"""
+        if self.scheduler is None:
+            return None
+        tokens = sum(estimate_tokens(message.content) for message in messages) + EXPECTED_COMPLETION_TOKENS
+        key_scheduler = self.scheduler.for_key(self.api_key)
+        ticket = key_scheduler.submit(self.session_id, tokens)
+        try:
+            # Short waits so the worker thread exits soon after a cancellation
+            while not await asyncio.to_thread(ticket.granted.wait, 0.5):
+                pass
+        except asyncio.CancelledError:
+            key_scheduler.cancel(ticket)
+            raise
+        call.queue_time = (call.queue_time or 0.0) + ticket.wait_time
+        return ticket
+    
+    def _release(self, ticket, call: CallMetrics = None):
+        """Return a scheduler ticket, reporting the tokens actually used"""
+        if ticket is None:
+            return
+        used = None
+        if call is not None and call.completion_tokens is not None:
+            used = (call.prompt_tokens or 0) + call.completion_tokens
+        self.scheduler.for_key(self.api_key).release(ticket, used)
+    
+    def _retry_delay(self, error: Exception, attempt: int, call: CallMetrics):
+        """
+        Decide whether to retry a failed request
+        
+        Args:
+            error: Exception raised by the request
+            attempt: Zero-based retry number
+            call: Metrics of the call, credited with the retry
+            
+        Returns:
+            Seconds to wait before retrying, or None to give up
+        """
+        kind = error_type(error)
+        limit = MAX_RATE_LIMIT_RETRIES if kind == "rate_limit" else MAX_RETRIES
+        if self.scheduler is None or attempt >= limit or kind not in RETRYABLE_ERRORS:
+            return None
+        delay = backoff_delay(attempt, retry_after(error))
+        if kind == "rate_limit":
+            # Hold back every session using this key, not just this one
+            self.scheduler.for_key(self.api_key).pause(delay)
+        call.retries += 1
+        logger.info("Retrying %s request after %s in %.2fs (retry %d)",
+                    self.model_name, kind, delay, attempt + 1)
+        return delay
+    
+    def _invoke(self, messages: list, call: CallMetrics):
+        """Get a complete reply through the scheduler, retrying failures"""
+        attempt = 0
+        while True:
+            ticket = self._admit(messages, call)
+            try:
+                # One response body instead of a parsed chunk per token
+                response = self.invoke_llm.invoke(messages)
+                call.usage(response)
+                return response
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, call)
+                if delay is None:
+                    raise
+            finally:
+                self._release(ticket, call)
+            time.sleep(delay)
+            attempt += 1
+    
+    def _stream_text(self, messages: list, call: CallMetrics) -> Generator[str, None, None]:
+        """
+        Stream reply text through the scheduler, retrying failures
+        
+        A retry after a mid-stream failure resumes the reply instead of
+        restarting it, so no text is yielded twice. An empty string is
+        yielded before waiting out a retry's backoff, so a caller that
+        buffers text can show it first.
+        
+        Args:
+            messages: Messages from _build_messages()
+            call: Metrics of the call
+            
+        Yields:
+            New reply text
+        """
+        reply = ResumableReply(messages)
+        attempt = 0
+        while True:
+            ticket = self._admit(messages, call)
+            try:
+                # Hedged against a slow first token if enabled. A caller that
+                # stops iterating closes the upstream response on the way out
+                with closing_responses():
+                    stream = self._stream(reply.prompt())
+                    for chunk in stream:
+                        call.chunk(chunk)
+                        if hasattr(chunk, 'content'):
+                            piece = reply.feed(chunk.content)
+                            if piece:
+                                yield piece
+                if isinstance(stream, HedgedStream):
+                    call.hedged = stream.hedged
+                    call.hedge_winner = stream.winner
+                return
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, call)
+                if delay is None:
+                    raise
+            finally:
+                self._release(ticket, call)
+            yield ""
+            time.sleep(delay)
+            attempt += 1
+            reply.restart()
+    
+    async def _astream_text(self, messages: list, call: CallMetrics) -> AsyncGenerator[str, None]:
+        """Async _stream_text(), without hedging"""
+        reply = ResumableReply(messages)
+        attempt = 0
+        while True:
+            ticket = await self._aadmit(messages, call)
+            try:
+                async for chunk in self.llm.astream(reply.prompt()):
+                    call.chunk(chunk)
+                    if hasattr(chunk, 'content'):
+                        piece = reply.feed(chunk.content)
+                        if piece:
+                            yield piece
+                return
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, call)
+                if delay is None:
+                    raise
+            finally:
+                self._release(ticket, call)
+            yield ""
+            await asyncio.sleep(delay)
+            attempt += 1
+            reply.restart()
+    
+    def _request_key(self, messages: list) -> str:
+        """
+        Build the key identifying an assembled prompt
+        
+        Keys the response cache, which sessions share whatever their API
+        key; _shared_stream() narrows it to the key and backend before
+        joining a request in flight.
+        
+        Args:
+            messages: Messages from _build_messages()
+            
+        Returns:
+            Request key, or None when neither is enabled
+        """
+        if self.cache is None and self.single_flight is None:
+            return None
+        history = [(message.type, message.content) for message in messages[1:-1]]
+        return cache_key(self.model_name, self.system_message.content, self.temperature,
+                         history, messages[-1].content)
+    
+    def _shared_stream(self, key: str, messages: list, call: CallMetrics) -> Generator[str, None, None]:
+        """
+        Stream reply text, joining an identical request in flight
+        
+        Without single_flight this is _stream_text(). With it, a request
+        identical to one already streaming receives that stream's full
+        reply from its first piece instead of calling the model; its call
+        is marked coalesced and timed as the pieces reach it.
+        
+        Args:
+            key: Key from _request_key()
+            messages: Messages from _build_messages()
+            call: Metrics of the call
+            
+        Yields:
+            New reply text
+        """
+        if self.single_flight is None:
+            yield from self._stream_text(messages, call)
+            return
+        # Only requests made with the same credentials to the same backend share a stream
+        key_hash = hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()[:16]
+        flight_key = f"{self.backend}:{key_hash}:{key}"
+        shared = self.single_flight.stream(flight_key, lambda: self._stream_text(messages, call))
+        try:
+            for piece in shared:
+                if shared.joined and piece:
+                    # The upstream call is timed by the request that started it
+                    call.chunk()
+                yield piece
+        finally:
+            call.coalesced = bool(shared.joined)
+    
+    def _cached_reply(self, key: str) -> str:
+        """Get a cached reply for a key, or None"""
+        return self.cache.get(key) if self.cache is not None and key is not None else None
+    
+    def _store_reply(self, key: str, response: str, started: float):
+        """Cache a completed reply along with how long it took"""
+        if self.cache is not None and key is not None:
+            self.cache.set(key, response, time.perf_counter() - started)
+    
+    def load_history(self, messages: list):
+        """
+        Restore history from stored message dicts (e.g. on session resume)
+        
+        The dicts are shared, not copied, so the transcript and the
+        prompt history hold a single representation of each message.
+        Messages of failed calls (marked "error") are skipped.
+        
+        Args:
+            messages: Message dicts with content and is_user, oldest first
+        """
+        messages = [message for message in messages if not message.get("error")]
+        for message in messages:
+            self.chat_history.append(message)
+        if self.memory is not None:
+            self.memory.add_history(messages)
     
     def get_response(self, user_input: str) -> str:
         """
@@ -47,28 +604,35 @@ class ChatManager:
         Returns:
             AI's response as string
         """
+        self._route(user_input)
+        call = self._start_call()
         try:
-            # Build messages list
-            messages = [self.system_message]
-            messages.extend(self.chat_history)
+            # Build messages list within the token budget
+            user_message = self._new_message(user_input, True)
+            messages = self._build_messages(user_input)
             
-            # Add current user message
-            messages.append(HumanMessage(content=user_input))
+            # Serve repeated requests from the cache
+            key = self._request_key(messages)
+            cached = self._cached_reply(key)
+            if cached is not None:
+                self._save_exchange(user_message, cached)
+                call.cached = True
+                self._finish_call(call)
+                return cached
             
             # Get response
-            response = self.llm.invoke(messages)
+            started = time.perf_counter()
+            response = self._invoke(messages, call)
             
             # Save to history
-            self.chat_history.append(HumanMessage(content=user_input))
-            self.chat_history.append(AIMessage(content=response.content))
-            
-            # Keep only last max_history exchanges
-            if len(self.chat_history) > self.max_history * 2:
-                self.chat_history = self.chat_history[-(self.max_history * 2):]
+            self._save_exchange(user_message, response.content)
+            self._store_reply(key, response.content, started)
+            self._finish_call(call)
             
             return response.content
             
         except Exception as e:
+            self._finish_call(call, e)
             return f"Error communicating with Groq API: {str(e)}"
     
     def stream_response(self, user_input: str) -> Generator[str, None, None]:
@@ -79,34 +643,118 @@ class ChatManager:
             user_input: User's message
             
         Yields:
-            Response tokens as they arrive
+            Response tokens as they arrive, and an empty string before
+            each retry's backoff
         """
+        self._route(user_input)
+        call = self._start_call()
         try:
-            # Build messages list
-            messages = [self.system_message]
-            messages.extend(self.chat_history)
+            # Build messages list within the token budget
+            user_message = self._new_message(user_input, True)
+            messages = self._build_messages(user_input)
+            
+            # Replay repeated requests from the cache
+            key = self._request_key(messages)
+            cached = self._cached_reply(key)
+            if cached is not None:
+                call.cached = True
+                yield from replay_chunks(cached)
+                self._save_exchange(user_message, cached)
+                self._finish_call(call)
+                return
+            
+            # Stream response, shared with identical requests in flight
+            started = time.perf_counter()
+            full_response = ""
+            for piece in self._shared_stream(key, messages, call):
+                full_response += piece
+                yield piece
             
-            # Add current user message
-            messages.append(HumanMessage(content=user_input))
+            # Save to history; the request that started the stream caches it
+            self._save_exchange(user_message, full_response)
+            if not call.coalesced:
+                self._store_reply(key, full_response, started)
+            self._finish_call(call)
+            
+        except Exception as e:
+            self._finish_call(call, e)
+            yield f"⚠️ Error: {str(e)}"
+    
+    async def astream_response(self, user_input: str) -> AsyncGenerator[str, None]:
+        """
+        Stream response token by token from Groq without blocking a thread
+        
+        Starting a new generation cancels the previous one. The task
+        consuming this generator can be aborted through
+        `active_generation.cancel()`, which closes the upstream request;
+        a cancelled exchange is not saved to history. For library callers
+        with their own event loop: it has no single-flight sharing or
+        hedging, and the Streamlit app uses stream_response.
+        
+        Args:
+            user_input: User's message
+            
+        Yields:
+            Response tokens as they arrive, and an empty string before
+            each retry's backoff
+        """
+        task = asyncio.current_task()
+        if self.active_generation is not None and self.active_generation.task is not task:
+            self.cancel_generation()
+        handle = GenerationHandle(asyncio.get_running_loop(), task)
+        self.active_generation = handle
+        
+        self._route(user_input)
+        call = self._start_call()
+        try:
+            # Build messages list within the token budget
+            user_message = self._new_message(user_input, True)
+            messages = self._build_messages(user_input)
+            
+            # Replay repeated requests from the cache
+            key = self._request_key(messages)
+            cached = self._cached_reply(key)
+            if cached is not None:
+                call.cached = True
+                for chunk in replay_chunks(cached):
+                    yield chunk
+                self._save_exchange(user_message, cached)
+                self._finish_call(call)
+                return
             
             # Stream response
+            started = time.perf_counter()
             full_response = ""
-            for chunk in self.llm.stream(messages):
-                if hasattr(chunk, 'content'):
-                    full_response += chunk.content
-                    yield chunk.content
+            async for piece in self._astream_text(messages, call):
+                full_response += piece
+                yield piece
             
             # Save to history
-            self.chat_history.append(HumanMessage(content=user_input))
-            self.chat_history.append(AIMessage(content=full_response))
-            
-            # Keep only last max_history exchanges
-            if len(self.chat_history) > self.max_history * 2:
-                self.chat_history = self.chat_history[-(self.max_history * 2):]
+            self._save_exchange(user_message, full_response)
+            self._store_reply(key, full_response, started)
+            self._finish_call(call)
             
+        except asyncio.CancelledError as e:
+            self._finish_call(call, e)
+            raise
         except Exception as e:
+            self._finish_call(call, e)
             yield f"⚠️ Error: {str(e)}"
+        finally:
+            if self.active_generation is handle:
+                self.active_generation = None
+    
+    def cancel_generation(self):
+        """Cancel the in-flight astream_response generation, if any"""
+        if self.active_generation is not None:
+            self.active_generation.cancel()
+            self.active_generation = None
     
     def clear_memory(self):
         """Clear conversation memory"""
-        self.chat_history = []
+        self.cancel_generation()
+        self.chat_history.clear()
+        if self.summary is not None:
+            self.summary.clear()
+        if self.memory is not None:
+            self.memory.clear()
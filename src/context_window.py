@@ -0,0 +1,134 @@
+from collections import deque
+from math import ceil
+
+# Context window sizes (in tokens) for the models offered in the sidebar
+MODEL_CONTEXT_WINDOWS = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "mixtral-8x7b-32768": 32768,
+    "llama3-70b-8192": 8192
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens reserved for the model's reply (matches ChatGroq max_tokens)
+COMPLETION_TOKENS = 2000
+
+# Upper bound on prompt size, even for models with very large windows
+MAX_PROMPT_TOKENS = 6000
+
+# Per-message overhead for role markers and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text
+
+    Uses the common ~4 characters per token rule for Llama-style
+    tokenizers, which is close enough for budgeting without pulling
+    in a tokenizer dependency.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count including per-message overhead
+    """
+    return ceil(len(text) / 4) + MESSAGE_OVERHEAD_TOKENS
+
+
+def prompt_budget(model_name: str, max_tokens: int = COMPLETION_TOKENS,
+                  max_prompt_tokens: int = MAX_PROMPT_TOKENS) -> int:
+    """
+    Get the number of prompt tokens available for a model
+
+    Args:
+        model_name: Groq model name
+        max_tokens: Tokens reserved for the completion
+        max_prompt_tokens: Hard cap on prompt size
+
+    Returns:
+        Token budget for system prompt, history and user input
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+    return max(0, min(window - max_tokens, max_prompt_tokens))
+
+
+class ContextWindow:
+    """Conversation history bounded by a token budget"""
+
+    def __init__(self):
+        """Initialize an empty history"""
+        # Message dicts shared with the UI transcript, not copies of them
+        self._entries = deque()
+        self.total_tokens = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def append(self, message: dict):
+        """
+        Add a message to the end of the history
+
+        The token count is cached on the message under "tokens" so it is
+        measured only once, even across sessions resumed from storage.
+
+        Args:
+            message: Message dict with content and is_user
+        """
+        tokens = message.get("tokens")
+        if tokens is None:
+            tokens = message["tokens"] = estimate_tokens(message["content"])
+        self._entries.append(message)
+        self.total_tokens += tokens
+
+    def evict_oldest(self) -> dict:
+        """
+        Remove the oldest message from the history
+
+        Returns:
+            The evicted message
+        """
+        message = self._entries.popleft()
+        self.total_tokens -= message["tokens"]
+        return message
+
+    def fit(self, budget: int) -> list:
+        """
+        Evict oldest turns until the history fits in the budget
+
+        Args:
+            budget: Maximum number of tokens the history may use
+
+        Returns:
+            List of evicted messages, oldest first
+        """
+        evicted = []
+        while self._entries and self.total_tokens > budget:
+            evicted.append(self.evict_oldest())
+            # Drop the rest of the turn so history always starts with the user
+            while self._entries and not self._entries[0]["is_user"]:
+                evicted.append(self.evict_oldest())
+        return evicted
+
+    def last_turn_tokens(self) -> int:
+        """Get the tokens of the most recent turn (from the last user message on)"""
+        tokens = 0
+        for message in reversed(self._entries):
+            tokens += message["tokens"]
+            if message["is_user"]:
+                break
+        return tokens
+
+    def messages(self) -> list:
+        """Get the retained messages, oldest first"""
+        return list(self._entries)
+
+    def clear(self):
+        """Remove all messages"""
+        self._entries.clear()
+        self.total_tokens = 0
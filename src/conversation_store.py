@@ -0,0 +1,610 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Generator
+
+# Messages loaded when a session resumes (enough for display and context)
+RESUME_MESSAGES = 50
+
+# Messages kept in memory per session; older ones are paged from disk
+MAX_LOADED_MESSAGES = 200
+
+# Search results returned per query
+SEARCH_LIMIT = 20
+
+# Words of context around the matches in a search snippet
+SNIPPET_WORDS = 12
+
+# Shortest last word that is retried as a prefix when a query finds nothing.
+# A prefix matches the union of every word starting with it, which costs
+# time in proportion to all of their occurrences
+PREFIX_MIN_CHARS = 4
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Runs of letters and digits, the tokens of the search index's tokenizer
+_WORD = re.compile(r"[^\W_]+")
+
+
+def valid_session_id(session_id) -> bool:
+    """Check that a session id is safe to use as a key and file name"""
+    return isinstance(session_id, str) and bool(_SESSION_ID.match(session_id))
+
+
+def _check_session_id(session_id: str):
+    if not valid_session_id(session_id):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+
+
+def search_terms(query: str) -> list:
+    """
+    Split a search box query into lowercase words
+
+    Operators and punctuation are dropped, so any input is a valid query:
+    a message matches when it contains every word. When nothing does, a
+    last word of PREFIX_MIN_CHARS or more is taken as cut short and
+    matched as a prefix.
+    """
+    return _WORD.findall(query.lower())
+
+
+def _fts_query(terms: list, prefix: bool, session_ids: list = None) -> str:
+    # Quoted terms are literal in FTS5 syntax. A session filter matches the
+    # tokens of the session ids, so it narrows the scan to those sessions'
+    # rows; the exact session_id check is left to SQL
+    query = "content : (" + " ".join(f'"{term}"' for term in terms) + ("*" if prefix else "") + ")"
+    if session_ids is not None:
+        sessions = " OR ".join(
+            "session_id : (" + " ".join(f'"{token}"' for token in _WORD.findall(session_id)) + ")"
+            for session_id in session_ids
+        )
+        query += f" AND ({sessions})"
+    return query
+
+
+class SQLiteConversationStore:
+    """Conversation store backed by SQLite in WAL mode"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the conversation database
+
+        Args:
+            path: SQLite database file
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                is_user INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                personality TEXT,
+                model TEXT,
+                created_at REAL,
+                PRIMARY KEY (session_id, seq)
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        for column, kind in (("model", "TEXT"), ("created_at", "REAL")):
+            if column not in columns:
+                # Databases created before search was added
+                self._conn.execute(f"ALTER TABLE messages ADD COLUMN {column} {kind}")
+        self._create_search_index()
+
+    def _create_search_index(self):
+        # FTS5 index over the messages table's own content, kept in sync by
+        # triggers. It refers to messages by rowid, which VACUUM may renumber;
+        # call rebuild_search_index() after one. The session id is indexed
+        # too, so a search scoped to a few sessions intersects their short
+        # doclists instead of walking every match. detail=column keeps only
+        # rowids and columns per word, so the doclists of common words stay
+        # small (there are no phrase queries; snippet() re-tokenizes the
+        # matched rows)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(messages_fts)")]
+        indexed = columns == ["content", "session_id"]
+        if columns and not indexed:
+            # Index from before sessions were indexed
+            self._conn.executescript("""
+                DROP TRIGGER IF EXISTS messages_fts_insert;
+                DROP TRIGGER IF EXISTS messages_fts_delete;
+                DROP TABLE messages_fts;
+            """)
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content, session_id, content='messages', content_rowid='rowid', detail=column,
+                tokenize='porter unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts(rowid, content, session_id) VALUES (new.rowid, new.content, new.session_id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content, session_id)
+                VALUES ('delete', old.rowid, old.content, old.session_id);
+            END;
+        """)
+        if not indexed:
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self):
+        """Reindex every stored message for search"""
+        with self._lock:
+            self._conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    def append(self, session_id: str, message: dict) -> int:
+        """
+        Append a message to a session
+
+        Args:
+            session_id: Conversation identifier
+            message: Message dict with content, is_user, timestamp, personality
+                and, for replies, model; created_at is set when missing
+
+        Returns:
+            Sequence number assigned to the message
+        """
+        created_at = message.setdefault("created_at", time.time())
+        with self._lock:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._conn.execute("""
+                INSERT INTO messages (session_id, seq, is_user, content, timestamp, personality, model, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (session_id, seq, int(message["is_user"]), message["content"],
+                  message["timestamp"], message.get("personality"), message.get("model"), created_at))
+        message["seq"] = seq
+        return seq
+
+    def count(self, session_id: str) -> int:
+        """Get the number of messages in a session"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def tail(self, session_id: str, limit: int) -> list:
+        """
+        Get the most recent messages of a session
+
+        Args:
+            session_id: Conversation identifier
+            limit: Maximum number of messages
+
+        Returns:
+            Message dicts, oldest first
+        """
+        return self.page(session_id, None, limit)
+
+    def page(self, session_id: str, before_seq, limit: int) -> list:
+        """
+        Get the messages immediately preceding a sequence number
+
+        Args:
+            session_id: Conversation identifier
+            before_seq: Sequence number to page back from (None for the end)
+            limit: Maximum number of messages
+
+        Returns:
+            Message dicts, oldest first
+        """
+        if before_seq is None:
+            before_seq = 2 ** 62
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT seq, is_user, content, timestamp, personality, model, created_at FROM messages
+                WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?
+            """, (session_id, before_seq, limit)).fetchall()
+        return [self._to_message(row) for row in reversed(rows)]
+
+    def by_seq(self, session_id: str, seqs: list) -> list:
+        """
+        Get the messages with the given sequence numbers
+
+        Args:
+            session_id: Conversation identifier
+            seqs: Sequence numbers; ones not in the session are skipped
+
+        Returns:
+            Message dicts, oldest first
+        """
+        if not seqs:
+            return []
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT seq, is_user, content, timestamp, personality, model, created_at FROM messages
+                WHERE session_id = ? AND seq IN ({", ".join("?" * len(seqs))}) ORDER BY seq
+            """, (session_id, *seqs)).fetchall()
+        return [self._to_message(row) for row in rows]
+
+    def iter_messages(self, session_id: str, chunk_size: int = 500) -> Generator[dict, None, None]:
+        """
+        Iterate over every message of a session without loading it all
+
+        Args:
+            session_id: Conversation identifier
+            chunk_size: Messages fetched per query
+
+        Yields:
+            Message dicts, oldest first
+        """
+        seq = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute("""
+                    SELECT seq, is_user, content, timestamp, personality, model, created_at FROM messages
+                    WHERE session_id = ? AND seq > ? ORDER BY seq LIMIT ?
+                """, (session_id, seq, chunk_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_message(row)
+            seq = rows[-1][0]
+
+    def search(self, query: str, session_ids: list = None, personality: str = None, model: str = None,
+               since: float = None, until: float = None, limit: int = SEARCH_LIMIT) -> list:
+        """
+        Find stored messages containing every word of a query, newest first
+
+        Args:
+            query: Search box text (see search_terms())
+            session_ids: Only messages of these sessions (None for every
+                session). A session id is the only credential to its
+                conversation, so the UI passes the ones the visitor owns
+            personality: Only messages of this personality id
+            model: Only replies written by this model
+            since: Only messages created at or after this Unix time
+            until: Only messages created before this Unix time
+            limit: Maximum number of results
+
+        Returns:
+            Hit dicts with session_id, seq, is_user, personality, model,
+            created_at, timestamp and a snippet with the matches in bold
+        """
+        terms = search_terms(query)
+        if not terms or session_ids is not None and not session_ids:
+            return []
+        conditions, params = [], []
+        if session_ids is not None:
+            conditions.append(f"m.session_id IN ({', '.join('?' * len(session_ids))})")
+            params.extend(session_ids)
+        for condition, value in (("m.personality = ?", personality), ("m.model = ?", model),
+                                 ("m.created_at >= ?", since), ("m.created_at < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        with self._lock:
+            # Date filters also bound the rowids scanned, so the index is not
+            # walked through every match outside the range
+            if since is not None:
+                conditions.append("messages_fts.rowid >= ?")
+                params.append(self._first_rowid_at(since))
+            if until is not None:
+                conditions.append("messages_fts.rowid < ?")
+                params.append(self._first_rowid_at(until))
+            for prefix in (False, True):
+                if prefix and len(terms[-1]) < PREFIX_MIN_CHARS:
+                    break
+                rows = self._conn.execute(f"""
+                    SELECT m.session_id, m.seq, m.is_user, m.timestamp, m.personality, m.model, m.created_at,
+                           snippet(messages_fts, 0, '**', '**', '…', {SNIPPET_WORDS})
+                    FROM messages_fts JOIN messages AS m ON m.rowid = messages_fts.rowid
+                    WHERE {' AND '.join(["messages_fts MATCH ?", *conditions])}
+                    ORDER BY messages_fts.rowid DESC LIMIT ?
+                """, (_fts_query(terms, prefix, session_ids), *params, limit)).fetchall()
+                if rows:
+                    break
+        keys = ("session_id", "seq", "is_user", "timestamp", "personality", "model", "created_at", "snippet")
+        return [{**dict(zip(keys, row)), "is_user": bool(row[2])} for row in rows]
+
+    def _first_rowid_at(self, created_at: float) -> int:
+        """
+        Binary search the first rowid created at or after a time
+
+        Messages are appended in time order, so rowids and creation times
+        increase together. Rows without a creation time (stored before it
+        was recorded) count as oldest. Caller holds the lock.
+        """
+        # Separate statements, so each is a single index lookup
+        low = self._conn.execute("SELECT MIN(rowid) FROM messages").fetchone()[0]
+        if low is None:
+            return 0
+        high = self._conn.execute("SELECT MAX(rowid) + 1 FROM messages").fetchone()[0]
+        while low < high:
+            middle = (low + high) // 2
+            rowid, row_created_at = self._conn.execute(
+                "SELECT rowid, created_at FROM messages WHERE rowid >= ? ORDER BY rowid LIMIT 1", (middle,)
+            ).fetchone()
+            if row_created_at is not None and row_created_at >= created_at:
+                high = middle
+            else:
+                low = rowid + 1
+        return low
+
+    def clear(self, session_id: str):
+        """Delete every message of a session"""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def _to_message(self, row) -> dict:
+        seq, is_user, content, timestamp, personality, model, created_at = row
+        message = {"content": content, "is_user": bool(is_user), "timestamp": timestamp, "seq": seq}
+        if personality is not None:
+            message["personality"] = personality
+        if model is not None:
+            message["model"] = model
+        if created_at is not None:
+            message["created_at"] = created_at
+        return message
+
+
+class JSONLConversationStore:
+    """Conversation store keeping one append-only JSONL file per session"""
+
+    def __init__(self, directory: str):
+        """
+        Initialize the store
+
+        Args:
+            directory: Directory holding one <session_id>.jsonl file per session
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Byte offset of each line, built on first access per session
+        self._offsets = {}
+
+    def _path(self, session_id: str) -> str:
+        _check_session_id(session_id)
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def _line_offsets(self, session_id: str) -> list:
+        offsets = self._offsets.get(session_id)
+        if offsets is None:
+            offsets = []
+            path = self._path(session_id)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    position = 0
+                    for line in f:
+                        offsets.append(position)
+                        position += len(line)
+            self._offsets[session_id] = offsets
+        return offsets
+
+    def append(self, session_id: str, message: dict) -> int:
+        """
+        Append a message to a session
+
+        Args:
+            session_id: Conversation identifier
+            message: Message dict with content, is_user, timestamp, personality
+                and, for replies, model; created_at is set when missing
+
+        Returns:
+            Sequence number assigned to the message
+        """
+        message.setdefault("created_at", time.time())
+        with self._lock:
+            offsets = self._line_offsets(session_id)
+            seq = len(offsets)
+            record = {key: value for key, value in message.items() if key != "seq"}
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self._path(session_id), "ab") as f:
+                offsets.append(f.tell())
+                f.write(line)
+        message["seq"] = seq
+        return seq
+
+    def count(self, session_id: str) -> int:
+        """Get the number of messages in a session"""
+        with self._lock:
+            return len(self._line_offsets(session_id))
+
+    def tail(self, session_id: str, limit: int) -> list:
+        """
+        Get the most recent messages of a session
+
+        Args:
+            session_id: Conversation identifier
+            limit: Maximum number of messages
+
+        Returns:
+            Message dicts, oldest first
+        """
+        return self.page(session_id, None, limit)
+
+    def page(self, session_id: str, before_seq, limit: int) -> list:
+        """
+        Get the messages immediately preceding a sequence number
+
+        Args:
+            session_id: Conversation identifier
+            before_seq: Sequence number to page back from (None for the end)
+            limit: Maximum number of messages
+
+        Returns:
+            Message dicts, oldest first
+        """
+        with self._lock:
+            offsets = self._line_offsets(session_id)
+            end = len(offsets) if before_seq is None else min(before_seq, len(offsets))
+            start = max(0, end - limit)
+            if start >= end:
+                return []
+            with open(self._path(session_id), "rb") as f:
+                f.seek(offsets[start])
+                lines = [f.readline() for _ in range(end - start)]
+        return [self._to_message(line, start + i) for i, line in enumerate(lines)]
+
+    def by_seq(self, session_id: str, seqs: list) -> list:
+        """
+        Get the messages with the given sequence numbers
+
+        Args:
+            session_id: Conversation identifier
+            seqs: Sequence numbers; ones not in the session are skipped
+
+        Returns:
+            Message dicts, oldest first
+        """
+        with self._lock:
+            offsets = self._line_offsets(session_id)
+            seqs = sorted({seq for seq in seqs if 0 <= seq < len(offsets)})
+            if not seqs:
+                return []
+            lines = []
+            with open(self._path(session_id), "rb") as f:
+                for seq in seqs:
+                    f.seek(offsets[seq])
+                    lines.append(f.readline())
+        return [self._to_message(line, seq) for seq, line in zip(seqs, lines)]
+
+    def iter_messages(self, session_id: str, chunk_size: int = 500) -> Generator[dict, None, None]:
+        """
+        Iterate over every message of a session without loading it all
+
+        Args:
+            session_id: Conversation identifier
+            chunk_size: Unused; lines are streamed from the file
+
+        Yields:
+            Message dicts, oldest first
+        """
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for seq, line in enumerate(f):
+                yield self._to_message(line, seq)
+
+    def search(self, query: str, session_ids: list = None, personality: str = None, model: str = None,
+               since: float = None, until: float = None, limit: int = SEARCH_LIMIT) -> list:
+        """
+        Find stored messages containing every word of a query, newest first
+
+        There is no index: the file of every session searched is scanned,
+        which suits small deployments; use the SQLite store for large histories. Words match
+        exactly, without the SQLite store's stemming.
+
+        Args:
+            query: Search box text (see search_terms())
+            session_ids: Only messages of these sessions (None for every
+                session). A session id is the only credential to its
+                conversation, so the UI passes the ones the visitor owns
+            personality: Only messages of this personality id
+            model: Only replies written by this model
+            since: Only messages created at or after this Unix time
+            until: Only messages created before this Unix time
+            limit: Maximum number of results
+
+        Returns:
+            Hit dicts with session_id, seq, is_user, personality, model,
+            created_at, timestamp and a snippet with the matches in bold
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        if session_ids is None:
+            session_ids = [
+                session_id for session_id, extension in map(os.path.splitext, os.listdir(self.directory))
+                if extension == ".jsonl" and valid_session_id(session_id)
+            ]
+        # Whole-word hits, and hits with the last word as a prefix as a fallback
+        hits, prefix_hits = [], []
+        for session_id in session_ids:
+            for message in self.iter_messages(session_id):
+                created_at = message.get("created_at", 0.0)
+                if (personality is not None and message.get("personality") != personality
+                        or model is not None and message.get("model") != model
+                        or since is not None and created_at < since
+                        or until is not None and created_at >= until):
+                    continue
+                words = set(search_terms(message["content"]))
+                if not all(term in words for term in terms[:-1]):
+                    continue
+                if terms[-1] in words:
+                    hits.append((created_at, session_id, message))
+                elif len(terms[-1]) >= PREFIX_MIN_CHARS and any(word.startswith(terms[-1]) for word in words):
+                    prefix_hits.append((created_at, session_id, message))
+        hits = hits or prefix_hits
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [{
+            "session_id": session_id,
+            "seq": message["seq"],
+            "is_user": message["is_user"],
+            "timestamp": message["timestamp"],
+            "personality": message.get("personality"),
+            "model": message.get("model"),
+            "created_at": message.get("created_at"),
+            "snippet": _snippet(message["content"], terms)
+        } for _, session_id, message in hits[:limit]]
+
+    def clear(self, session_id: str):
+        """Delete every message of a session"""
+        with self._lock:
+            path = self._path(session_id)
+            if os.path.exists(path):
+                os.remove(path)
+            self._offsets.pop(session_id, None)
+
+    def _to_message(self, line: bytes, seq: int) -> dict:
+        message = json.loads(line)
+        message["seq"] = seq
+        return message
+
+
+def _snippet(content: str, terms: list) -> str:
+    """Words around the first match with matching words in bold, like FTS5 snippet()"""
+    words = content.split()
+    matches = [
+        i for i, word in enumerate(words)
+        if any(found == term or found.startswith(term) for found in search_terms(word) for term in terms)
+    ]
+    if not matches:
+        return " ".join(words[:SNIPPET_WORDS])
+    start = max(0, matches[0] - SNIPPET_WORDS // 2)
+    shown = [f"**{word}**" if i in matches else word
+             for i, word in enumerate(words[start:start + SNIPPET_WORDS], start)]
+    return ("…" if start > 0 else "") + " ".join(shown) + ("…" if start + SNIPPET_WORDS < len(words) else "")
+
+
+def open_store(spec: str):
+    """
+    Open a conversation store from a spec string
+
+    Args:
+        spec: "sqlite:<path>" or "jsonl:<directory>"
+
+    Returns:
+        SQLiteConversationStore or JSONLConversationStore
+    """
+    kind, _, location = spec.partition(":")
+    if kind == "sqlite":
+        return SQLiteConversationStore(location)
+    if kind == "jsonl":
+        return JSONLConversationStore(location)
+    raise ValueError(f"Unknown conversation store: {spec!r}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """
+    Get the process-wide conversation store
+
+    Configured with CONVERSATION_STORE, defaulting to sqlite:conversations.db.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(os.getenv("CONVERSATION_STORE", "sqlite:conversations.db"))
+    return _store
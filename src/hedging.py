@@ -0,0 +1,138 @@
+"""
+Hedged streaming: race a backup request against a slow first token
+
+If the primary stream has not produced content within the deadline, a
+duplicate request is fired (optionally to a different model) and
+whichever stream produces content first is streamed to the caller. The
+loser is cancelled: its worker stops consuming and closes the upstream
+response at its next chunk, so it never reaches the caller. A primary
+that fails before producing content with a connection error or timeout
+fires the backup immediately; any other error (an HTTP status such as
+401 or 429) is raised to the caller without a backup, so a rejected
+request is not sent twice and rate limits are left to the scheduler.
+"""
+import queue
+import threading
+import time
+from typing import Iterator
+
+from src.metrics import error_type
+
+_DONE = object()
+
+# Primary errors that fire the backup at once; anything else is raised to the caller
+HEDGED_ERRORS = frozenset({"connection", "timeout"})
+
+
+class _Attempt:
+    """One upstream request streamed on a worker thread"""
+
+    def __init__(self, llm, messages: list, results: queue.Queue, label: str):
+        self.llm = llm
+        self.label = label
+        self.stop = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(messages, results), daemon=True,
+                                       name=f"hedge-{label}")
+        self.thread.start()
+
+    def _run(self, messages, results):
+        try:
+            for chunk in self.llm.stream(messages):
+                if self.stop.is_set():
+                    # Leaving the loop closes the stream and its HTTP response
+                    return
+                results.put((self, chunk))
+            results.put((self, _DONE))
+        except Exception as e:
+            results.put((self, e))
+
+
+class HedgedStream:
+    """
+    Iterator over the chunks of whichever request answers first
+
+    After iteration, `hedged` tells whether a backup was fired and
+    `winner` is the label ("primary" or "backup") of the stream used.
+    """
+
+    def __init__(self, primary, messages: list, deadline: float, backup=None):
+        """
+        Start the primary request
+
+        Args:
+            primary: Chat model for the primary request
+            messages: Prompt messages
+            deadline: Seconds to wait for content before firing the backup
+            backup: Chat model for the backup request (defaults to primary)
+        """
+        self.messages = messages
+        self.deadline = deadline
+        self.backup = backup or primary
+        self.hedged = False
+        self.winner = None
+        self._results = queue.Queue()
+        self._attempts = [_Attempt(primary, messages, self._results, "primary")]
+        self._started = time.perf_counter()
+
+    def _fire_backup(self):
+        self.hedged = True
+        self._attempts.append(_Attempt(self.backup, self.messages, self._results, "backup"))
+
+    def cancel(self):
+        """Stop every outstanding request"""
+        for attempt in self._attempts:
+            attempt.stop.set()
+
+    def __iter__(self) -> Iterator:
+        try:
+            yield from self._stream()
+        finally:
+            self.cancel()
+
+    def _stream(self):
+        # Chunks without content (e.g. role headers) received before a winner is known
+        preamble = {}
+        failed = []
+        winner = None
+        while winner is None:
+            timeout = None
+            if not self.hedged:
+                timeout = max(0.0, self._started + self.deadline - time.perf_counter())
+            try:
+                attempt, item = self._results.get(timeout=timeout)
+            except queue.Empty:
+                self._fire_backup()
+                continue
+
+            if isinstance(item, Exception):
+                failed.append((attempt, item))
+                if not self.hedged:
+                    if error_type(item) not in HEDGED_ERRORS:
+                        raise item
+                    self._fire_backup()
+                elif len(failed) == len(self._attempts):
+                    raise failed[0][1]
+                continue
+            if item is _DONE or getattr(item, "content", True):
+                winner = attempt
+            preamble.setdefault(attempt, []).append(item)
+
+        self.winner = winner.label
+        for attempt in self._attempts:
+            if attempt is not winner:
+                attempt.stop.set()
+
+        for item in preamble[winner]:
+            if item is _DONE:
+                return
+            yield item
+        while True:
+            attempt, item = self._results.get()
+            if attempt is not winner:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
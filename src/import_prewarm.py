@@ -0,0 +1,62 @@
+"""
+Import the chat stack in the background after first paint
+
+The app imports LangChain and the Groq SDK lazily, on the first message.
+Once the page has rendered, a background thread imports them ahead of
+time, so neither first paint nor, usually, the first message waits for
+them. Set PREWARM_IMPORTS=0 to import on the first message instead.
+"""
+import importlib
+import os
+import threading
+import time
+
+# Modules the first chat turn needs, imported after first paint; httpcore
+# and groq.resources are otherwise imported only when the first client is built
+PREWARM_MODULES = ("src.chat_manager", "langchain_groq", "groq.resources", "httpcore")
+
+# Seconds to wait before importing, so the first page is sent before the
+# imports compete with it for the GIL
+PREWARM_IMPORT_DELAY = 1.0
+
+_lock = threading.Lock()
+_import_thread = None
+
+
+def _import_modules(modules: tuple, delay: float):
+    time.sleep(delay)
+    try:
+        for name in modules:
+            importlib.import_module(name)
+        from src.llm_pool import get_pool
+        get_pool().warm()
+    except Exception:
+        # The first message does the same work and reports the error
+        pass
+
+
+def ensure_imports_prewarmed(modules: tuple = PREWARM_MODULES, delay: float = PREWARM_IMPORT_DELAY) -> bool:
+    """
+    Import the chat stack in a background thread once per process
+
+    The thread also creates the client pool's shared HTTP client. A turn
+    that arrives before the thread finishes waits on the import lock for
+    the rest, rather than importing a second time.
+
+    Args:
+        modules: Module names to import
+        delay: Seconds to wait before importing
+
+    Returns:
+        Whether this call started the thread
+    """
+    global _import_thread
+    if os.getenv("PREWARM_IMPORTS", "1") == "0":
+        return False
+    with _lock:
+        if _import_thread is not None:
+            return False
+        _import_thread = threading.Thread(target=_import_modules, args=(modules, delay), name="prewarm-imports",
+                                          daemon=True)
+        _import_thread.start()
+    return True
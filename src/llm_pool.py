@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import httpx
+from langchain_core.language_models import BaseChatModel
+from src.backends import create_llm, default_backend
+from src.context_window import COMPLETION_TOKENS
+
+# Maximum number of configured clients kept alive in the process
+MAX_CLIENTS = 32
+
+# Keep-alive limits for the shared HTTP connection pool
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Per thread: lists collecting the responses opened inside closing_responses()
+_collectors = threading.local()
+
+
+def _track_response(response: httpx.Response):
+    stack = getattr(_collectors, "stack", None)
+    if stack:
+        stack[-1].append(response)
+
+
+@contextmanager
+def closing_responses():
+    """
+    Close the HTTP responses this thread opens inside the block on leaving it
+
+    A LangChain stream() that is abandoned midway leaves its response open
+    until garbage collection, so the upstream keeps generating; wrapping the
+    iteration in this block closes the connection as soon as it is left.
+    Closing a response that was read to the end is a no-op.
+    """
+    if not hasattr(_collectors, "stack"):
+        _collectors.stack = []
+    responses = []
+    _collectors.stack.append(responses)
+    try:
+        yield
+    finally:
+        # Generators suspended in the block can leave it in any order
+        _collectors.stack.remove(responses)
+        for response in responses:
+            response.close()
+
+
+class LLMPool:
+    """Process-wide registry of chat model clients sharing one HTTP connection pool"""
+
+    def __init__(self, max_size: int = MAX_CLIENTS):
+        """
+        Initialize an empty pool
+
+        Args:
+            max_size: Maximum number of clients before least recently used are evicted
+        """
+        self.max_size = max_size
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self._http_client = None
+
+        self.created = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @property
+    def http_client(self) -> httpx.Client:
+        """Shared keep-alive HTTP client, created on first use"""
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT,
+                                             event_hooks={"response": [_track_response]})
+        return self._http_client
+
+    def get(self, api_key: str, model_name: str, temperature: float,
+            max_tokens: int = COMPLETION_TOKENS, base_url: str = None,
+            backend: str = None, max_retries: int = None, streaming: bool = True) -> BaseChatModel:
+        """
+        Get a client for the given configuration, creating it if needed
+
+        Args:
+            api_key: Groq API key
+            model_name: Groq model to use
+            temperature: Sampling temperature
+            max_tokens: Maximum completion tokens
+            base_url: Optional API base URL override
+            backend: Backend name, defaults to LLM_BACKEND
+            max_retries: Client-level retries (None keeps the client default)
+            streaming: Whether invoke() streams too (stream() always does)
+
+        Returns:
+            Shared chat model instance
+        """
+        backend = backend or default_backend()
+        key = (backend, api_key, model_name, temperature, max_tokens, base_url, max_retries, streaming)
+        with self._lock:
+            llm = self._clients.get(key)
+            if llm is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return llm
+
+            llm = create_llm(backend, api_key, model_name, temperature, max_tokens,
+                             http_client=self.http_client, base_url=base_url, max_retries=max_retries,
+                             streaming=streaming)
+            self._clients[key] = llm
+            self.created += 1
+
+            # Evicted clients only drop their config; connections stay in the shared pool
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+            return llm
+
+    def warm(self):
+        """Create the shared HTTP client (and its TLS context) ahead of the first request"""
+        with self._lock:
+            return self.http_client
+
+    def __len__(self):
+        return len(self._clients)
+
+    def clear(self):
+        """Drop all clients and close the shared HTTP connections"""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+_pool = LLMPool()
+
+
+def get_llm(api_key: str, model_name: str, temperature: float,
+            max_tokens: int = COMPLETION_TOKENS, base_url: str = None,
+            backend: str = None, max_retries: int = None, streaming: bool = True) -> BaseChatModel:
+    """
+    Borrow a client from the process-wide pool
+
+    Args:
+        api_key: Groq API key
+        model_name: Groq model to use
+        temperature: Sampling temperature
+        max_tokens: Maximum completion tokens
+        base_url: Optional API base URL override
+        backend: Backend name, defaults to LLM_BACKEND
+        max_retries: Client-level retries (None keeps the client default)
+        streaming: Whether invoke() streams too (stream() always does)
+
+    Returns:
+        Shared chat model instance
+    """
+    return _pool.get(api_key, model_name, temperature, max_tokens, base_url, backend, max_retries, streaming)
+
+
+def get_pool() -> LLMPool:
+    """Get the process-wide client pool"""
+    return _pool
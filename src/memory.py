@@ -0,0 +1,278 @@
+"""
+Long-term memory over a conversation's older turns
+
+With memory on, ChatManager embeds every completed exchange and, when
+it builds a prompt, recalls the older exchanges most similar to the new
+message (among those no longer in the verbatim history) and sends them
+as a system message ahead of the history. Embeddings are hashed
+character n-gram vectors computed with NumPy, so there is no model to
+download, and each conversation keeps them in one float32 matrix: a
+lookup is a single matrix-vector product. Given a way to load stored
+messages, the index keeps only the sequence numbers of exchanges that
+have left the verbatim history and loads their text when recalled, so
+memory stays bounded like the loaded transcript.
+
+Matching is lexical: a question recalls the turn that used the same
+names and words, not one that is only related in meaning.
+"""
+import re
+import numpy as np
+from src.context_window import estimate_tokens
+
+# Embedding width; a remembered exchange costs 4 bytes per dimension
+EMBEDDING_DIM = 512
+
+# Character n-gram lengths hashed into the embedding
+NGRAM_SIZES = (3, 4, 5)
+
+# Characters of an exchange that are embedded; the rest is ignored
+MAX_EMBED_CHARS = 2000
+
+# Weight of the user's message against the reply in an exchange's embedding,
+# so long replies do not drown out what the user said
+USER_WEIGHT = 2.0
+
+# Cosine similarity below which a turn is not worth recalling. Unrelated
+# messages score up to ~0.25 against a long conversation, so some recalls
+# are noise; MEMORY_TOKENS bounds what they cost
+MIN_SIMILARITY = 0.15
+
+# Upper bound on the recalled turns' share of the prompt
+MEMORY_TOKENS = 800
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Words too common to say anything about what a turn is about
+STOPWORDS = frozenset("""
+a about again also am an and any are as at be been but by can could did do does for from had has
+have how i if in into is it its just may me might must my no not of on or our should so some still
+than that the then there these this those to up very was we were what when where which who why
+will with would you your
+""".split())
+
+# Multipliers for hashing n-grams (FNV prime) and mixing the hash (golden ratio)
+_HASH_PRIME = np.uint32(0x01000193)
+_HASH_MIX = np.uint32(0x9E3779B1)
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed text as a hashed character n-gram vector
+
+    Text is lowercased and reduced to its words, stopwords dropped.
+    Each n-gram is hashed to a signed bucket, counts are damped with
+    log1p so frequent n-grams do not dominate, and the vector is
+    normalized so a dot product is cosine similarity.
+
+    Args:
+        text: Text to embed
+        dim: Embedding width
+
+    Returns:
+        Unit-length float32 vector (all zeros for text without words)
+    """
+    words = [word for word in _NON_WORD.split(text[:MAX_EMBED_CHARS].lower()) if word and word not in STOPWORDS]
+    normalized = " " + " ".join(words) + " "
+    data = np.frombuffer(normalized.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    counts = np.zeros(dim)
+    for n in NGRAM_SIZES:
+        grams = len(data) - n + 1
+        if grams <= 0:
+            continue
+        # Vectorized hash of every n-gram at once; uint32 arithmetic wraps
+        hashes = np.full(grams, n, dtype=np.uint32)
+        for offset in range(n):
+            hashes = (hashes * _HASH_PRIME) ^ data[offset:offset + grams]
+        hashes *= _HASH_MIX
+        signs = 1.0 - 2.0 * (hashes >> np.uint32(31))
+        counts += np.bincount((hashes >> np.uint32(8)) % dim, weights=signs, minlength=dim)
+    vector = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def embed_exchange(user_text: str, ai_text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed an exchange, weighting the user's message over the reply
+
+    Returns:
+        Unit-length float32 vector
+    """
+    vector = USER_WEIGHT * embed(user_text, dim) + embed(ai_text, dim)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class MemoryIndex:
+    """Embedded exchanges of one conversation, searchable by similarity"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = 64, load=None):
+        """
+        Initialize an empty index
+
+        Args:
+            dim: Embedding width
+            capacity: Rows allocated up front; the matrix doubles as it fills
+            load: Optional function returning the stored message dicts with
+                the given sequence numbers. With it, exchanges older than the
+                verbatim history whose messages have been stored (carry a
+                "seq") keep only their sequence numbers; without it every
+                exchange's messages are kept
+        """
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        # (user message, assistant message) dicts, shared with the history,
+        # or (user seq, assistant seq) once released
+        self._entries = []
+        self._load = load
+        # Entries before this index are older than the history and released
+        self._released = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the embedding matrix"""
+        return self._vectors.nbytes
+
+    @property
+    def held(self) -> int:
+        """Exchanges whose message dicts the index holds (the rest are loaded on recall)"""
+        return len(self._entries) - sum(not isinstance(user_message, dict)
+                                        for user_message, _ in self._entries[:self._released])
+
+    def add(self, user_message: dict, ai_message: dict):
+        """
+        Remember a completed exchange
+
+        Args:
+            user_message: User's message dict
+            ai_message: Assistant's message dict
+        """
+        count = len(self._entries)
+        if count == len(self._vectors):
+            grown = np.zeros((count * 2, self.dim), dtype=np.float32)
+            grown[:count] = self._vectors
+            self._vectors = grown
+        self._vectors[count] = embed_exchange(user_message["content"], ai_message["content"], self.dim)
+        self._entries.append((user_message, ai_message))
+
+    def add_history(self, messages: list):
+        """
+        Remember every user message directly followed by a reply
+
+        Exchanges of failed calls (messages marked "error") are skipped.
+
+        Args:
+            messages: Message dicts, oldest first (e.g. a resumed transcript)
+        """
+        for user_message, ai_message in zip(messages, messages[1:]):
+            if (user_message["is_user"] and not ai_message["is_user"]
+                    and not user_message.get("error") and not ai_message.get("error")):
+                self.add(user_message, ai_message)
+
+    def search(self, text: str, k: int, limit: int = None,
+               min_similarity: float = MIN_SIMILARITY) -> list:
+        """
+        Find the exchanges most similar to a text
+
+        Args:
+            text: Query text
+            k: Maximum number of exchanges
+            limit: Only search the first limit exchanges (the older ones)
+            min_similarity: Cosine similarity an exchange needs to be returned
+
+        Returns:
+            (similarity, index, (user message, assistant message)) tuples, best first
+        """
+        count = len(self._entries) if limit is None else min(limit, len(self._entries))
+        if count == 0 or k <= 0:
+            return []
+        scores = self._vectors[:count] @ embed(text, self.dim)
+        if k < count:
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        top = [int(i) for i in top if scores[i] >= min_similarity]
+        exchanges = self._exchanges(top)
+        return [(float(scores[i]), i, exchanges[i]) for i in top if i in exchanges]
+
+    def _exchanges(self, indices: list) -> dict:
+        """Get the message dicts of entries, loading released ones in one call"""
+        exchanges, released = {}, {}
+        for i in indices:
+            user_message, ai_message = self._entries[i]
+            if isinstance(user_message, dict):
+                exchanges[i] = (user_message, ai_message)
+            else:
+                released[i] = (user_message, ai_message)
+        if released:
+            stored = {message["seq"]: message
+                      for message in self._load([seq for pair in released.values() for seq in pair])}
+            for i, (user_seq, ai_seq) in released.items():
+                # Skipped if no longer in the store
+                if user_seq in stored and ai_seq in stored:
+                    exchanges[i] = (stored[user_seq], stored[ai_seq])
+        return exchanges
+
+    def _release(self, count: int):
+        """Keep only the sequence numbers of stored exchanges among the first count"""
+        if self._load is None:
+            return
+        for i in range(self._released, count):
+            user_message, ai_message = self._entries[i]
+            if "seq" in user_message and "seq" in ai_message:
+                self._entries[i] = (user_message["seq"], ai_message["seq"])
+        self._released = max(self._released, count)
+
+    def older_than(self, history) -> int:
+        """
+        Count the exchanges that are no longer in the verbatim history
+
+        The history holds the most recent messages, so these are a prefix.
+
+        Args:
+            history: Message dicts currently sent verbatim
+
+        Returns:
+            Number of leading exchanges not in the history
+        """
+        in_history = {id(message) for message in history}
+        count = len(self._entries)
+        while count and id(self._entries[count - 1][0]) in in_history:
+            count -= 1
+        return count
+
+    def recall(self, text: str, k: int, history, max_tokens: int = MEMORY_TOKENS) -> list:
+        """
+        Pick older exchanges relevant to a message, within a token budget
+
+        Args:
+            text: New user message
+            k: Maximum number of exchanges
+            history: Message dicts currently sent verbatim, which are skipped
+            max_tokens: Budget for the recalled messages
+
+        Returns:
+            Recalled exchanges in conversation order
+        """
+        older = self.older_than(history)
+        picked, used = [], 0
+        for _, index, (user_message, ai_message) in self.search(text, k, older):
+            tokens = sum(message.get("tokens") or estimate_tokens(message["content"])
+                         for message in (user_message, ai_message))
+            if used + tokens > max_tokens:
+                continue
+            picked.append((index, (user_message, ai_message)))
+            used += tokens
+        # Exchanges that left the history are only needed again if recalled
+        self._release(older)
+        return [exchange for _, exchange in sorted(picked, key=lambda item: item[0])]
+
+    def clear(self):
+        """Forget every exchange"""
+        self._vectors = np.zeros((64, self.dim), dtype=np.float32)
+        self._entries = []
+        self._released = 0
@@ -0,0 +1,388 @@
+"""
+Latency and token instrumentation for model calls
+
+ChatManager records a CallMetrics per call (time to first token,
+inter-token latency, duration, usage tokens, cache hit, error type) and
+hands it to its hooks. The default hooks aggregate calls into the
+process-wide registry, exposed in Prometheus text format, and emit one
+structured JSON log line per call.
+
+Set METRICS_PORT to serve the registry at /metrics on that port
+(bound to METRICS_HOST, default 127.0.0.1).
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("chatbot.metrics")
+
+# Weight of the newest call in the per-model mean duration
+DURATION_EWMA_ALPHA = 0.1
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INTER_TOKEN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def error_type(error: Exception) -> str:
+    """Classify an exception raised by a model call"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limit"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is not None:
+        return "client_error"
+    name = type(error).__name__
+    if name == "CancelledError":
+        return "cancelled"
+    if "Timeout" in name:
+        return "timeout"
+    if "Connect" in name or "Protocol" in name:
+        return "connection"
+    return name
+
+
+@dataclass(slots=True)
+class CallMetrics:
+    """Timings and token counts of a single model call"""
+    model: str
+    backend: str
+    personality: str
+    started: float = field(default_factory=time.perf_counter)
+    cached: bool = False
+    ttft: float = None
+    duration: float = None
+    chunks: int = 0
+    inter_token_total: float = 0.0
+    inter_token_max: float = 0.0
+    prompt_tokens: int = None
+    completion_tokens: int = None
+    error_type: str = None
+    # Set when the "auto" model routed the call: why, and the model it replaced
+    route_reason: str = None
+    route_baseline: str = None
+    # Estimated seconds saved by routing, filled in by the registry
+    latency_saved: float = None
+    # Whether a hedged backup request was fired, and which stream won
+    hedged: bool = False
+    hedge_winner: str = None
+    # Whether the call joined an identical request's stream instead of calling the model
+    coalesced: bool = False
+    # Retries made by the request scheduler, and seconds spent queued for admission
+    retries: int = 0
+    queue_time: float = None
+    _last_chunk: float = None
+
+    def chunk(self, message=None):
+        """
+        Record the arrival of a streamed chunk
+
+        Chunks without content (role headers, the trailing usage chunk)
+        only contribute usage, not timings.
+
+        Args:
+            message: Optional message chunk carrying content and usage_metadata
+        """
+        if message is not None:
+            self.usage(message)
+            if not getattr(message, "content", True):
+                return
+        now = time.perf_counter()
+        if self._last_chunk is None:
+            self.ttft = now - self.started
+        else:
+            gap = now - self._last_chunk
+            self.inter_token_total += gap
+            self.inter_token_max = max(self.inter_token_max, gap)
+        self._last_chunk = now
+        self.chunks += 1
+
+    def usage(self, message):
+        """Take prompt/completion token counts from a message's usage metadata"""
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.prompt_tokens = usage.get("input_tokens", self.prompt_tokens)
+            self.completion_tokens = usage.get("output_tokens", self.completion_tokens)
+
+    def finish(self, error: Exception = None):
+        """Stop the clock, classifying the error if the call failed"""
+        self.duration = time.perf_counter() - self.started
+        if self.ttft is None and error is None:
+            self.ttft = self.duration
+        if error is not None:
+            self.error_type = error_type(error)
+
+    @property
+    def inter_token_mean(self) -> float:
+        """Mean gap between streamed chunks, or None for single-chunk calls"""
+        return self.inter_token_total / (self.chunks - 1) if self.chunks > 1 else None
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Completion tokens per second after the first token"""
+        if not self.completion_tokens or self.duration is None or self.ttft is None:
+            return None
+        streaming = self.duration - self.ttft
+        return self.completion_tokens / streaming if streaming > 0 else None
+
+    def to_dict(self) -> dict:
+        """Public fields plus derived values, for logging"""
+        record = {key: value for key, value in asdict(self).items() if not key.startswith("_")}
+        del record["started"]
+        record["inter_token_mean"] = self.inter_token_mean
+        return record
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide aggregate of model call metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every recorded value"""
+        with self._lock:
+            self.requests = {}
+            self.cache_hits = {}
+            self.errors = {}
+            self.prompt_tokens = {}
+            self.completion_tokens = {}
+            self.ttft = {}
+            self.inter_token = {}
+            self.duration = {}
+            self.routes = {}
+            self.hedges = {}
+            self.retries = {}
+            self.routing_latency_saved = 0.0
+            self.mean_duration = {}
+
+    def record(self, call: CallMetrics):
+        """
+        Add a finished call
+
+        Routed calls that went to a cheaper model get latency_saved set
+        from the running mean duration of the model they replaced.
+        """
+        model = (call.model,)
+        outcome = ("error" if call.error_type else "cached" if call.cached
+                   else "coalesced" if call.coalesced else "ok")
+        # Coalesced calls joined a stream part way, so only add to the counts
+        timed = call.error_type is None and not call.cached and not call.coalesced
+        with self._lock:
+            if call.route_reason:
+                key = (call.model, call.route_reason)
+                self.routes[key] = self.routes.get(key, 0) + 1
+                baseline = self.mean_duration.get(call.route_baseline)
+                if timed and call.model != call.route_baseline and baseline is not None:
+                    call.latency_saved = baseline - call.duration
+                    self.routing_latency_saved += call.latency_saved
+            if call.retries:
+                self.retries[model] = self.retries.get(model, 0) + call.retries
+            if call.hedged:
+                key = (call.model, call.hedge_winner or "none")
+                self.hedges[key] = self.hedges.get(key, 0) + 1
+            if timed:
+                mean = self.mean_duration.get(call.model)
+                self.mean_duration[call.model] = call.duration if mean is None else (
+                    mean + DURATION_EWMA_ALPHA * (call.duration - mean))
+            key = (call.model, call.backend, outcome)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if call.cached:
+                self.cache_hits[model] = self.cache_hits.get(model, 0) + 1
+            if call.error_type:
+                key = (call.model, call.error_type)
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if call.prompt_tokens:
+                self.prompt_tokens[model] = self.prompt_tokens.get(model, 0) + call.prompt_tokens
+            if call.completion_tokens:
+                self.completion_tokens[model] = self.completion_tokens.get(model, 0) + call.completion_tokens
+            if timed:
+                self._histogram(self.ttft, model, LATENCY_BUCKETS).observe(call.ttft)
+                self._histogram(self.duration, model, LATENCY_BUCKETS).observe(call.duration)
+                if call.inter_token_mean is not None:
+                    self._histogram(self.inter_token, model, INTER_TOKEN_BUCKETS).observe(call.inter_token_mean)
+
+    def _histogram(self, family: dict, labels: tuple, buckets: tuple) -> Histogram:
+        histogram = family.get(labels)
+        if histogram is None:
+            histogram = family[labels] = Histogram(buckets)
+        return histogram
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+
+        def counter(name, help_text, family, label_names):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(family.items()):
+                lines.append(f"{name}{{{_labels(label_names, labels)}}} {value}")
+
+        def histogram(name, help_text, family):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in sorted(family.items()):
+                base = _labels(("model",), labels)
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{base}}} {hist.sum}")
+                lines.append(f"{name}_count{{{base}}} {hist.count}")
+
+        with self._lock:
+            counter("chatbot_llm_requests_total", "Model calls by outcome (ok, cached, coalesced, error)",
+                    self.requests, ("model", "backend", "outcome"))
+            counter("chatbot_llm_cache_hits_total", "Replies served from the response cache",
+                    self.cache_hits, ("model",))
+            counter("chatbot_llm_errors_total", "Failed model calls by error type",
+                    self.errors, ("model", "error_type"))
+            counter("chatbot_llm_retries_total", "Requests retried by the scheduler",
+                    self.retries, ("model",))
+            counter("chatbot_llm_hedges_total", "Backup requests fired by hedging, by winning stream",
+                    self.hedges, ("model", "winner"))
+            counter("chatbot_router_decisions_total", "Turns routed by the auto model option",
+                    self.routes, ("model", "reason"))
+            lines.append("# HELP chatbot_router_latency_saved_seconds_total "
+                         "Estimated seconds saved by routing turns to a faster model")
+            lines.append("# TYPE chatbot_router_latency_saved_seconds_total counter")
+            lines.append(f"chatbot_router_latency_saved_seconds_total {self.routing_latency_saved}")
+            counter("chatbot_llm_prompt_tokens_total", "Prompt tokens reported by the API",
+                    self.prompt_tokens, ("model",))
+            counter("chatbot_llm_completion_tokens_total", "Completion tokens reported by the API",
+                    self.completion_tokens, ("model",))
+            histogram("chatbot_llm_ttft_seconds", "Time to first token", self.ttft)
+            histogram("chatbot_llm_inter_token_seconds", "Mean gap between streamed chunks per call",
+                      self.inter_token)
+            histogram("chatbot_llm_duration_seconds", "Total call duration", self.duration)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+
+
+class SessionStats:
+    """Running totals for one chat session, shown in the sidebar"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.completion_tokens = 0
+        self.routed = 0
+        self.fast_routes = 0
+        self.latency_saved = 0.0
+        self.last = None
+        self._ttft_total = 0.0
+        self._timed_calls = 0
+
+    def record(self, call: CallMetrics):
+        """Add a finished call"""
+        self.calls += 1
+        self.last = call
+        if call.cached:
+            self.cache_hits += 1
+        if call.error_type:
+            self.errors += 1
+        self.completion_tokens += call.completion_tokens or 0
+        if call.route_reason:
+            self.routed += 1
+            if call.model != call.route_baseline:
+                self.fast_routes += 1
+            self.latency_saved += call.latency_saved or 0.0
+        if call.ttft is not None and not call.cached and not call.error_type:
+            self._ttft_total += call.ttft
+            self._timed_calls += 1
+
+    @property
+    def mean_ttft(self) -> float:
+        """Mean time to first token of uncached, successful calls"""
+        return self._ttft_total / self._timed_calls if self._timed_calls else None
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    return _registry
+
+
+def record_call(call: CallMetrics):
+    """Default hook: aggregate the call into the process-wide registry"""
+    _registry.record(call)
+
+
+def log_call(call: CallMetrics):
+    """Default hook: emit one structured JSON log line for the call"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "llm_call", **call.to_dict()}))
+
+
+DEFAULT_HOOKS = (record_call, log_call)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def ensure_metrics_server(port: int = None):
+    """
+    Serve /metrics once per process if METRICS_PORT (or port) is set
+
+    Args:
+        port: Port to listen on, defaults to METRICS_PORT
+
+    Returns:
+        The running server, or None when disabled
+    """
+    global _server
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            address = (os.getenv("METRICS_HOST", "127.0.0.1"), port)
+            _server = ThreadingHTTPServer(address, _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,132 @@
+"""
+Per-turn model routing for the "auto" model option
+
+A cheap local heuristic scores each user message for how much it needs
+the large model: length, question complexity (reasoning, code, multi-part
+asks), how much history the answer depends on, and the personality in
+use. Messages scoring below the threshold go to the fast model, the rest
+to the strong one. When the user signals the last answer fell short, the
+router escalates to the strong model for the next few turns.
+"""
+import re
+from dataclasses import dataclass
+
+AUTO_MODEL = "auto"
+FAST_MODEL = "llama-3.1-8b-instant"
+STRONG_MODEL = "llama-3.3-70b-versatile"
+
+# Messages scoring at or above this go to the strong model
+STRONG_THRESHOLD = 2.5
+
+# Turns to stay on the strong model after an escalation
+ESCALATION_TURNS = 3
+
+# Casual personalities lean towards the fast model, demanding ones away from it
+PERSONALITY_BIAS = {
+    "friendly_companion": -0.5,
+    "motivational_coach": -0.5,
+    "professional_assistant": 0.0,
+    "witty_intellectual": 0.5,
+    "creative_writer": 1.0
+}
+
+_SMALL_TALK = re.compile(
+    r"^\s*(hi|hey|hello|yo|thanks|thank you|thx|ok|okay|cool|nice|great|lol|haha|good (morning|night|evening)"
+    r"|how are you|what'?s up|bye|see you)\b[\s!.?]*", re.IGNORECASE
+)
+_COMPLEX = re.compile(
+    r"\b(explain|analy[sz]e|compare|contrast|evaluate|derive|prove|design|architect|optimi[sz]e|debug|"
+    r"implement|refactor|algorithm|trade-?offs?|step[- ]by[- ]step|in depth|detailed|pros and cons|why)\b",
+    re.IGNORECASE
+)
+_CODE = re.compile(r"```|\b(def|class|function|SELECT|import|return)\b|[{};]\s*$|\w+\(.*\)", re.MULTILINE)
+_MATH = re.compile(r"\d+\s*[-+*/^=]\s*\d+|\b(integral|equation|probability|matrix|proof)\b", re.IGNORECASE)
+_DISSATISFIED = re.compile(
+    r"\b(that'?s (wrong|incorrect|not right)|not what i (asked|meant)|you('re| are) wrong|try again|"
+    r"more detail|be more specific|doesn'?t (work|make sense)|didn'?t (work|answer))\b",
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RoutingDecision:
+    """Model chosen for one turn and why"""
+    model: str
+    reason: str
+    score: float
+
+
+def complexity_score(user_input: str, personality_id: str = None, history_tokens: int = 0) -> float:
+    """
+    Score how much a message needs the strong model
+
+    Args:
+        user_input: User's message
+        personality_id: Active personality id
+        history_tokens: Tokens of history the answer can depend on
+
+    Returns:
+        Score; STRONG_THRESHOLD and above means the strong model
+    """
+    words = len(user_input.split())
+    score = PERSONALITY_BIAS.get(personality_id, 0.0)
+    if _SMALL_TALK.match(user_input) and words <= 8:
+        return score - 2.0
+    score += min(words / 40, 2.0)
+    score += 1.5 * min(len(_COMPLEX.findall(user_input)), 2)
+    if _CODE.search(user_input):
+        score += 2.0
+    if _MATH.search(user_input):
+        score += 1.5
+    if user_input.count("?") > 1:
+        score += 0.5
+    if history_tokens > 3000:
+        score += 0.5
+    return score
+
+
+class ModelRouter:
+    """Chooses the model for each turn of one session"""
+
+    def __init__(self, fast_model: str = FAST_MODEL, strong_model: str = STRONG_MODEL,
+                 threshold: float = STRONG_THRESHOLD, escalation: bool = True):
+        """
+        Initialize the router
+
+        Args:
+            fast_model: Cheap model for simple turns
+            strong_model: Model for demanding turns
+            threshold: Score at which turns go to the strong model
+            escalation: Whether dissatisfaction moves the next turns to the strong model
+        """
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.threshold = threshold
+        self.escalation = escalation
+        self._escalated_turns = 0
+
+    def route(self, user_input: str, personality_id: str = None, history_tokens: int = 0) -> RoutingDecision:
+        """
+        Pick the model for a turn
+
+        Args:
+            user_input: User's message
+            personality_id: Active personality id
+            history_tokens: Tokens of history in the prompt
+
+        Returns:
+            RoutingDecision
+        """
+        score = complexity_score(user_input, personality_id, history_tokens)
+        if self.escalation and _DISSATISFIED.search(user_input):
+            self._escalated_turns = ESCALATION_TURNS
+        if self._escalated_turns:
+            self._escalated_turns -= 1
+            return RoutingDecision(self.strong_model, "escalated", score)
+        if score >= self.threshold:
+            return RoutingDecision(self.strong_model, "complex", score)
+        return RoutingDecision(self.fast_model, "simple", score)
+
+    def escalate(self, turns: int = ESCALATION_TURNS):
+        """Send the next turns to the strong model"""
+        self._escalated_turns = turns
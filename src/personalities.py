@@ -1,4 +1,47 @@
-PERSONALITIES = {
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+@dataclass(frozen=True, slots=True)
+class Personality:
+    """Immutable personality definition shared by every session"""
+    id: str
+    name: str
+    emoji: str
+    system_prompt: str
+    temperature: float
+    avatar: str
+    color: str
+    description: str
+    example_prompts: tuple
+
+    def override(self, temperature: float = None):
+        """
+        Layer per-session settings on top of this personality
+
+        Args:
+            temperature: Session temperature (None keeps the default)
+
+        Returns:
+            This personality if nothing is overridden, else a PersonalityOverride
+        """
+        if temperature is None or temperature == self.temperature:
+            return self
+        return PersonalityOverride(self, temperature)
+
+
+@dataclass(frozen=True, slots=True)
+class PersonalityOverride:
+    """Per-session view of a Personality with overridden settings"""
+    base: Personality
+    temperature: float
+
+    def __getattr__(self, name):
+        # Everything not overridden is read from the shared base
+        return getattr(self.base, name)
+
+
+_PERSONALITY_DATA = {
     "professional_assistant": {
         "name": "Professional Assistant",
         "emoji": "🎯",
@@ -108,3 +151,15 @@ Paint pictures with words. Transform ordinary ideas into extraordinary expressio
         ]
     }
 }
+
+# Frozen registry, built once at import and shared read-only across sessions
+PERSONALITIES = MappingProxyType({
+    personality_id: Personality(
+        id=personality_id,
+        example_prompts=tuple(data.pop("example_prompts")),
+        **data
+    )
+    for personality_id, data in _PERSONALITY_DATA.items()
+})
+
+del _PERSONALITY_DATA
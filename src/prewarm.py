@@ -0,0 +1,153 @@
+"""
+Precompute replies for the personality quick starters
+
+Usage:
+    python -m src.prewarm [--output prewarmed_starters.json] [--models MODEL ...]
+
+Every (personality, example prompt, model) combination is sent to Groq
+once and stored with the response cache key it would be looked up by.
+Because the key hashes the system prompt and temperature, entries for a
+personality whose prompt or temperature has since changed simply stop
+matching and are skipped at load time.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from src.context_window import MODEL_CONTEXT_WINDOWS
+from src.personalities import PERSONALITIES
+from src.response_cache import cache_key
+
+DEFAULT_PREWARM_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    "prewarmed_starters.json")
+
+_loaded_paths = set()
+_load_lock = threading.Lock()
+
+
+def starter_key(personality, prompt: str, model_name: str) -> str:
+    """
+    Get the response cache key for a quick starter on a fresh chat
+
+    Args:
+        personality: Personality
+        prompt: Example prompt
+        model_name: Groq model name
+
+    Returns:
+        Cache key matching what ChatManager looks up
+    """
+    return cache_key(model_name, personality.system_prompt, personality.temperature, [], prompt)
+
+
+def precompute(api_key: str, models: list) -> dict:
+    """
+    Generate replies for every quick starter
+
+    Args:
+        api_key: Groq API key
+        models: Model names to generate for
+
+    Returns:
+        Entries keyed by cache key
+    """
+    from src.chat_manager import ChatManager
+
+    entries = {}
+    for personality_id, personality in PERSONALITIES.items():
+        for model_name in models:
+            for prompt in personality.example_prompts:
+                manager = ChatManager(api_key, personality, model_name)
+                started = time.perf_counter()
+                try:
+                    reply = manager.llm.invoke(manager._build_messages(prompt)).content
+                except Exception as e:
+                    print(f"skipped {personality_id} / {model_name} / {prompt!r}: {e}", file=sys.stderr)
+                    continue
+                entries[starter_key(personality, prompt, model_name)] = {
+                    "personality": personality_id,
+                    "model": model_name,
+                    "prompt": prompt,
+                    "reply": reply,
+                    "latency": time.perf_counter() - started
+                }
+                print(f"generated {personality_id} / {model_name} / {prompt!r}")
+    return entries
+
+
+def load_prewarmed(cache, path: str = DEFAULT_PREWARM_PATH) -> int:
+    """
+    Pin precomputed starter replies in a response cache
+
+    Pinned, they stay served however long the process runs and however
+    full the cache gets. Entries whose key no longer matches the current
+    personality configuration are ignored.
+
+    Args:
+        cache: ResponseCache to fill
+        path: JSON file written by the precompute command
+
+    Returns:
+        Number of entries loaded
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    current_keys = {
+        starter_key(personality, prompt, model_name)
+        for personality in PERSONALITIES.values()
+        for prompt in personality.example_prompts
+        for model_name in MODEL_CONTEXT_WINDOWS
+    }
+    loaded = 0
+    for key, entry in entries.items():
+        if key in current_keys:
+            cache.pin(key, entry["reply"], entry.get("latency", 0.0))
+            loaded += 1
+    return loaded
+
+
+def ensure_prewarmed(cache, path: str = None) -> int:
+    """
+    Load precomputed starter replies once per process
+
+    Args:
+        cache: ResponseCache to fill
+        path: JSON file, defaults to PREWARM_PATH or prewarmed_starters.json
+
+    Returns:
+        Number of entries loaded by this call
+    """
+    path = path or os.getenv("PREWARM_PATH", DEFAULT_PREWARM_PATH)
+    with _load_lock:
+        if path in _loaded_paths:
+            return 0
+        _loaded_paths.add(path)
+    return load_prewarmed(cache, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute replies for personality quick starters")
+    parser.add_argument("--output", default=DEFAULT_PREWARM_PATH, help="JSON file to write")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_CONTEXT_WINDOWS),
+                        help="Models to generate replies for")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        parser.error("GROQ_API_KEY is not set")
+
+    entries = precompute(api_key, args.models)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    print(f"wrote {len(entries)} replies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
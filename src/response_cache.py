@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Generator
+
+# Default time-to-live for cached replies (seconds)
+DEFAULT_TTL = 24 * 60 * 60
+
+# Default maximum number of cached replies
+DEFAULT_MAX_ENTRIES = 1000
+
+# Size of the chunks a cached reply is replayed in
+REPLAY_CHUNK_CHARS = 24
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different prompts share a cache entry
+
+    Collapses whitespace, ignores case and trailing punctuation, so
+    "Give me a pep talk!" and "give me a pep talk" hit the same reply.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Normalized text
+    """
+    return _WHITESPACE.sub(" ", text).strip().rstrip(".!?").casefold()
+
+
+def cache_key(model_name: str, system_prompt: str, temperature: float, history: list, user_input: str) -> str:
+    """
+    Build the cache key for a request
+
+    Args:
+        model_name: Groq model name
+        system_prompt: Personality system prompt
+        temperature: Sampling temperature
+        history: Prior messages as (role, content) pairs
+        user_input: User's message
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps([
+        model_name,
+        system_prompt,
+        round(temperature, 3),
+        [(role, normalize_text(content)) for role, content in history],
+        normalize_text(user_input)
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def replay_chunks(text: str, size: int = REPLAY_CHUNK_CHARS) -> Generator[str, None, None]:
+    """
+    Split a cached reply into chunks so it replays like a stream
+
+    Args:
+        text: Cached reply
+        size: Characters per chunk
+
+    Yields:
+        Consecutive chunks of the reply
+    """
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class MemoryCacheBackend:
+    """In-process LRU store for cached replies"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize an empty store
+
+        Args:
+            max_entries: Maximum number of entries before least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Get (reply, latency, created_at) for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, reply: str, latency: float, created_at: float):
+        """Store a reply, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (reply, latency, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """Remove an entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU store for cached replies, shared across processes"""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum number of entries before least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                reply TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def get(self, key: str):
+        """Get (reply, latency, created_at) for a key, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reply, latency, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def set(self, key: str, reply: str, latency: float, created_at: float):
+        """Store a reply, evicting the least recently used entries"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, reply, latency, created_at, time.time())
+            )
+            self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def delete(self, key: str):
+        """Remove an entry if present"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Reply cache with TTL expiry and hit-rate / latency-saved counters
+
+    Pinned replies (the precomputed quick starters) are held in memory
+    apart from the backend: they never expire, are never evicted to make
+    room, and survive clear().
+    """
+
+    def __init__(self, backend=None, ttl: float = DEFAULT_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            backend: MemoryCacheBackend or SQLiteCacheBackend (in-memory by default)
+            ttl: Seconds a cached reply stays valid
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self._pinned = {}
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str):
+        """
+        Look up a cached reply
+
+        Args:
+            key: Key from cache_key()
+
+        Returns:
+            The cached reply, or None on a miss or expired entry
+        """
+        pinned = self._pinned.get(key)
+        if pinned is not None:
+            reply, latency = pinned
+            self.hits += 1
+            self.latency_saved += latency
+            return reply
+        entry = self.backend.get(key)
+        if entry is not None:
+            reply, latency, created_at = entry
+            if time.time() - created_at <= self.ttl:
+                self.hits += 1
+                self.latency_saved += latency
+                return reply
+            self.backend.delete(key)
+        self.misses += 1
+        return None
+
+    def set(self, key: str, reply: str, latency: float = 0.0):
+        """
+        Store a reply
+
+        Args:
+            key: Key from cache_key()
+            reply: Complete model reply
+            latency: Seconds the upstream call took, credited on each hit
+        """
+        self.backend.set(key, reply, latency, time.time())
+
+    def pin(self, key: str, reply: str, latency: float = 0.0):
+        """
+        Store a reply that is exempt from expiry and eviction
+
+        Args:
+            key: Key from cache_key()
+            reply: Complete model reply
+            latency: Seconds the upstream call took, credited on each hit
+        """
+        self._pinned[key] = (reply, latency)
+
+    @property
+    def pinned(self) -> int:
+        """Number of pinned replies"""
+        return len(self._pinned)
+
+    def clear(self):
+        """Remove all cached replies except pinned ones and reset counters"""
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache
+
+    Uses SQLite at RESPONSE_CACHE_PATH when set, otherwise memory.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv("RESPONSE_CACHE_PATH")
+            backend = SQLiteCacheBackend(path) if path else MemoryCacheBackend()
+            _cache = ResponseCache(backend)
+    return _cache
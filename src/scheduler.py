@@ -0,0 +1,351 @@
+"""
+Rate-limit aware request scheduling and retries
+
+Every model request passes through a per-API-key scheduler that can cap
+concurrency, enforces token buckets for requests and tokens per minute,
+pauses the key when the API answers 429, and admits queued requests
+round-robin across sessions so one heavy session cannot starve others.
+The queue is bounded; requests beyond it fail fast with SchedulerBusy.
+
+Failed requests are retried with jittered exponential backoff (honouring
+Retry-After). A stream that fails midway is resumed by sending the text
+already streamed as an assistant prefill, and any repetition of that
+text in the continuation is dropped, so callers never see text twice.
+
+Configured with SCHEDULER_RPM and SCHEDULER_TPM (0 disables the bucket),
+SCHEDULER_CONCURRENCY (0, the default, for no cap; a cap shared by every
+session of the key queues their turns behind each other) and
+SCHEDULER_MAX_QUEUE.
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Error types (see metrics.error_type) worth retrying
+RETRYABLE_ERRORS = frozenset({"rate_limit", "server_error", "connection", "timeout"})
+
+MAX_RETRIES = 4
+# A 429 only says to come back later, and every session of the key already
+# waits out the pause, so rate-limited requests get a larger budget
+MAX_RATE_LIMIT_RETRIES = 8
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+# Tokens assumed for a reply when reserving tokens-per-minute capacity
+EXPECTED_COMPLETION_TOKENS = 300
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when the request queue is full or a request waited too long"""
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    Get the wait before a retry
+
+    Args:
+        attempt: Zero-based retry number
+        retry_after: Seconds the server asked to wait, if any
+
+    Returns:
+        Seconds to sleep: full jitter over an exponential ceiling, but
+        never less than retry_after
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def retry_after(error: Exception) -> float:
+    """Get the Retry-After seconds from an API error, if present"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize a full bucket
+
+        Args:
+            per_minute: Refill rate and capacity
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (oversized amounts wait for a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        """Take tokens; the level may go negative when usage is corrected upwards"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+class Ticket:
+    """A queued or admitted request"""
+
+    def __init__(self, session_id: str, tokens: int):
+        self.session_id = session_id
+        self.tokens = tokens
+        self.granted = threading.Event()
+        self.released = False
+        self.queued_at = time.perf_counter()
+        self.wait_time = None
+
+
+class KeyScheduler:
+    """Admission control for the requests made with one API key"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, max_concurrent: int = 0, max_queue: int = 256):
+        """
+        Initialize the scheduler
+
+        Args:
+            rpm: Requests per minute (0 for unlimited)
+            tpm: Tokens per minute (0 for unlimited)
+            max_concurrent: Requests in flight at once (0 for unlimited)
+            max_queue: Requests allowed to wait for admission
+        """
+        self.requests_bucket = TokenBucket(rpm) if rpm else None
+        self.tokens_bucket = TokenBucket(tpm) if tpm else None
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        # Session id -> its waiting tickets; the head session is served next
+        self._queues = OrderedDict()
+        self._waiting = 0
+        self.active = 0
+        self._paused_until = 0.0
+        self._timer = None
+
+    @property
+    def waiting(self) -> int:
+        """Requests waiting for admission"""
+        return self._waiting
+
+    def submit(self, session_id: str, tokens: int) -> Ticket:
+        """
+        Queue a request
+
+        Args:
+            session_id: Session the request belongs to (the fairness unit)
+            tokens: Estimated tokens the request will use
+
+        Returns:
+            Ticket whose `granted` event is set once admitted
+
+        Raises:
+            SchedulerBusy: The queue is full
+        """
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise SchedulerBusy(f"Request queue is full ({self.max_queue} waiting)")
+            ticket = Ticket(session_id, tokens)
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            self._waiting += 1
+            self._dispatch()
+        return ticket
+
+    def acquire(self, session_id: str, tokens: int, timeout: float = None) -> Ticket:
+        """
+        Queue a request and wait until it is admitted
+
+        Raises:
+            SchedulerBusy: The queue is full or the wait exceeded timeout
+        """
+        ticket = self.submit(session_id, tokens)
+        if not ticket.granted.wait(timeout):
+            self.cancel(ticket)
+            if not ticket.granted.is_set():
+                raise SchedulerBusy(f"Request waited more than {timeout}s for admission")
+        return ticket
+
+    def cancel(self, ticket: Ticket):
+        """Withdraw a queued request, or release it if it was already admitted"""
+        with self._lock:
+            queue = self._queues.get(ticket.session_id)
+            if not ticket.granted.is_set() and queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket.session_id]
+                self._waiting -= 1
+                return
+        self.release(ticket)
+
+    def release(self, ticket: Ticket, tokens_used: int = None):
+        """
+        Free an admitted request's slot
+
+        Args:
+            ticket: Ticket returned by submit() or acquire()
+            tokens_used: Actual tokens used, to correct the reservation
+        """
+        with self._lock:
+            if ticket.released or not ticket.granted.is_set():
+                return
+            ticket.released = True
+            self.active -= 1
+            if tokens_used is not None and self.tokens_bucket is not None:
+                self.tokens_bucket.take(tokens_used - ticket.tokens, time.monotonic())
+            self._dispatch()
+
+    def pause(self, seconds: float):
+        """Stop admitting requests for a while (after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _dispatch(self):
+        # Caller holds the lock
+        while self._queues and (not self.max_concurrent or self.active < self.max_concurrent):
+            now = time.monotonic()
+            session_id, queue = next(iter(self._queues.items()))
+            ticket = queue[0]
+            wait = self._paused_until - now
+            if self.requests_bucket is not None:
+                wait = max(wait, self.requests_bucket.wait_time(1, now))
+            if self.tokens_bucket is not None:
+                wait = max(wait, self.tokens_bucket.wait_time(ticket.tokens, now))
+            if wait > 0:
+                self._wake_in(wait)
+                return
+
+            # Admit, then move the session to the back of the rotation
+            queue.popleft()
+            del self._queues[session_id]
+            if queue:
+                self._queues[session_id] = queue
+            if self.requests_bucket is not None:
+                self.requests_bucket.take(1, now)
+            if self.tokens_bucket is not None:
+                self.tokens_bucket.take(ticket.tokens, now)
+            self._waiting -= 1
+            self.active += 1
+            ticket.wait_time = time.perf_counter() - ticket.queued_at
+            ticket.granted.set()
+
+    def _wake_in(self, delay: float):
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+
+class RequestScheduler:
+    """Process-wide registry of per-key schedulers"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, max_concurrent: int = 0, max_queue: int = 256):
+        """
+        Initialize the registry; arguments apply to every key
+
+        Args:
+            rpm: Requests per minute per key (0 for unlimited)
+            tpm: Tokens per minute per key (0 for unlimited)
+            max_concurrent: Requests in flight per key (0 for unlimited)
+            max_queue: Requests allowed to wait per key
+        """
+        self.settings = dict(rpm=rpm, tpm=tpm, max_concurrent=max_concurrent, max_queue=max_queue)
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def for_key(self, api_key: str) -> KeyScheduler:
+        """Get the scheduler for an API key"""
+        with self._lock:
+            scheduler = self._keys.get(api_key)
+            if scheduler is None:
+                scheduler = self._keys[api_key] = KeyScheduler(**self.settings)
+        return scheduler
+
+
+class ResumableReply:
+    """
+    Text streamed so far for one reply, and how to resume it
+
+    After a mid-stream failure the retry prompt ends with the partial
+    reply as an assistant message, which the model continues. Should the
+    continuation start over instead, the repeated prefix is swallowed.
+    """
+
+    def __init__(self, messages: list):
+        """
+        Args:
+            messages: Original prompt messages
+        """
+        self.messages = messages
+        self.text = ""
+        self._held = ""
+        self._resuming = False
+
+    def prompt(self) -> list:
+        """Messages for the next attempt"""
+        if not self.text:
+            return self.messages
+        from langchain_core.messages import AIMessage
+        return self.messages + [AIMessage(content=self.text)]
+
+    def restart(self):
+        """Prepare for another attempt"""
+        self._resuming = bool(self.text)
+        self._held = ""
+
+    def feed(self, piece: str) -> str:
+        """
+        Take a streamed piece of text
+
+        Args:
+            piece: Chunk content from the current attempt
+
+        Returns:
+            Text that is new to the caller (possibly empty)
+        """
+        if not self._resuming:
+            self.text += piece
+            return piece
+        self._held += piece
+        if self.text.startswith(self._held):
+            # Could still be the model repeating what was already sent
+            return ""
+        self._resuming = False
+        new = self._held[len(self.text):] if self._held.startswith(self.text) else self._held
+        self._held = ""
+        self.text += new
+        return new
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Get the process-wide request scheduler, configured from the environment"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(
+                rpm=float(os.getenv("SCHEDULER_RPM", "0")),
+                tpm=float(os.getenv("SCHEDULER_TPM", "0")),
+                max_concurrent=int(os.getenv("SCHEDULER_CONCURRENCY", "0")),
+                max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "256"))
+            )
+    return _scheduler
@@ -0,0 +1,158 @@
+"""
+Single-flight streaming: identical in-flight requests share one upstream stream
+
+The first request for a key starts the upstream stream on a worker
+thread, which appends every piece of reply text to a buffer shared by
+the flight. Every subscriber, the first one included, reads that buffer
+from the start, so a request that joins late replays the text produced
+so far and then follows the stream live: all of them receive the same
+full reply. A flight leaves the registry when its stream ends, so later
+identical requests start a new one (or are answered by the response
+cache). If every subscriber leaves first, the worker stops and closes
+the upstream response at its next piece.
+"""
+import threading
+from typing import Callable, Iterator
+
+
+class _Flight:
+    """One upstream stream and the reply text it produced so far"""
+
+    def __init__(self, key: str, lock: threading.Lock):
+        self.key = key
+        self.pieces = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.abandoned = False
+        self.changed = threading.Condition(lock)
+
+
+class SharedStream:
+    """
+    Iterator over the reply text of a flight, from its first piece
+
+    After iteration starts, `joined` tells whether this request attached
+    to a stream another request had already started.
+    """
+
+    def __init__(self, registry: "SingleFlight", key: str, start: Callable[[], Iterator[str]]):
+        self.registry = registry
+        self.key = key
+        self.start = start
+        self.joined = None
+
+    def __iter__(self) -> Iterator[str]:
+        # Subscribing on first iteration means a stream that is never
+        # iterated never holds a flight open
+        flight, self.joined = self.registry._subscribe(self.key, self.start)
+        try:
+            yield from self.registry._follow(flight)
+        finally:
+            self.registry._unsubscribe(flight)
+
+
+class SingleFlight:
+    """Process-wide registry of in-flight streams, keyed by request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        # Upstream streams started, and requests that joined one instead
+        self.started = 0
+        self.joined = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
+
+    def stream(self, key: str, start: Callable[[], Iterator[str]]) -> SharedStream:
+        """
+        Stream the reply for a request, sharing an identical one in flight
+
+        Args:
+            key: Identifies the request (e.g. from response_cache.cache_key())
+            start: Called to start the upstream stream when none is in
+                flight; returns an iterator over reply text
+
+        Returns:
+            Iterable over the full reply text
+        """
+        return SharedStream(self, key, start)
+
+    def _subscribe(self, key: str, start: Callable[[], Iterator[str]]) -> tuple:
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if joined:
+                self.joined += 1
+            else:
+                flight = self._flights[key] = _Flight(key, self._lock)
+                self.started += 1
+            flight.subscribers += 1
+        if not joined:
+            threading.Thread(target=self._run, args=(flight, start), daemon=True,
+                             name="single-flight").start()
+        return flight, joined
+
+    def _unsubscribe(self, flight: _Flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening: stop the upstream, and let the next
+                # identical request start afresh instead of joining it
+                flight.abandoned = True
+                self._remove(flight)
+
+    def _remove(self, flight: _Flight):
+        # Caller holds the lock
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _run(self, flight: _Flight, start: Callable[[], Iterator[str]]):
+        error = None
+        source = None
+        try:
+            source = start()
+            for piece in source:
+                with self._lock:
+                    if flight.abandoned:
+                        break
+                    flight.pieces.append(piece)
+                    flight.changed.notify_all()
+        except Exception as e:
+            error = e
+        finally:
+            # Closing a generator mid-stream closes its upstream response
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+            with self._lock:
+                flight.done = True
+                flight.error = error
+                self._remove(flight)
+                flight.changed.notify_all()
+
+    def _follow(self, flight: _Flight) -> Iterator[str]:
+        index = 0
+        while True:
+            with self._lock:
+                while index == len(flight.pieces) and not flight.done:
+                    flight.changed.wait()
+                pieces = flight.pieces[index:]
+                index += len(pieces)
+                done, error = flight.done, flight.error
+            # Yielded outside the lock, so a slow subscriber holds up no one
+            yield from pieces
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight registry"""
+    return _single_flight
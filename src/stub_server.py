@@ -0,0 +1,317 @@
+"""
+Local stand-in for the Groq chat completions API
+
+Speaks the Groq/OpenAI chat-completions protocol (including SSE
+streaming) with configurable latency, latency spikes, token rate and
+error injection, and replies deterministically: the same request always
+produces the same text. Used for offline benchmarking and development.
+
+Usage:
+    python -m src.stub_server [--port 8765] [--token-rate 200] [--error-rate 0.1]
+
+Then run the app against it with LLM_BACKEND=stub.
+"""
+import argparse
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+# Words deterministic replies are built from
+VOCABULARY = (
+    "the quick answer is clear and simple so let us walk through each step "
+    "with care because good ideas need structure focus energy and a little wit"
+).split()
+
+
+def reply_tokens(messages: list, count: int) -> list:
+    """
+    Build a deterministic reply for a conversation
+
+    Args:
+        messages: Request messages
+        count: Number of tokens in the reply
+
+    Returns:
+        Reply tokens, each ending in a space
+    """
+    seed = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    return [rng.choice(VOCABULARY) + " " for _ in range(count)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # One handler instance is created per TCP connection
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            inject_error = self.server.rng.random() < self.server.error_rate
+            delay = self.server.first_token_latency
+            if self.server.rng.random() < self.server.spike_rate:
+                delay += self.server.spike_latency
+            drop = self.server.fail_after_tokens is not None and self.server.rng.random() < self.server.drop_rate
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+            return
+        if inject_error:
+            self._send_error()
+            return
+
+        model = request.get("model", "stub")
+        messages = request.get("messages", [])
+        if messages and messages[-1].get("role") == "assistant":
+            # Assistant prefill: continue the reply the conversation would get
+            prefill = messages[-1].get("content", "")
+            tokens = reply_tokens(messages[:-1], self.server.reply_tokens)
+            position = 0
+            while position < len(tokens) and prefill.startswith("".join(tokens[:position + 1])):
+                position += 1
+            tokens = tokens[position:]
+        else:
+            tokens = reply_tokens(messages, self.server.reply_tokens)
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages) // 4,
+            "completion_tokens": len(tokens)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if delay:
+            time.sleep(delay)
+
+        if request.get("stream"):
+            self._stream(model, tokens, usage, self.server.fail_after_tokens if drop else None)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+    def _stream(self, model, tokens, usage, fail_after_tokens=None):
+        with self.server.lock:
+            self.server.streams += 1
+        try:
+            self._stream_events(model, tokens, usage, fail_after_tokens)
+        finally:
+            with self.server.lock:
+                self.server.streams -= 1
+
+    def _stream_events(self, model, tokens, usage, fail_after_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = 1.0 / self.server.token_rate if self.server.token_rate else 0
+        for i, token in enumerate(tokens):
+            if i == fail_after_tokens:
+                # Drop the connection mid-stream, like a network failure
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            if interval and i:
+                time.sleep(interval)
+            self._write_event(self._chunk(model, {"content": token}, None))
+
+        final = self._chunk(model, {}, "stop")
+        final["x_groq"] = {"usage": usage}
+        self._write_event(final)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _send_error(self):
+        status = self.server.error_status
+        body = {"error": {
+            "message": "Injected error from stub server",
+            "type": "rate_limit_exceeded" if status == 429 else "server_error"
+        }}
+        headers = {"Retry-After": str(self.server.retry_after)} if status == 429 else {}
+        self._send_json(status, body, headers)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, model, delta, finish_reason):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+
+    def _write_event(self, event):
+        self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server holding its behaviour settings and request counters"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, reply_tokens: int = 20, token_rate: float = 0, first_token_latency: float = 0,
+                 error_rate: float = 0, error_status: int = 500, retry_after: float = 1,
+                 fail_after_tokens: int = None, drop_rate: float = 1.0, spike_rate: float = 0, spike_latency: float = 0,
+                 seed: int = 0):
+        """
+        Bind the server
+
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            reply_tokens: Tokens in every reply
+            token_rate: Streamed tokens per second (0 sends them as fast as possible)
+            first_token_latency: Seconds to wait before the first token
+            error_rate: Fraction of requests answered with an error
+            error_status: HTTP status of injected errors (429 adds Retry-After)
+            retry_after: Retry-After seconds sent with injected 429s
+            fail_after_tokens: Drop streamed connections after this many tokens
+            drop_rate: Fraction of streams dropped when fail_after_tokens is set
+            spike_rate: Fraction of requests whose first token is delayed further
+            spike_latency: Extra seconds before the first token of a spiked request
+            seed: Seed for error and spike injection
+        """
+        super().__init__(address, StubHandler)
+        self.reply_tokens = reply_tokens
+        self.token_rate = token_rate
+        self.first_token_latency = first_token_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.fail_after_tokens = fail_after_tokens
+        self.drop_rate = drop_rate
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        # Streamed replies still being written (a client closing one ends it)
+        self.streams = 0
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning a stream (e.g. a cancelled hedge) are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        """URL to pass as the Groq base URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(port: int = 0, **options) -> StubServer:
+    """
+    Start the stub server in a daemon thread
+
+    Args:
+        port: Port on 127.0.0.1 (0 picks a free port)
+        **options: Behaviour settings accepted by StubServer
+
+    Returns:
+        The running server
+    """
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _serve(queue, options):
+    server = start_stub_server(**options)
+    queue.put(server.base_url)
+    threading.Event().wait()
+
+
+def start_stub_server_process(**options):
+    """
+    Start the stub server in a child process so it does not share the GIL
+
+    Args:
+        **options: Arguments accepted by start_stub_server
+
+    Returns:
+        (process, base_url); terminate the process when done
+    """
+    import multiprocessing
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(queue, options), daemon=True)
+    process.start()
+    return process, queue.get(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq-compatible stub server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--reply-tokens", type=int, default=50)
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Streamed tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument("--fail-after-tokens", type=int, help="Drop streams after this many tokens")
+    parser.add_argument("--drop-rate", type=float, default=1.0, help="Fraction of streams dropped")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="Fraction of requests with a latency spike")
+    parser.add_argument("--spike-latency", type=float, default=1.0, help="Extra seconds added by a spike")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubServer(
+        ("127.0.0.1", args.port),
+        reply_tokens=args.reply_tokens,
+        token_rate=args.token_rate,
+        first_token_latency=args.first_token_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        fail_after_tokens=args.fail_after_tokens,
+        drop_rate=args.drop_rate,
+        spike_rate=args.spike_rate,
+        spike_latency=args.spike_latency,
+        seed=args.seed
+    )
+    print(f"Stub Groq server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
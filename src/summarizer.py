@@ -0,0 +1,178 @@
+"""
+Rolling summary of turns evicted from the context window
+
+With summarization on, ChatManager keeps only the most recent turns
+verbatim (RECENT_HISTORY_TOKENS) and folds older ones into a running
+summary sent as a second system message, so prompt size stays roughly
+constant however long the chat gets. Folding runs on a shared background
+thread pool with a small, fast model, in batches of FOLD_BATCH_TOKENS;
+until a fold finishes, prompts use the previous summary followed by the
+evicted turns not yet folded into it, verbatim, so no turn drops out of
+the prompt in between.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage, SystemMessage
+from src.context_window import estimate_tokens
+from src.llm_pool import get_llm
+
+logger = logging.getLogger(__name__)
+
+# Model used to fold turns into the summary
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_TEMPERATURE = 0.2
+
+# Upper bound on the summary's length
+SUMMARY_MAX_TOKENS = 400
+
+# History kept verbatim when summarization is on
+RECENT_HISTORY_TOKENS = 1500
+
+# Evicted turns are folded in batches of at least this size
+FOLD_BATCH_TOKENS = 600
+
+# Evicted turns waiting to be folded; the oldest are dropped beyond this
+MAX_PENDING_TOKENS = 4000
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant. "
+    "Update the summary with the new turns. Keep names, facts, preferences, decisions and "
+    "open questions; drop pleasantries. Reply with the updated summary only, in at most "
+    f"{SUMMARY_MAX_TOKENS * 3 // 4} words."
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summarizer")
+    return _executor
+
+
+class RollingSummary:
+    """Incrementally updated summary of a session's evicted turns"""
+
+    def __init__(self, api_key: str, backend: str = None, model_name: str = SUMMARY_MODEL):
+        """
+        Initialize an empty summary
+
+        Args:
+            api_key: API key for the summary model
+            backend: LLM backend name, defaults to LLM_BACKEND
+            model_name: Model that writes the summary
+        """
+        self.api_key = api_key
+        self.backend = backend
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_tokens = 0
+        # Batch being folded, still sent verbatim until its fold lands
+        self._folding = []
+        self._future = None
+        self._generation = 0
+        self._text = ""
+        self._message = None
+        self.tokens = 0
+        self.folds = 0
+        self.failures = 0
+
+    def snapshot(self):
+        """
+        Get the current summary for prompt assembly
+
+        Returns:
+            (SystemMessage or None, its estimated tokens, message dicts
+            evicted but not yet folded into it, oldest first)
+        """
+        with self._lock:
+            return self._message, self.tokens, self._folding + self._pending
+
+    def add(self, messages: list):
+        """
+        Queue evicted messages and fold them in the background
+
+        Args:
+            messages: Evicted message dicts, oldest first
+        """
+        with self._lock:
+            for message in messages:
+                self._pending.append(message)
+                self._pending_tokens += message["tokens"]
+            while self._pending_tokens > MAX_PENDING_TOKENS and len(self._pending) > 1:
+                self._pending_tokens -= self._pending.pop(0)["tokens"]
+            self._schedule()
+
+    def _schedule(self):
+        # Caller holds the lock; one fold per session at a time
+        if self._pending_tokens >= FOLD_BATCH_TOKENS and (self._future is None or self._future.done()):
+            batch, self._pending, self._pending_tokens = self._pending, [], 0
+            self._folding = batch
+            self._future = _get_executor().submit(self._fold, self._generation, self._text, batch)
+
+    def _fold(self, generation: int, summary: str, batch: list):
+        turns = "\n".join(
+            f"{'User' if message['is_user'] else 'Assistant'}: {message['content']}" for message in batch
+        )
+        llm = get_llm(self.api_key, self.model_name, SUMMARY_TEMPERATURE,
+                      max_tokens=SUMMARY_MAX_TOKENS, backend=self.backend, streaming=False)
+        try:
+            text = llm.invoke([
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(content=f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{turns}")
+            ]).content.strip()
+        except Exception:
+            logger.warning("Summarizing %d messages failed; retrying with the next batch",
+                           len(batch), exc_info=True)
+            with self._lock:
+                self.failures += 1
+                if generation != self._generation:
+                    return
+                self._pending[:0] = batch
+                self._pending_tokens += sum(message["tokens"] for message in batch)
+                self._folding = []
+                self._future = None
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            if text:
+                self._text = text
+                self._message = SystemMessage(content=f"Summary of the earlier conversation:\n{text}")
+                self.tokens = estimate_tokens(self._message.content)
+            self._folding = []
+            self.folds += 1
+            # Fold turns evicted while this one ran
+            self._future = None
+            self._schedule()
+
+    def wait(self, timeout: float = None):
+        """Block until queued turns have been folded (for scripts and benchmarks)"""
+        while True:
+            with self._lock:
+                future = self._future
+            if future is None:
+                return
+            future.result(timeout)
+            with self._lock:
+                # A finished fold may have scheduled the next one
+                if self._future is future:
+                    return
+
+    def clear(self):
+        """Forget the summary and any queued turns"""
+        with self._lock:
+            self._pending, self._pending_tokens = [], 0
+            self._folding = []
+            self._text = ""
+            self._message = None
+            self.tokens = 0
+            # A fold still running finds the generation changed and discards its result
+            self._generation += 1
+            self._future = None
@@ -1,339 +1,28 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import hashlib
+import os
+import time
 from datetime import datetime
 
+THEME_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "theme.css")
+
+# Content hash appended to the stylesheet URL so browsers cache it until it changes
+with open(THEME_PATH, "rb") as _theme:
+    THEME_VERSION = hashlib.sha256(_theme.read()).hexdigest()[:12]
+
 def apply_custom_css():
-    """Apply premium dark theme CSS styling to the Streamlit app"""
-    st.markdown("""
-    <style>
-    * {
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-    }
-    
-    /* Root variables - Premium Dark Theme */
-    :root {
-        --bg-primary: #0f172a;
-        --bg-secondary: #1e293b;
-        --bg-tertiary: #334155;
-        --bg-card: rgba(30, 41, 59, 0.4);
-        --border-color: rgba(71, 85, 105, 0.3);
-        --border-light: rgba(100, 116, 139, 0.2);
-        --text-primary: #f8fafc;
-        --text-secondary: #cbd5e1;
-        --text-tertiary: #94a3b8;
-        --accent-indigo: #4f46e5;
-        --accent-amber: #b45309;
-        --accent-emerald: #047857;
-        --accent-blue: #0284c7;
-    }
-    
-    html, body {
-        background: linear-gradient(135deg, #0f172a 0%, #1a1f35 100%) !important;
-        color: var(--text-primary) !important;
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', sans-serif !important;
-        font-weight: 400 !important;
-    }
-    
-    /* Main container */
-    .main {
-        background: transparent !important;
-        color: var(--text-primary) !important;
-    }
-    
-    .stMainBlockContainer {
-        background: transparent !important;
-        padding: 2.5rem !important;
-        max-width: 100% !important;
-    }
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #1a2332 0%, #0f172a 100%) !important;
-        border-right: 1px solid var(--border-color) !important;
-    }
-    
-    [data-testid="stSidebar"] [data-testid="stVerticalBlockBorderWrapper"] {
-        background: transparent !important;
-    }
-    
-    /* All text elements */
-    p, span, label, li {
-        color: var(--text-secondary) !important;
-        font-weight: 400 !important;
-    }
-    
-    [data-testid="stSidebar"] p,
-    [data-testid="stSidebar"] label,
-    [data-testid="stSidebar"] span,
-    [data-testid="stSidebar"] h1,
-    [data-testid="stSidebar"] h2,
-    [data-testid="stSidebar"] h3,
-    [data-testid="stSidebar"] h4,
-    [data-testid="stSidebar"] h5,
-    [data-testid="stSidebar"] h6 {
-        color: var(--text-secondary) !important;
-        font-weight: 300 !important;
-    }
-    
-    /* Headers */
-    h1, h2, h3, h4, h5, h6 {
-        color: var(--text-primary) !important;
-        font-weight: 300 !important;
-        letter-spacing: -0.5px !important;
-    }
-    
-    h1 {
-        font-size: 2.5rem !important;
-        margin-bottom: 0.5rem !important;
-    }
-    
-    h2 {
-        font-size: 1.875rem !important;
-        font-weight: 300 !important;
-    }
-    
-    h3 {
-        font-size: 1.125rem !important;
-        font-weight: 400 !important;
-        letter-spacing: 0.5px !important;
-        text-transform: uppercase !important;
-    }
-    
-    /* Markdown text */
-    [data-testid="stMarkdown"] {
-        color: var(--text-secondary) !important;
-    }
-    
-    [data-testid="stMarkdown"] h1,
-    [data-testid="stMarkdown"] h2,
-    [data-testid="stMarkdown"] h3,
-    [data-testid="stMarkdown"] h4,
-    [data-testid="stMarkdown"] h5,
-    [data-testid="stMarkdown"] h6 {
-        color: var(--text-primary) !important;
-        font-weight: 300 !important;
-    }
-    
-    /* Selectbox */
-    .stSelectbox label {
-        color: var(--text-secondary) !important;
-        font-weight: 400 !important;
-    }
-    
-    .stSelectbox [data-baseweb="select"] {
-        border: 1px solid var(--border-color) !important;
-        border-radius: 10px !important;
-        background: var(--bg-card) !important;
-        backdrop-filter: blur(8px) !important;
-    }
-    
-    .stSelectbox [role="button"] {
-        color: var(--text-primary) !important;
-        font-weight: 400 !important;
-    }
-    
-    /* Slider */
-    .stSlider label {
-        color: var(--text-secondary) !important;
-        font-weight: 400 !important;
-    }
-    
-    .stSlider [role="slider"] {
-        border-radius: 10px !important;
-    }
-    
-    /* Metric styling */
-    .stMetric {
-        background: var(--bg-card) !important;
-        backdrop-filter: blur(12px) !important;
-        padding: 1.25rem !important;
-        border-radius: 12px !important;
-        border: 1px solid var(--border-color) !important;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3) !important;
-    }
-    
-    .stMetric label {
-        color: var(--text-tertiary) !important;
-        font-weight: 400 !important;
-        font-size: 0.875rem !important;
-    }
-    
-    .stMetric [data-testid="stMetricValue"] {
-        color: var(--text-primary) !important;
-        font-weight: 300 !important;
-        font-size: 2rem !important;
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        border-radius: 10px !important;
-        border: 1px solid var(--border-color) !important;
-        background: var(--bg-card) !important;
-        color: var(--text-primary) !important;
-        font-weight: 500 !important;
-        height: 42px !important;
-        transition: all 0.3s ease !important;
-        backdrop-filter: blur(8px) !important;
-    }
-    
-    .stButton > button:hover {
-        background: rgba(79, 70, 229, 0.15) !important;
-        border-color: var(--accent-indigo) !important;
-        box-shadow: 0 8px 24px rgba(79, 70, 229, 0.2) !important;
-        transform: translateY(-2px) !important;
-    }
-    
-    .stButton > button[type="secondary"] {
-        background: rgba(100, 116, 139, 0.1) !important;
-        border-color: var(--border-color) !important;
-    }
-    
-    .stButton > button[type="secondary"]:hover {
-        background: rgba(79, 70, 229, 0.15) !important;
-        border-color: var(--accent-indigo) !important;
-    }
-    
-    /* Chat input */
-    .stChatInput input {
-        border-radius: 12px !important;
-        border: 1px solid var(--border-color) !important;
-        background: var(--bg-card) !important;
-        backdrop-filter: blur(8px) !important;
-        color: var(--text-primary) !important;
-        font-size: 1rem !important;
-        font-weight: 400 !important;
-    }
-    
-    .stChatInput input:focus {
-        border-color: var(--accent-indigo) !important;
-        box-shadow: 0 0 0 3px rgba(79, 70, 229, 0.1) !important;
-    }
-    
-    .stChatInput input::placeholder {
-        color: var(--text-tertiary) !important;
-    }
-    
-    /* Alert/Info boxes */
-    .stAlert {
-        border-radius: 12px !important;
-        border-left: 4px solid var(--accent-indigo) !important;
-        background: rgba(79, 70, 229, 0.1) !important;
-        padding: 1rem 1.25rem !important;
-        backdrop-filter: blur(8px) !important;
-    }
-    
-    .stAlert p {
-        color: var(--text-secondary) !important;
-    }
-    
-    /* Divider */
-    hr {
-        border: none !important;
-        height: 1px !important;
-        background: var(--border-color) !important;
-        margin: 1.5rem 0 !important;
-    }
-    
-    /* Chat messages */
-    .stChatMessage {
-        padding: 1rem 0 !important;
-    }
-    
-    .stChatMessage > div {
-        background: transparent !important;
-    }
-    
-    .stChatMessage p,
-    .stChatMessage span {
-        color: var(--text-secondary) !important;
-        line-height: 1.6 !important;
-    }
-    
-    /* Caption */
-    .stCaption {
-        color: var(--text-tertiary) !important;
-        font-size: 0.875rem !important;
-    }
-    
-    /* Container background */
-    [data-testid="stVerticalBlockBorderWrapper"] {
-        background: transparent !important;
-    }
-    
-    /* General text */
-    p {
-        line-height: 1.6 !important;
-    }
-    
-    /* Welcome section styling */
-    .welcome-box {
-        background: linear-gradient(135deg, rgba(79, 70, 229, 0.1) 0%, rgba(2, 132, 199, 0.05) 100%);
-        border: 1px solid var(--border-color);
-        border-radius: 16px;
-        padding: 3rem;
-        text-align: center;
-        margin: 2rem auto;
-        box-shadow: 0 25px 50px rgba(0, 0, 0, 0.3);
-        backdrop-filter: blur(16px);
-    }
-    
-    .welcome-box h2 {
-        color: var(--text-primary);
-        font-size: 2rem;
-        margin: 1rem 0 0.75rem 0;
-        font-weight: 300;
-    }
-    
-    .welcome-box p {
-        color: var(--text-secondary);
-        font-size: 1rem;
-        margin: 0.75rem 0;
-        line-height: 1.7;
-        font-weight: 300;
-    }
-    
-    /* Scrollbar styling */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--bg-secondary);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--accent-indigo);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--accent-blue);
-    }
-    
-    /* Personality card styling */
-    .personality-card {
-        background: var(--bg-card);
-        backdrop-filter: blur(12px);
-        border: 1px solid var(--border-color);
-        border-radius: 12px;
-        padding: 1rem;
-        margin-top: 0.75rem;
-    }
-    
-    .personality-card strong {
-        color: var(--text-primary);
-        font-weight: 500;
-    }
-    
-    .personality-card p {
-        color: var(--text-secondary);
-        font-size: 0.9375rem;
-        margin-top: 0.5rem;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    """Link the premium dark theme stylesheet served from static/theme.css"""
+    st.markdown(
+        f'<link rel="stylesheet" href="app/static/theme.css?v={THEME_VERSION}">',
+        unsafe_allow_html=True
+    )
+
+def rerun_fragment():
+    """Rerun the current fragment, or the whole app when not in a fragment rerun"""
+    ctx = get_script_run_ctx()
+    # scope="fragment" is only allowed while a fragment reruns on its own
+    st.rerun(scope="fragment" if ctx is not None and ctx.fragment_ids_this_run else "app")
 
 def render_message(content, is_user, personality, timestamp):
     """
@@ -342,7 +31,7 @@ def render_message(content, is_user, personality, timestamp):
     Args:
         content: The message content
         is_user: Whether the message is from the user
-        personality: The personality configuration
+        personality: The message's Personality
         timestamp: Message timestamp
     """
     if is_user:
@@ -350,10 +39,154 @@ def render_message(content, is_user, personality, timestamp):
             st.markdown(content)
             st.caption(f"🕒 {timestamp}")
     else:
-        with st.chat_message("assistant", avatar=personality.get('avatar', '🤖')):
+        with st.chat_message("assistant", avatar=personality.avatar):
             st.markdown(content)
             st.caption(f"🕒 {timestamp}")
 
+def render_transcript(messages, personalities, default_personality, window: int = 30, page_size: int = 30,
+                      load_older=None):
+    """
+    Render the most recent messages, paging older ones in on demand
+    
+    Only the last `window` messages are rendered on each rerun; a
+    "load earlier" button pages in older history `page_size` at a time,
+    fetching from storage once the in-memory messages run out.
+    
+    Args:
+        messages: List of message dicts from session state
+        personalities: Personality configurations keyed by id
+        default_personality: Personality id for messages without one
+        window: Number of recent messages rendered by default
+        page_size: Number of older messages added per "load earlier" click
+        load_older: Optional callable(before_seq, limit) returning stored messages
+    """
+    if 'transcript_visible' not in st.session_state:
+        st.session_state.transcript_visible = window
+    
+    visible = max(window, st.session_state.transcript_visible)
+    hidden_in_memory = max(0, len(messages) - visible)
+    # Messages of failed calls are not stored and have no sequence number
+    first_seq = next((message['seq'] for message in messages if 'seq' in message), 0)
+    on_disk = first_seq if load_older else 0
+    hidden = hidden_in_memory + on_disk
+    
+    if hidden:
+        if st.button(f"Load earlier messages ({hidden} hidden)", use_container_width=True, key="load_earlier"):
+            if hidden_in_memory < page_size and on_disk:
+                messages[:0] = load_older(first_seq, page_size)
+            st.session_state.transcript_visible = visible + page_size
+            rerun_fragment()
+    
+    for message in messages[hidden_in_memory:]:
+        render_message(
+            message['content'],
+            message['is_user'],
+            personalities[message.get('personality', default_personality)],
+            message['timestamp']
+        )
+
+def render_message_context(store, session_id, seq, personalities, default_personality, context: int = 4):
+    """
+    Render a stored message highlighted among its neighbours
+    
+    Args:
+        store: Conversation store holding the session
+        session_id: Conversation identifier
+        seq: Sequence number of the message
+        personalities: Personality configurations keyed by id
+        default_personality: Personality id for messages without one
+        context: Messages shown before and after it
+    """
+    for message in store.page(session_id, seq + context + 1, 2 * context + 1):
+        target = st.container(key="search_target") if message['seq'] == seq else st.container()
+        with target:
+            render_message(
+                message['content'],
+                message['is_user'],
+                personalities[message.get('personality', default_personality)],
+                message['timestamp']
+            )
+
+class StreamingRenderer:
+    """Render a streamed reply into a placeholder at a bounded rate"""
+    
+    def __init__(self, placeholder, min_interval: float = 0.1, min_chars: int = 400, cursor: str = "▌"):
+        """
+        Initialize the renderer
+        
+        Args:
+            placeholder: Streamlit placeholder (e.g. from st.empty()) to render into
+            min_interval: Minimum seconds between intermediate updates
+            min_chars: Flush early once this many new characters are buffered
+            cursor: Suffix shown while the reply is still streaming
+        """
+        self.placeholder = placeholder
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.cursor = cursor
+        
+        # Chunks are joined on flush instead of repeated string concatenation
+        self._chunks = []
+        self._pending_chars = 0
+        # None until the first flush, so the first chunk is shown at once
+        self._last_flush = None
+        
+        # Counters for measuring what is sent to the browser
+        self.render_calls = 0
+        self.bytes_sent = 0
+    
+    @property
+    def text(self) -> str:
+        """Get the reply received so far"""
+        return "".join(self._chunks)
+    
+    def write(self, chunk: str):
+        """
+        Buffer a chunk, flushing if enough time or text has accumulated
+        
+        The first chunk is rendered at once. An empty chunk, which
+        ChatManager streams before waiting out a retry, flushes the buffer.
+        
+        Args:
+            chunk: Text chunk from the model stream
+        """
+        if not chunk:
+            self.flush()
+            return
+        self._chunks.append(chunk)
+        self._pending_chars += len(chunk)
+        
+        if (self._last_flush is None or self._pending_chars >= self.min_chars
+                or time.monotonic() - self._last_flush >= self.min_interval):
+            self.flush()
+    
+    def flush(self):
+        """Render the buffered text now, with the streaming cursor"""
+        if not self._pending_chars:
+            return
+        text = self.text
+        self._chunks = [text]
+        self._render(text + self.cursor)
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+    
+    def finalize(self) -> str:
+        """
+        Render the complete reply without the streaming cursor
+        
+        Returns:
+            The full reply text
+        """
+        text = self.text
+        self._chunks = [text]
+        self._render(text)
+        return text
+    
+    def _render(self, text: str):
+        self.placeholder.markdown(text)
+        self.render_calls += 1
+        self.bytes_sent += len(text.encode("utf-8"))
+
 def render_typing_indicator():
     """Render a typing indicator animation"""
     st.markdown("""
@@ -364,6 +197,69 @@ def render_typing_indicator():
     </div>
     """, unsafe_allow_html=True)
 
+def _format_seconds(seconds) -> str:
+    if seconds is None:
+        return "–"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
+
+def render_session_stats(stats, message_count: int):
+    """
+    Render the sidebar Session Stats panel
+    
+    Args:
+        stats: SessionStats of the current chat manager (None before the first call)
+        message_count: Messages in the conversation
+    """
+    last = stats.last if stats is not None else None
+    rate = last.tokens_per_second if last is not None else None
+    boxes = [
+        ("Messages", message_count),
+        ("Avg first token", _format_seconds(stats.mean_ttft if stats is not None else None)),
+        ("Last first token", _format_seconds(last.ttft if last is not None else None)),
+        ("Tokens/sec", f"{rate:.0f}" if rate else "–"),
+        ("Cache hits", f"{stats.cache_hits}/{stats.calls}" if stats is not None else "0/0"),
+        ("Errors", f"{stats.errors} · {last.error_type}" if last is not None and last.error_type
+         else stats.errors if stats is not None else 0)
+    ]
+    if stats is not None and stats.routed:
+        boxes += [
+            ("Fast routed", f"{stats.fast_routes}/{stats.routed}"),
+            ("Time saved", _format_seconds(stats.latency_saved))
+        ]
+    cells = "".join(
+        f"<div class='stat-box'><p class='stat-label'>{label}</p><p class='stat-value'>{value}</p></div>"
+        for label, value in boxes
+    )
+    st.markdown(f"<div class='stats-grid'>{cells}</div>", unsafe_allow_html=True)
+
+def render_search_hit(hit: dict, personalities, key: str) -> bool:
+    """
+    Render a search result with who wrote it, when, and the snippet
+    
+    Args:
+        hit: Hit dict from a conversation store's search()
+        personalities: Personality configurations keyed by id
+        key: Widget key of the result's open button
+    
+    Returns:
+        True if the open button was clicked
+    """
+    personality = personalities.get(hit['personality'])
+    author = "👤 You" if hit['is_user'] else (
+        f"{personality.emoji} {personality.name}" if personality is not None else "🤖 Assistant"
+    )
+    details = [author]
+    if hit['model']:
+        details.append(hit['model'])
+    details.append(
+        datetime.fromtimestamp(hit['created_at']).strftime("%Y-%m-%d %H:%M")
+        if hit['created_at'] is not None else hit['timestamp']
+    )
+    with st.container(border=True):
+        st.caption(" · ".join(details))
+        st.markdown(hit['snippet'])
+        return st.button("Open", key=key, use_container_width=True)
+
 def render_sidebar():
     """Render the sidebar content"""
     st.sidebar.header("⚙️ Settings")
@@ -1,14 +1,38 @@
 import streamlit as st
-from src.chat_manager import ChatManager
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from src.backends import default_backend, requires_api_key
+from src.chat_export import EXPORT_FORMATS, export_filename, export_metadata, export_mime, export_session
+from src.metrics import ensure_metrics_server
+from src.model_router import AUTO_MODEL
 from src.personalities import PERSONALITIES
+from src.response_cache import get_response_cache
+from src.scheduler import get_scheduler
+from src.single_flight import get_single_flight
+from src.prewarm import ensure_prewarmed
+from src.import_prewarm import ensure_imports_prewarmed
+from src.conversation_store import (
+    get_conversation_store,
+    valid_session_id,
+    RESUME_MESSAGES,
+    MAX_LOADED_MESSAGES
+)
 from src.ui_components import (
     render_sidebar, 
     render_message, 
+    render_transcript,
     render_typing_indicator,
-    apply_custom_css
+    render_session_stats,
+    render_search_hit,
+    render_message_context,
+    apply_custom_css,
+    rerun_fragment,
+    StreamingRenderer
 )
-from datetime import datetime
+from contextlib import closing
+from datetime import datetime, timedelta
+from functools import partial
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -25,9 +49,41 @@ st.set_page_config(
 # Apply custom CSS
 apply_custom_css()
 
+# Load precomputed quick starter replies (once per process)
+ensure_prewarmed(get_response_cache())
+
+# Serve Prometheus metrics when METRICS_PORT is set (once per process)
+ensure_metrics_server()
+
+conversation_store = get_conversation_store()
+
 # Initialize session state
+if 'session_id' not in st.session_state:
+    # Resume the conversation named in the URL, or start a new one
+    session_id = st.query_params.get("session")
+    if not valid_session_id(session_id):
+        session_id = uuid.uuid4().hex
+        st.query_params["session"] = session_id
+    st.session_state.session_id = session_id
+
+if 'owned_sessions' not in st.session_state:
+    # Conversations this browser has started or opened by their URL. The
+    # session id is the only credential to a conversation, so search is
+    # limited to these
+    st.session_state.owned_sessions = [st.session_state.session_id]
+
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    # Only the tail is loaded; older messages are paged in on demand
+    st.session_state.messages = conversation_store.tail(st.session_state.session_id, RESUME_MESSAGES)
+
+def save_message(message):
+    """Append a completed message to the session and persist it"""
+    conversation_store.append(st.session_state.session_id, message)
+    st.session_state.messages.append(message)
+    st.session_state.message_count += 1
+    # Bound memory per session; older messages stay on disk
+    if len(st.session_state.messages) > MAX_LOADED_MESSAGES:
+        del st.session_state.messages[:-MAX_LOADED_MESSAGES]
 
 if 'current_personality' not in st.session_state:
     st.session_state.current_personality = 'professional_assistant'
@@ -46,40 +102,100 @@ if 'groq_api_key' not in st.session_state:
     
     st.session_state.groq_api_key = api_key
     
-    if not st.session_state.groq_api_key:
+    # The local stub backend (LLM_BACKEND=stub) runs without a key
+    if not st.session_state.groq_api_key and requires_api_key(default_backend()):
         st.error("❌ Groq API key not found. Please set GROQ_API_KEY in environment variables or Streamlit secrets.")
         st.stop()
 
 if 'message_count' not in st.session_state:
-    st.session_state.message_count = 0
+    st.session_state.message_count = conversation_store.count(st.session_state.session_id)
 
 # Main title
 st.markdown("""
-<div style='text-align: center; margin-bottom: 40px; padding-top: 20px;'>
-    <h1 style='margin: 0; color: #f8fafc; font-size: 3rem; font-weight: 300; letter-spacing: -1px;'>AI Chatbot</h1>
-    <p style='color: #cbd5e1; font-size: 18px; margin: 12px 0 0 0; font-weight: 300;'>
-        Conversational Intelligence with Sophisticated Personality Modes
-    </p>
+<div class='app-header'>
+    <h1>AI Chatbot</h1>
+    <p>Conversational Intelligence with Sophisticated Personality Modes</p>
 </div>
 """, unsafe_allow_html=True)
 
-# Sidebar
-with st.sidebar:
-    st.markdown("""
-    <div style='text-align: center; margin-bottom: 24px;'>
-        <h2 style='color: #f8fafc; margin: 0; font-size: 24px; font-weight: 300;'>Settings</h2>
-        <div style='height: 2px; width: 40px; background: linear-gradient(90deg, #4f46e5 0%, #06b6d4 100%); margin: 10px auto; border-radius: 1px;'></div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.divider()
-    
-    st.markdown("""<p style='color: #cbd5e1; font-weight: 300; margin-bottom: 10px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'>Personality</p>""", unsafe_allow_html=True)
+# The page is split into fragments that rerun on their own:
+#   settings_panel - personality and model widgets; owns current_personality
+#                    (a change reruns the app), model_name and temperature
+#                    and reconfigures chat_manager
+#   stats          - not a fragment: a sidebar container that chat_panel fills
+#                    from chat_manager.stats and message_count after each turn
+#   search_panel   - searches owned_sessions' conversations; opening a result
+#                    switches session_id and sets jump (reruns the app)
+#   tools_panel    - quick starters, clear and export
+#   chat_panel     - reads current_personality, the settings and messages;
+#                    creates chat_manager on the first message and writes
+#                    messages and message_count; shows the jump target
+#                    until the next message
+# Interacting with a fragment's widgets reruns only that fragment, so a
+# chat turn re-executes chat_panel alone.
+
+MODELS = [
+    "llama-3.3-70b-versatile",
+    "llama-3.1-8b-instant",
+    "mixtral-8x7b-32768",
+    "llama3-70b-8192"
+]
+
+# Search date filter: label -> earliest creation time (None for any)
+SEARCH_PERIODS = {
+    "Any time": lambda now: None,
+    "Today": lambda now: now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp(),
+    "Last 7 days": lambda now: (now - timedelta(days=7)).timestamp(),
+    "Last 30 days": lambda now: (now - timedelta(days=30)).timestamp()
+}
+
+def open_session(session_id):
+    """Switch to another conversation (a new one for an unused id)"""
+    if session_id not in st.session_state.owned_sessions:
+        st.session_state.owned_sessions.append(session_id)
+    st.session_state.session_id = session_id
+    st.query_params["session"] = session_id
+    st.session_state.messages = conversation_store.tail(session_id, RESUME_MESSAGES)
+    st.session_state.message_count = conversation_store.count(session_id)
+    st.session_state.chat_manager = None
+    st.session_state.pop('transcript_visible', None)
+    st.session_state.pop('jump', None)
+
+def get_chat_manager():
+    """Get the session's chat manager, created on the first message"""
+    if st.session_state.chat_manager is None:
+        # Imported here so first paint does not wait for LangChain and the Groq SDK
+        from src.chat_manager import ChatManager
+        personality = PERSONALITIES[st.session_state.current_personality]
+        st.session_state.chat_manager = ChatManager(
+            api_key=st.session_state.groq_api_key,
+            personality=personality.override(temperature=st.session_state.temperature),
+            model_name=st.session_state.model_name,
+            cache=get_response_cache(),
+            # Optional hedged requests: HEDGE_AFTER seconds without a first token
+            hedge_after=float(os.getenv("HEDGE_AFTER")) if os.getenv("HEDGE_AFTER") else None,
+            hedge_model=os.getenv("HEDGE_MODEL"),
+            scheduler=get_scheduler(),
+            # Identical requests in flight (e.g. the same quick starter) share one stream
+            single_flight=get_single_flight(),
+            session_id=st.session_state.session_id,
+            # Optional long-term memory: MEMORY_TOP_K older turns recalled per prompt,
+            # their text paged back from the store like older transcript messages
+            memory_k=int(os.getenv("MEMORY_TOP_K", "0")),
+            load_messages=partial(conversation_store.by_seq, st.session_state.session_id)
+        )
+        st.session_state.chat_manager.load_history(st.session_state.messages)
+    return st.session_state.chat_manager
+
+@st.fragment
+def settings_panel():
+    """Personality and model settings"""
+    st.markdown("<p class='section-label'>Personality</p>", unsafe_allow_html=True)
     # Personality selector
     selected_personality = st.selectbox(
         "Select Your AI",
         options=list(PERSONALITIES.keys()),
-        format_func=lambda x: f"{PERSONALITIES[x]['emoji']} {PERSONALITIES[x]['name']}",
+        format_func=lambda x: f"{PERSONALITIES[x].emoji} {PERSONALITIES[x].name}",
         index=list(PERSONALITIES.keys()).index(st.session_state.current_personality),
         help="Choose the personality that will guide the conversation",
         label_visibility="collapsed"
@@ -87,26 +203,22 @@ with st.sidebar:
     
     # Show personality description
     st.markdown(f"""
-    <div style='background: rgba(30, 41, 59, 0.4); backdrop-filter: blur(12px); border-left: 3px solid #4f46e5; padding: 12px; border-radius: 6px; margin-top: 12px;'>
-        <p style='color: #f8fafc; font-weight: 300; margin: 0 0 8px 0; font-size: 14px;'>{PERSONALITIES[selected_personality]['emoji']} {PERSONALITIES[selected_personality]['name']}</p>
-        <p style='color: #cbd5e1; margin: 0; font-size: 13px; line-height: 1.5; font-weight: 300;'>{PERSONALITIES[selected_personality]['description']}</p>
+    <div class='personality-summary'>
+        <p class='summary-name'>{PERSONALITIES[selected_personality].emoji} {PERSONALITIES[selected_personality].name}</p>
+        <p class='summary-description'>{PERSONALITIES[selected_personality].description}</p>
     </div>
     """, unsafe_allow_html=True)
     
     # Model and Parameters Section
     st.divider()
-    st.markdown("""<p style='color: #cbd5e1; font-weight: 300; margin-bottom: 10px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'>Model Settings</p>""", unsafe_allow_html=True)
+    st.markdown("<p class='section-label'>Model Settings</p>", unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     with col1:
         model_name = st.selectbox(
             "AI Model",
-            options=[
-                "llama-3.3-70b-versatile",
-                "llama-3.1-8b-instant",
-                "mixtral-8x7b-32768",
-                "llama3-70b-8192"
-            ],
+            options=MODELS + [AUTO_MODEL],
+            format_func=lambda x: "Auto (route each turn)" if x == AUTO_MODEL else x,
             index=0,
             help="Select the language model to use",
             label_visibility="collapsed"
@@ -117,164 +229,256 @@ with st.sidebar:
             "Creativity",
             min_value=0.0,
             max_value=1.0,
-            value=PERSONALITIES[selected_personality]['temperature'],
+            value=PERSONALITIES[selected_personality].temperature,
             step=0.1,
             help="0 = Focused, 1 = Creative",
             label_visibility="collapsed"
         )
     
-    # Statistics Section
-    st.divider()
-    st.markdown("""<p style='color: #cbd5e1; font-weight: 300; margin-bottom: 12px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'>Session Stats</p>""", unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("""
-        <div style='background: rgba(30, 41, 59, 0.4); backdrop-filter: blur(12px); border: 1px solid rgba(71, 85, 105, 0.3); border-radius: 8px; padding: 12px; text-align: center;'>
-            <p style='color: #94a3b8; font-size: 11px; margin: 0 0 6px 0; text-transform: uppercase; letter-spacing: 0.5px;'>Messages</p>
-            <p style='color: #f8fafc; font-size: 20px; font-weight: 300; margin: 0;'>{}</p>
-        </div>
-        """.format(st.session_state.message_count), unsafe_allow_html=True)
+    # Keep the chat manager, once there is one, in sync with the settings
+    st.session_state.model_name = model_name
+    st.session_state.temperature = temperature
+    if st.session_state.chat_manager is not None:
+        # Hot reconfiguration keeps history and reuses pooled clients; the
+        # session-local temperature is layered over the shared, read-only personality
+        st.session_state.chat_manager.configure(
+            personality=PERSONALITIES[selected_personality].override(temperature=temperature),
+            model_name=model_name
+        )
     
-    with col2:
-        st.markdown("""
-        <div style='background: rgba(30, 41, 59, 0.4); backdrop-filter: blur(12px); border: 1px solid rgba(71, 85, 105, 0.3); border-radius: 8px; padding: 12px; text-align: center;'>
-            <p style='color: #94a3b8; font-size: 11px; margin: 0 0 6px 0; text-transform: uppercase; letter-spacing: 0.5px;'>Active</p>
-            <p style='color: #f8fafc; font-size: 20px; font-weight: 300; margin: 0;'>{}</p>
-        </div>
-        """.format(PERSONALITIES[selected_personality]['emoji']), unsafe_allow_html=True)
+    if selected_personality != st.session_state.current_personality:
+        # The chat area, avatars and quick starters follow the personality
+        st.session_state.current_personality = selected_personality
+        st.rerun()
+
+@st.fragment
+def search_panel():
+    """Full-text search over the conversations this browser owns"""
+    st.markdown("<p class='section-label'>Search Conversations</p>", unsafe_allow_html=True)
+    query = st.text_input(
+        "Search",
+        placeholder="Search your conversations...",
+        key="search_query",
+        label_visibility="collapsed"
+    )
+    with st.expander("Filters"):
+        personality = st.selectbox(
+            "Personality",
+            options=[None] + list(PERSONALITIES.keys()),
+            format_func=lambda x: "Any personality" if x is None else f"{PERSONALITIES[x].emoji} {PERSONALITIES[x].name}",
+            key="search_personality"
+        )
+        model = st.selectbox(
+            "Model",
+            options=[None] + MODELS,
+            format_func=lambda x: "Any model" if x is None else x,
+            key="search_model"
+        )
+        period = st.selectbox("Date", options=list(SEARCH_PERIODS), key="search_period")
     
-    # Example Prompts Section
-    st.divider()
-    st.markdown("""<p style='color: #cbd5e1; font-weight: 300; margin-bottom: 12px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'>Quick Starters</p>""", unsafe_allow_html=True)
+    if not query.strip():
+        return
+    hits = conversation_store.search(
+        query, session_ids=st.session_state.owned_sessions, personality=personality, model=model,
+        since=SEARCH_PERIODS[period](datetime.now())
+    )
+    if not hits:
+        st.caption("No matching messages")
+    for i, hit in enumerate(hits):
+        if render_search_hit(hit, PERSONALITIES, key=f"search_open_{i}"):
+            if hit['session_id'] not in st.session_state.owned_sessions:
+                # Never hand out another visitor's conversation
+                continue
+            if hit['session_id'] != st.session_state.session_id:
+                open_session(hit['session_id'])
+            # The chat panel shows the message in context until the next message
+            st.session_state.jump = {"session_id": hit['session_id'], "seq": hit['seq']}
+            st.rerun()
+
+@st.fragment
+def tools_panel():
+    """Quick starters, clear and export"""
+    current_personality = st.session_state.current_personality
+    st.markdown("<p class='section-label'>Quick Starters</p>", unsafe_allow_html=True)
     
-    for i, prompt in enumerate(PERSONALITIES[selected_personality]['example_prompts']):
+    for i, prompt in enumerate(PERSONALITIES[current_personality].example_prompts):
         if st.button(prompt, use_container_width=True, key=f"prompt_{i}"):
+            # Handled by the chat panel, which only runs on its own or with the app
             st.session_state.user_input = prompt
+            st.rerun()
     
     # Action Buttons Section
     st.divider()
-    st.markdown("""<p style='color: #cbd5e1; font-weight: 300; margin-bottom: 12px; font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'>Tools</p>""", unsafe_allow_html=True)
+    st.markdown("<p class='section-label'>Tools</p>", unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Clear Chat", use_container_width=True, type="secondary"):
-            st.session_state.messages = []
-            st.session_state.message_count = 0
-            st.session_state.chat_manager = None
+            # Start a new conversation; the old one stays in the store
+            open_session(uuid.uuid4().hex)
             st.rerun()
     
     with col2:
-        if st.button("📥 Export", use_container_width=True, type="secondary"):
-            if st.session_state.messages:
-                chat_text = "\n\n".join([
-                    f"{'User' if msg['is_user'] else 'Assistant'} ({msg['timestamp']}): {msg['content']}"
-                    for msg in st.session_state.messages
-                ])
-                st.download_button(
-                    "Download Chat",
-                    chat_text,
-                    file_name=f"chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain",
-                    key="export_btn"
-                )
+        with st.popover("📥 Export", use_container_width=True):
+            export_format = st.selectbox(
+                "Format",
+                options=list(EXPORT_FORMATS),
+                format_func=lambda fmt: EXPORT_FORMATS[fmt].label,
+                key="export_format"
+            )
+            export_gzip = st.checkbox("Gzip", key="export_gzip")
+            # Built from the store on click, so the whole conversation is exported
+            # with the settings in effect then, not when this panel last ran. The
+            # download runs off the script thread, so it reads the session's state
+            # object rather than st.session_state
+            session_id = st.session_state.session_id
+            state = get_script_run_ctx().session_state
+            st.download_button(
+                "Download Chat",
+                lambda: export_session(
+                    conversation_store, session_id, export_format,
+                    export_metadata(session_id, conversation_store.count(session_id),
+                                    PERSONALITIES[state["current_personality"]],
+                                    state["model_name"], state["temperature"]),
+                    export_gzip
+                ),
+                file_name=export_filename(export_format, export_gzip),
+                mime=export_mime(export_format, export_gzip),
+                use_container_width=True,
+                key="export_btn"
+            )
     
     # Footer Section
     st.divider()
     st.markdown("""
-    <div style='text-align: center; padding: 16px 0; border-top: 1px solid rgba(71, 85, 105, 0.3);'>
-        <p style='font-size: 12px; color: #94a3b8; margin: 0 0 8px 0; font-weight: 300;'>
-            <strong style='color: #f8fafc;'>AI Chatbot</strong><br/>
+    <div class='sidebar-footer'>
+        <p>
+            <strong>AI Chatbot</strong><br/>
             Powered by Groq & LangChain
         </p>
-        <a href='https://console.groq.com' target='_blank' style='color: #4f46e5; text-decoration: none; font-size: 11px; font-weight: 300;'>Get API Key →</a>
+        <a href='https://console.groq.com' target='_blank'>Get API Key →</a>
     </div>
     """, unsafe_allow_html=True)
 
-# Update personality if changed
-if selected_personality != st.session_state.current_personality:
-    st.session_state.current_personality = selected_personality
-    # Update temperature
-    PERSONALITIES[selected_personality]['temperature'] = temperature
-    # Reinitialize chat manager
-    st.session_state.chat_manager = ChatManager(
-        api_key=st.session_state.groq_api_key,
-        personality=PERSONALITIES[selected_personality],
-        model_name=model_name
-    )
-
-# Initialize chat manager if needed
-if st.session_state.chat_manager is None:
-    PERSONALITIES[selected_personality]['temperature'] = temperature
-    st.session_state.chat_manager = ChatManager(
-        api_key=st.session_state.groq_api_key,
-        personality=PERSONALITIES[selected_personality],
-        model_name=model_name
-    )
-
-# Display chat messages
-chat_container = st.container()
-with chat_container:
-    if not st.session_state.messages:
-        # Welcome message
-        st.markdown(f"""
-        <div style='background: linear-gradient(135deg, rgba(79, 70, 229, 0.1) 0%, rgba(2, 132, 199, 0.05) 100%); backdrop-filter: blur(12px); border: 1px solid rgba(71, 85, 105, 0.3); border-radius: 12px; padding: 40px; text-align: center; margin: 40px auto;'>
-            <div style='font-size: 56px; margin-bottom: 20px;'>{PERSONALITIES[selected_personality]['emoji']}</div>
-            <h2 style='color: #f8fafc; margin: 0 0 10px 0; font-size: 28px; font-weight: 300;'>Welcome to {PERSONALITIES[selected_personality]['name']}</h2>
-            <p style='color: #cbd5e1; margin: 12px 0; font-size: 15px; line-height: 1.6; font-weight: 300;'>{PERSONALITIES[selected_personality]['description']}</p>
-            <p style='color: #94a3b8; margin-top: 20px; font-size: 14px; font-weight: 300;'>💡 Try one of the quick starters in the left sidebar to get started!</p>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        for message in st.session_state.messages:
-            render_message(
-                message['content'],
-                message['is_user'],
-                PERSONALITIES[message.get('personality', selected_personality)],
-                message['timestamp']
+@st.fragment
+def chat_panel(stats_container):
+    """Transcript, chat input, the streamed reply and the session stats"""
+    current_personality = PERSONALITIES[st.session_state.current_personality]
+    
+    # Chat input, pinned to the bottom of the page as outside a fragment
+    with st.bottom:
+        user_input = st.chat_input("Type your message here...", key="chat_input")
+    
+    # Handle user input from button or chat input
+    if 'user_input' in st.session_state and st.session_state.user_input:
+        user_input = st.session_state.user_input
+        del st.session_state.user_input
+    
+    if user_input:
+        # A new message returns from a search result to the latest messages
+        st.session_state.pop('jump', None)
+    jump = st.session_state.get('jump')
+    
+    # Display chat messages
+    chat_container = st.container()
+    with chat_container:
+        if jump is not None and jump['session_id'] == st.session_state.session_id:
+            render_message_context(
+                conversation_store, jump['session_id'], jump['seq'], PERSONALITIES, current_personality.id
+            )
+            if st.button("Back to latest messages", use_container_width=True, key="jump_back"):
+                del st.session_state.jump
+                rerun_fragment()
+        elif not st.session_state.messages and not user_input:
+            # Welcome message
+            st.markdown(f"""
+            <div class='welcome-box'>
+                <div class='welcome-emoji'>{current_personality.emoji}</div>
+                <h2>Welcome to {current_personality.name}</h2>
+                <p>{current_personality.description}</p>
+                <p class='welcome-hint'>💡 Try one of the quick starters in the left sidebar to get started!</p>
+            </div>
+            """, unsafe_allow_html=True)
+        elif st.session_state.messages:
+            render_transcript(
+                st.session_state.messages,
+                PERSONALITIES,
+                current_personality.id,
+                load_older=lambda before_seq, limit: conversation_store.page(
+                    st.session_state.session_id, before_seq, limit
+                )
             )
+    
+    if user_input:
+        # The new turn is drawn in place below the transcript, so no rerun is needed
+        render_message(user_input, True, current_personality, datetime.now().strftime("%H:%M:%S"))
+        
+        # Get and stream response
+        with st.spinner("🤖 Thinking..."):
+            try:
+                with st.chat_message("assistant", avatar=current_personality.avatar):
+                    renderer = StreamingRenderer(st.empty())
+                    
+                    # Stream response, coalescing chunks into bounded-rate updates.
+                    # A new message or Clear Chat stops this run at the next
+                    # write; closing the stream then aborts the upstream request
+                    # and saves nothing
+                    chat_manager = get_chat_manager()
+                    with closing(chat_manager.stream_response(user_input)) as stream:
+                        for chunk in stream:
+                            renderer.write(chunk)
+                    response_text = renderer.finalize()
+                    
+                    # Store the exchange; the same dicts back the prompt history
+                    exchange = chat_manager.pop_last_exchange()
+                    if exchange is None:
+                        # Failed call: show it in the transcript, but keep it out of the
+                        # store, and marked as an error out of any rebuilt prompt history
+                        timestamp = datetime.now().strftime("%H:%M:%S")
+                        failed = [
+                            {"content": user_input, "is_user": True, "timestamp": timestamp,
+                             "personality": current_personality.id, "error": True},
+                            {"content": response_text, "is_user": False, "timestamp": timestamp,
+                             "personality": current_personality.id, "error": True}
+                        ]
+                        st.caption(f"🕒 {timestamp}")
+                        st.session_state.messages.extend(failed)
+                    else:
+                        st.caption(f"🕒 {exchange[1]['timestamp']}")
+                        for message in exchange:
+                            save_message(message)
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+    
+    # Stats only change with a chat turn, so they are redrawn with this
+    # fragment instead of on a timer
+    with stats_container:
+        chat_manager = st.session_state.chat_manager
+        render_session_stats(
+            chat_manager.stats if chat_manager is not None else None,
+            st.session_state.message_count
+        )
 
-# Chat input
-user_input = st.chat_input("Type your message here...", key="chat_input")
+# Sidebar
+with st.sidebar:
+    st.markdown("""
+    <div class='sidebar-title'>
+        <h2>Settings</h2>
+        <div class='accent-bar'></div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.divider()
+    settings_panel()
+    st.divider()
+    st.markdown("<p class='section-label'>Session Stats</p>", unsafe_allow_html=True)
+    stats_container = st.container()
+    st.divider()
+    search_panel()
+    st.divider()
+    tools_panel()
 
-# Handle user input from button or chat input
-if 'user_input' in st.session_state and st.session_state.user_input:
-    user_input = st.session_state.user_input
-    del st.session_state.user_input
+chat_panel(stats_container)
 
-if user_input:
-    # Add user message
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    st.session_state.messages.append({
-        "content": user_input,
-        "is_user": True,
-        "timestamp": timestamp,
-        "personality": selected_personality
-    })
-    st.session_state.message_count += 1
-    
-    # Get and stream response
-    with st.spinner("🤖 Thinking..."):
-        try:
-            response_text = ""
-            with st.chat_message("assistant", avatar=PERSONALITIES[selected_personality]['emoji']):
-                response_placeholder = st.empty()
-                
-                # Stream response
-                for chunk in st.session_state.chat_manager.stream_response(user_input):
-                    response_text += chunk
-                    response_placeholder.markdown(response_text)
-                
-                # Store complete response
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                st.session_state.messages.append({
-                    "content": response_text,
-                    "is_user": False,
-                    "timestamp": timestamp,
-                    "personality": selected_personality
-                })
-                st.session_state.message_count += 1
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
-    
-    st.rerun()
+# Import the chat stack in the background now the page is drawn (once per process)
+ensure_imports_prewarmed()